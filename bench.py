@@ -0,0 +1,288 @@
+import argparse
+import gc
+import io
+import json
+import os
+import pkgutil
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import choroplethe
+import comparaison
+import densite
+import donnees
+import echantillons
+import entrepot
+import graphiques
+import modele
+import partage
+import points_noirs
+import rafraichir
+import series
+import synthetique
+import vues
+from commun import DOSSIER_BRUT
+from rapport import slug
+
+# mesures de performance sur données synthétiques (synthetique.py) : chargement, agrégats, graphiques,
+# carte et prédiction, à plusieurs échelles ; résultats en JSON pour comparer les commits entre eux
+ANNEE = 2009
+ECHELLES = [0.1, 1.0]
+REPETITIONS = 3
+PREDICTIONS = 100
+
+DOSSIER_CODE = os.path.dirname(os.path.abspath(__file__))
+# fichiers lus par l'application relativement au dossier courant
+FICHIERS_CODE = ['data.json', 'clf_dt3-pickle.pkl']
+
+# dépendances lourdes qui ne doivent être importées que par les pages qui s'en servent
+MODULES_LOURDS = ['bokeh', 'seaborn', 'matplotlib', 'sklearn']
+
+# démarrage à froid dans un nouveau process : imports de st_report.py, puis ceux du module de la page
+SCRIPT_DEMARRAGE = """
+import importlib, json, sys, time
+debut = time.perf_counter()
+import streamlit, metriques
+base = time.perf_counter() - debut
+if sys.argv[1]:
+	importlib.import_module('vues.' + sys.argv[1])
+print(json.dumps({'secondes': time.perf_counter() - debut, 'base': base, 'lourds': [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+
+# caches en mémoire vidés avant chaque mesure : on mesure le travail, pas le cache
+def vider_caches():
+	for fonction in (donnees._distant, donnees._accidents, densite._calculer_entrepot, series._charger,
+					 choroplethe._charger_geometries, entrepot._colonnes, modele.charger_modele, modele.distributions_noeuds,
+					 partage._projeter, points_noirs._grappes, comparaison._partiel):
+		fonction.cache_clear()
+
+
+# rendu effectif d'un résultat de graphique (comme l'application) ; renvoie la taille produite en octets
+def materialiser(resultat):
+	if isinstance(resultat, list):
+		return sum(materialiser(r) for r in resultat)
+	if isinstance(resultat, plt.Figure):
+		tampon = io.BytesIO()
+		resultat.savefig(tampon, format='png')
+		plt.close(resultat)
+		return tampon.tell()
+	if isinstance(resultat, (pd.DataFrame, pd.Series)):
+		return len(resultat.to_html() if isinstance(resultat, pd.DataFrame) else resultat.to_frame().to_html())
+	if isinstance(resultat, str):
+		return 0
+	from bokeh.embed import json_item
+	return len(json.dumps(json_item(resultat)))
+
+
+# temps (meilleur et médian sur les répétitions) puis pic mémoire sur une exécution tracée à part
+def mesurer(fonction, repetitions=REPETITIONS, lignes=None):
+	durees = []
+	for _ in range(repetitions):
+		vider_caches()
+		gc.collect()
+		debut = time.perf_counter()
+		resultat = fonction()
+		durees.append(time.perf_counter() - debut)
+	vider_caches()
+	gc.collect()
+	tracemalloc.start()
+	fonction()
+	pic = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	mesure = {
+		'secondes': durees,
+		'min': min(durees),
+		'mediane': statistics.median(durees),
+		'pic_memoire_mo': round(pic / 2 ** 20, 2),
+		}
+	if lignes:
+		mesure['lignes_par_seconde'] = round(lignes / min(durees))
+	if isinstance(resultat, (int, np.integer)):
+		mesure['octets'] = int(resultat)
+	return mesure
+
+
+def _essayer(fonction, *args, **kwargs):
+	try:
+		return fonction(*args, **kwargs)
+	except Exception as e:
+		return {'erreur': repr(e)}
+
+
+def _chronometrer(fonction):
+	debut = time.perf_counter()
+	resultat = fonction()
+	return resultat, time.perf_counter() - debut
+
+
+def entrees_prediction():
+	d = modele
+	return [next(iter(d.catr_switch)), next(iter(d.secu_switch)), 2, next(iter(d.col_switch)), next(iter(d.agg_switch)),
+			next(iter(d.situ_switch)), next(iter(d.obsm_switch)), 60, next(iter(d.obs_switch))]
+
+
+def predire(n=PREDICTIONS):
+	entrees = entrees_prediction()
+	for _ in range(n):
+		modele.prediction(*entrees)
+
+
+# toutes les mesures d'une échelle, dans un dossier de travail contenant son propre dataset/
+def mesurer_echelle(echelle, repetitions, mots=None):
+	resultats = {'lignes': {}, 'mesures': {}}
+	lignes, duree = _chronometrer(lambda: synthetique.generer(ANNEE, echelle, DOSSIER_BRUT))
+	resultats['lignes'] = lignes
+	resultats['mesures']['generation'] = {'min': duree}
+	_, duree = _chronometrer(lambda: rafraichir.rafraichir([ANNEE], workers=1, telecharger=False, forcer=True))
+	resultats['mesures']['rafraichir'] = {'min': duree, 'lignes_par_seconde': round(lignes['usagers'] / duree)}
+
+	for palier, libelle in enumerate(echantillons.LIBELLES):
+		n = entrepot.paliers(ANNEE)['bornes'][palier]
+		# preprocess : jeu publié en mémoire partagée (partage.py) ; preparer : calcul depuis l'entrepôt
+		resultats['mesures']['preprocess/' + libelle] = mesurer(lambda: donnees.preprocess(ANNEE, palier), repetitions, n)
+		resultats['mesures']['preparer/' + libelle] = mesurer(lambda: donnees.preparer(ANNEE, palier), repetitions, n)
+	resultats['mesures']['vue/accidents'] = mesurer(lambda: donnees.accidents(ANNEE, ['catr', 'col']), repetitions, lignes['caracteristiques'])
+
+	# graphiques sur le plus petit palier (premier affichage) et sur l'année complète
+	for palier in (0, len(echantillons.PALIERS) - 1):
+		df = donnees.preprocess(ANNEE, palier)
+		for titre, graphique in graphiques.graphs.items():
+			if mots and not any(mot in titre for mot in mots):
+				continue
+			if palier == 0 and graphiques.exact(graphique, ANNEE):
+				continue
+			cle = 'graphes/{}/{}'.format(echantillons.LIBELLES[palier], slug(titre))
+			resultats['mesures'][cle] = _essayer(mesurer, lambda: materialiser(graphique(df, ANNEE)), repetitions, len(df))
+		del df
+		gc.collect()
+
+	# comparaison de deux années (comptes partiels de chaque année puis fusion, cf. comparaison.py) :
+	# année suivante synthétique, construite sans être mesurée
+	synthetique.generer(ANNEE + 1, echelle, DOSSIER_BRUT)
+	rafraichir.rafraichir([ANNEE + 1], workers=1, telecharger=False)
+	for titre, graphique in graphiques.graphs.items():
+		if mots and not any(mot in titre for mot in mots):
+			continue
+		cle = 'comparaison/' + slug(titre)
+		resultats['mesures'][cle] = _essayer(mesurer, lambda: materialiser(
+			comparaison.comparer(graphique, (ANNEE, ANNEE), (ANNEE + 1, ANNEE + 1), len(echantillons.PALIERS) - 1)), repetitions)
+
+	resultats['mesures']['prediction'] = _essayer(mesurer, predire, repetitions)
+	if 'min' in resultats['mesures']['prediction']:
+		resultats['mesures']['prediction']['secondes_par_appel'] = resultats['mesures']['prediction']['min'] / PREDICTIONS
+	return resultats
+
+
+# temps d'import à froid de l'application, seule puis pour chaque page de vues/, et modules lourds chargés
+def mesurer_demarrage(repetitions=REPETITIONS):
+	pages = [''] + [module.name for module in pkgutil.iter_modules(vues.__path__)]
+	resultats = {}
+	for page in pages:
+		durees = []
+		for _ in range(repetitions):
+			sortie = subprocess.run([sys.executable, '-c', SCRIPT_DEMARRAGE, page] + MODULES_LOURDS,
+									cwd=DOSSIER_CODE, capture_output=True, text=True, check=True)
+			mesure = json.loads(sortie.stdout.splitlines()[-1])
+			durees.append(mesure['secondes'])
+		resultats[page or 'st_report'] = {
+			'secondes': durees,
+			'min': min(durees),
+			'mediane': statistics.median(durees),
+			'streamlit_s': mesure['base'],
+			'modules_lourds': mesure['lourds'],
+			}
+	return resultats
+
+
+def machine():
+	try:
+		commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=DOSSIER_CODE, capture_output=True, text=True).stdout.strip()
+	except OSError:
+		commit = None
+	return {
+		'commit': commit or None,
+		'date': datetime.now().isoformat(timespec='seconds'),
+		'plateforme': platform.platform(),
+		'python': platform.python_version(),
+		'coeurs': os.cpu_count(),
+		'numpy': np.__version__,
+		'pandas': pd.__version__,
+		}
+
+
+def rss_max_mo():
+	try:
+		import resource
+	except ImportError:
+		return None
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return round(rss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)
+
+
+def lancer(echelles=ECHELLES, repetitions=REPETITIONS, dossier=None, mots=None):
+	resultats = {'machine': machine(), 'demarrage': _essayer(mesurer_demarrage, repetitions), 'echelles': {}}
+	depart = os.getcwd()
+	for echelle in echelles:
+		travail = os.path.join(dossier, str(echelle)) if dossier else tempfile.mkdtemp(prefix='bench-')
+		os.makedirs(travail, exist_ok=True)
+		for fichier in FICHIERS_CODE:
+			lien = os.path.join(travail, fichier)
+			if not os.path.exists(lien):
+				os.symlink(os.path.join(DOSSIER_CODE, fichier), lien)
+		os.chdir(travail)
+		try:
+			resultats['echelles'][str(echelle)] = mesurer_echelle(echelle, repetitions, mots)
+		finally:
+			os.chdir(depart)
+		print('(done) échelle {}'.format(echelle))
+	resultats['rss_max_mo'] = rss_max_mo()
+	return resultats
+
+
+# rapport de temps (min) entre deux fichiers de résultats, mesure par mesure
+def comparer(reference, resultats):
+	lignes = []
+	for page, mesure in resultats.get('demarrage', {}).items():
+		ref = reference.get('demarrage', {}).get(page, {})
+		if isinstance(mesure, dict) and 'min' in mesure and 'min' in ref:
+			lignes.append(('demarrage', page, ref['min'], mesure['min'], mesure['min'] / ref['min']))
+	for echelle, r in resultats['echelles'].items():
+		ref = reference.get('echelles', {}).get(echelle, {}).get('mesures', {})
+		for cle, mesure in r['mesures'].items():
+			if isinstance(mesure, dict) and 'min' in mesure and 'min' in ref.get(cle, {}):
+				lignes.append((echelle, cle, ref[cle]['min'], mesure['min'], mesure['min'] / ref[cle]['min']))
+	return pd.DataFrame(lignes, columns=['echelle', 'mesure', 'reference_s', 'actuel_s', 'rapport'])
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Mesures de performance sur données synthétiques')
+	parser.add_argument('--echelles', nargs='+', type=float, default=ECHELLES, help="tailles relatives à une année réelle (0.1 à 10)")
+	parser.add_argument('--repetitions', type=int, default=REPETITIONS)
+	parser.add_argument('--mots', nargs='*', help='ne mesurer que les graphiques dont le titre contient un de ces mots')
+	parser.add_argument('--dossier', help='dossier de travail (défaut : dossiers temporaires)')
+	parser.add_argument('--sortie', default='bench.json')
+	parser.add_argument('--comparer', help='résultats de référence (JSON) à comparer')
+	args = parser.parse_args()
+
+	resultats = lancer(args.echelles, args.repetitions, args.dossier and os.path.abspath(args.dossier), args.mots)
+	with open(args.sortie, 'w') as f:
+		json.dump(resultats, f, indent=1)
+	print('(done) résultats dans ' + args.sortie)
+	if args.comparer:
+		with open(args.comparer, 'r') as f:
+			pd.set_option('display.width', 200)
+			print(comparer(json.load(f), resultats).to_string(index=False))
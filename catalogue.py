@@ -0,0 +1,41 @@
+import json
+import re
+
+# les 4 fichiers publiés chaque année
+TABLES = ['caracteristiques', 'lieux', 'vehicules', 'usagers']
+
+_NOM_FICHIER = re.compile(r'^(' + '|'.join(TABLES) + r')[-_](\d{4})\.csv$')
+
+
+# chargement des ressources décrites dans le fichier master JSON
+def charger_catalogue(chemin='data.json'):
+	with open(chemin, 'r') as f:
+		data = json.load(f)
+	return data['distribution']
+
+
+# ressources annuelles (caracteristiques/lieux/vehicules/usagers) du catalogue
+def ressources(annees=None, chemin='data.json'):
+	liste = []
+	for r in charger_catalogue(chemin):
+		m = _NOM_FICHIER.match(r.get('name', ''))
+		if m is None:
+			continue
+		annee = int(m.group(2))
+		if annees is not None and annee not in annees:
+			continue
+		liste.append({
+			'id': r['@id'],
+			'table': m.group(1),
+			'annee': annee,
+			'nom': r['name'],
+			'url': r['contentUrl'],
+			'taille': r.get('contentSize'),
+			'modifie': r.get('dateModified'),
+			})
+	return sorted(liste, key=lambda r: (r['annee'], TABLES.index(r['table'])))
+
+
+# ressources d'une année indexées par table
+def ressources_annee(annee, chemin='data.json'):
+	return {r['table']: r for r in ressources([annee], chemin)}
@@ -0,0 +1,356 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from tornado.websocket import websocket_connect
+
+import bench
+import donnees
+import entrepot
+import graphiques
+import metriques
+import rafraichir
+import synthetique
+from commun import DOSSIER_BRUT
+
+# test de charge de l'application : un serveur `streamlit run st_report.py` lancé à part (un par palier), et
+# N sessions simulées qui s'y connectent comme des navigateurs (websocket, messages protobuf de streamlit).
+# Chaque action d'une session change des widgets et demande une réexécution du script au serveur : recherche,
+# ouverture d'un graphique (tous les graphiques cochés sont recalculés et rendus palier après palier), changement
+# d'année, prédiction sur la page de modélisation. On mesure, côté navigateur, la durée de chaque réexécution
+# et celle du premier graphique reçu, et côté serveur sa mémoire résidente, sur un jeu synthétique local.
+SESSIONS = [1, 4, 8]
+DUREE = 60
+# temps de réflexion moyen entre deux actions d'une session (s)
+PAUSE = 2.0
+ECHELLE = 0.1
+ANNEES = [2016, 2017]
+# graphiques ouverts en même temps par une session (le plus ancien est refermé au-delà)
+OUVERTS = 3
+# seuil du 95e centile du premier affichage pour la capacité (s)
+SEUIL = 2.0
+# attente maximale du démarrage du serveur et d'une réexécution (s)
+DEMARRAGE = 120
+REEXECUTION = 300
+
+MOTS = ['carte', 'région', 'département', 'gravité', 'mois', 'jour', 'heure', 'véhicule', 'route', 'collision',
+		'sexe', 'tendance', 'calendrier']
+CENTILES = [50, 90, 95, 99]
+
+# pages de st_report.py (libellés du menu)
+PAGE_ANALYSE = '3. Analyse'
+PAGE_MODELISATION = '4. Modélisation'
+TITRES = {declaration['titre'] for declaration in graphiques.declarations.values()}
+
+# noms selon la version de streamlit (0.80 puis 1.x) : websocket, état de santé, fin d'exécution
+CHEMINS_WEBSOCKET = ['/_stcore/stream', '/stream']
+CHEMINS_SANTE = ['/_stcore/health', '/healthz']
+FINS = ['script_finished', 'report_finished']
+WIDGETS = ['radio', 'selectbox', 'checkbox', 'text_input', 'button', 'multiselect', 'slider']
+# éléments d'un graphique rendu (ref_hash : gros message déjà envoyé, remplacé par sa référence)
+RENDUS = ['imgs', 'bokeh_chart', 'data_frame', 'arrow_data_frame', 'table', 'arrow_table', 'ref_hash']
+
+
+# durées par action, partagées entre les sessions (une seule boucle asyncio : pas de verrou)
+def nouvelles_mesures():
+	return {'durees': {}, 'erreurs': {}}
+
+
+def noter(mesures, action, duree=None, erreur=None):
+	if erreur is None:
+		mesures['durees'].setdefault(action, []).append(duree)
+	else:
+		mesures['erreurs'].setdefault(action, []).append(erreur)
+
+
+def port_libre():
+	with socket.socket() as s:
+		s.bind(('127.0.0.1', 0))
+		return s.getsockname()[1]
+
+
+# serveur streamlit de l'application, dans le dossier de travail (son dataset/) ; journal dans streamlit.log
+def demarrer_serveur(port):
+	commande = [sys.executable, '-m', 'streamlit', 'run', os.path.join(bench.DOSSIER_CODE, 'st_report.py'),
+				'--server.headless', 'true', '--server.port', str(port), '--server.address', '127.0.0.1',
+				'--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false']
+	with open('streamlit.log', 'ab') as journal:
+		serveur = subprocess.Popen(commande, stdout=journal, stderr=subprocess.STDOUT)
+	limite = time.monotonic() + DEMARRAGE
+	while time.monotonic() < limite:
+		if serveur.poll() is not None:
+			raise RuntimeError('le serveur streamlit s\'est arrêté au démarrage (cf. streamlit.log)')
+		for chemin in CHEMINS_SANTE:
+			try:
+				with urllib.request.urlopen('http://127.0.0.1:{}{}'.format(port, chemin), timeout=1) as r:
+					if r.status == 200:
+						return serveur
+			except OSError:
+				pass
+		time.sleep(0.2)
+	arreter_serveur(serveur)
+	raise RuntimeError('le serveur streamlit ne répond pas après {} s (cf. streamlit.log)'.format(DEMARRAGE))
+
+
+def arreter_serveur(serveur):
+	serveur.terminate()
+	try:
+		serveur.wait(10)
+	except subprocess.TimeoutExpired:
+		serveur.kill()
+		serveur.wait()
+
+
+async def connecter(port):
+	for chemin in CHEMINS_WEBSOCKET:
+		try:
+			return await websocket_connect('ws://127.0.0.1:{}{}'.format(port, chemin), max_message_size=2 ** 30)
+		except Exception:
+			erreur = chemin
+	raise ConnectionError('websocket du serveur streamlit introuvable (dernier essai : {})'.format(erreur))
+
+
+def _widget(element):
+	genre = element.WhichOneof('type')
+	w = getattr(element, genre)
+	return {'genre': genre, 'id': w.id, 'label': w.label, 'options': list(getattr(w, 'options', []))}
+
+
+# réexécution du script avec ces états de widgets ({id: (champ de WidgetState, valeur)}), jusqu'à la fin de
+# l'exécution ; mesure la durée totale et celle du premier graphique reçu, renvoie les widgets affichés
+async def executer(ws, etats, mesures, action):
+	message = BackMsg()
+	message.rerun_script.query_string = ''
+	for id, (champ, valeur) in etats.items():
+		etat = message.rerun_script.widget_states.widgets.add()
+		etat.id = id
+		setattr(etat, champ, valeur)
+	debut = time.perf_counter()
+	await ws.write_message(message.SerializeToString(), binary=True)
+	widgets, premier, erreurs = [], None, []
+	while True:
+		donnees_ws = await asyncio.wait_for(ws.read_message(), REEXECUTION)
+		if donnees_ws is None:
+			raise ConnectionError('connexion fermée par le serveur')
+		recu = ForwardMsg()
+		recu.ParseFromString(donnees_ws)
+		genre = recu.WhichOneof('type')
+		if genre in FINS:
+			statut = recu.DESCRIPTOR.fields_by_name[genre].enum_type.values_by_number[getattr(recu, genre)].name
+			if statut != 'FINISHED_EARLY_FOR_RERUN':
+				break
+		elif genre == 'ref_hash' and premier is None:
+			premier = time.perf_counter() - debut
+		elif genre == 'delta' and recu.delta.WhichOneof('type') == 'new_element':
+			element = recu.delta.new_element
+			nature = element.WhichOneof('type')
+			if nature in WIDGETS:
+				widgets.append(_widget(element))
+			elif nature == 'exception':
+				erreurs.append(element.exception.type + ': ' + element.exception.message)
+			elif nature in RENDUS and premier is None:
+				premier = time.perf_counter() - debut
+	noter(mesures, action, time.perf_counter() - debut)
+	if premier is not None:
+		noter(mesures, 'premier_affichage', premier)
+	for erreur in erreurs:
+		noter(mesures, action, erreur=erreur)
+	return widgets
+
+
+def trouver(widgets, genre, label=None, options=None):
+	for w in widgets:
+		if w['genre'] == genre and (label is None or w['label'] == label) and (options is None or options <= set(w['options'])):
+			return w
+	raise LookupError('widget {} {} absent de la page'.format(genre, label or sorted(options or [])))
+
+
+# prédiction : page de modélisation, entrées tirées au hasard, bouton « Prédire », retour à l'analyse
+async def predire(ws, etats, menu, rng, mesures):
+	etats[menu['id']] = ('int_value', menu['options'].index(PAGE_MODELISATION))
+	widgets = await executer(ws, etats, mesures, 'page')
+	try:
+		etats[trouver(widgets, 'checkbox', 'Implémentation du modèle')['id']] = ('bool_value', True)
+		widgets = await executer(ws, etats, mesures, 'page')
+		for w in widgets:
+			if w['genre'] == 'selectbox' and w['options']:
+				etats[w['id']] = ('int_value', rng.randrange(min(len(w['options']), 30)))
+		bouton = trouver(widgets, 'button', 'Prédire')
+		await executer(ws, dict(etats, **{bouton['id']: ('trigger_value', True)}), mesures, 'prediction')
+	# page de modélisation en erreur (modèle illisible...) : prédiction comptée en échec, la session continue
+	except LookupError as e:
+		noter(mesures, 'prediction', erreur=repr(e))
+	etats[menu['id']] = ('int_value', menu['options'].index(PAGE_ANALYSE))
+	return await executer(ws, etats, mesures, 'page')
+
+
+# une session : page d'analyse, choix d'une année, recherches, graphiques ouverts et fermés, prédictions
+async def session(port, graine, annees, fin, pause, mesures):
+	rng = random.Random(graine)
+	try:
+		ws = await connecter(port)
+	except Exception as e:
+		noter(mesures, 'connexion', erreur=repr(e))
+		return
+	etats, ouverts = {}, []
+	try:
+		widgets = await executer(ws, etats, mesures, 'ouverture')
+		menu = trouver(widgets, 'radio', options={PAGE_ANALYSE, PAGE_MODELISATION})
+		etats[menu['id']] = ('int_value', menu['options'].index(PAGE_ANALYSE))
+		widgets = await executer(ws, etats, mesures, 'page')
+		annee = trouver(widgets, 'selectbox', options={str(a) for a in annees})
+		recherche = trouver(widgets, 'text_input')
+		etats[annee['id']] = ('int_value', annee['options'].index(str(rng.choice(annees))))
+		while time.monotonic() < fin:
+			tirage = rng.random()
+			if tirage < 0.1:
+				etats[annee['id']] = ('int_value', annee['options'].index(str(rng.choice(annees))))
+				widgets = await executer(ws, etats, mesures, 'annee')
+			elif tirage < 0.8:
+				etats[recherche['id']] = ('string_value', rng.choice(MOTS))
+				widgets = await executer(ws, etats, mesures, 'recherche')
+				cases = [w for w in widgets if w['genre'] == 'checkbox' and w['label'] in TITRES]
+				if cases:
+					case = rng.choice(cases)
+					if case['id'] not in ouverts:
+						ouverts.append(case['id'])
+						etats[case['id']] = ('bool_value', True)
+						if len(ouverts) > OUVERTS:
+							etats[ouverts.pop(0)] = ('bool_value', False)
+					widgets = await executer(ws, etats, mesures, 'graphique')
+			else:
+				widgets = await predire(ws, etats, menu, rng, mesures)
+			await asyncio.sleep(rng.expovariate(1 / pause) if pause else 0)
+	except Exception as e:
+		noter(mesures, 'session', erreur=repr(e))
+	finally:
+		ws.close()
+
+
+# mémoire résidente du serveur échantillonnée pendant le test
+async def echantillonner_memoire(pid, memoire, fin, periode=0.2):
+	while time.monotonic() < fin:
+		rss = metriques.rss_mo(pid)
+		if rss is not None:
+			memoire.append(rss)
+		await asyncio.sleep(periode)
+
+
+async def _sessions(n, port, pid, duree, pause, annees, graine, mesures, memoire):
+	fin = time.monotonic() + duree
+	echantillonneur = asyncio.ensure_future(echantillonner_memoire(pid, memoire, fin + REEXECUTION))
+	await asyncio.gather(*[session(port, graine + i, annees, fin, pause, mesures) for i in range(n)])
+	echantillonneur.cancel()
+
+
+def resumer(mesures, duree):
+	lignes = {}
+	for action in sorted(set(mesures['durees']) | set(mesures['erreurs'])):
+		durees = np.array(mesures['durees'].get(action, []))
+		ligne = {'n': len(durees), 'erreurs': len(mesures['erreurs'].get(action, [])), 'par_seconde': round(len(durees) / duree, 2)}
+		if len(durees):
+			ligne.update({'p{}_ms'.format(c): round(float(np.percentile(durees, c)) * 1000, 1) for c in CENTILES})
+			ligne['max_ms'] = round(float(durees.max()) * 1000, 1)
+		lignes[action] = ligne
+	return lignes
+
+
+# un palier : nouveau serveur (caches et mémoire de départ d'un serveur neuf), n sessions simultanées
+def lancer_palier(n, duree, pause, annees, graine):
+	port = port_libre()
+	serveur = demarrer_serveur(port)
+	try:
+		mesures = nouvelles_mesures()
+		memoire = [metriques.rss_mo(serveur.pid)]
+		debut = time.perf_counter()
+		asyncio.run(_sessions(n, port, serveur.pid, duree, pause, annees, graine, mesures, memoire))
+		ecoule = time.perf_counter() - debut
+	finally:
+		arreter_serveur(serveur)
+	memoire = [m for m in memoire if m is not None]
+	actions = resumer(mesures, ecoule)
+	return {
+		'sessions': n,
+		'secondes': round(ecoule, 1),
+		'actions_par_seconde': round(sum(a['n'] for k, a in actions.items() if k != 'premier_affichage') / ecoule, 2),
+		'memoire_serveur_mo': {'debut': memoire[0], 'pic': max(memoire), 'fin': memoire[-1]} if memoire else None,
+		'actions': actions,
+		'erreurs': {action: sorted(set(e))[:3] for action, e in mesures['erreurs'].items()},
+		}
+
+
+# jeu synthétique des années demandées dans le dossier de travail (courant), construit s'il manque
+def preparer_donnees(annees, echelle):
+	manquantes = [annee for annee in annees if not entrepot.existe(annee)]
+	for annee in manquantes:
+		synthetique.generer(annee, echelle, DOSSIER_BRUT)
+	if manquantes:
+		rafraichir.rafraichir(manquantes, telecharger=False)
+
+
+# plus grand nombre de sessions dont le premier affichage reste sous le seuil (95e centile)
+def capacite(paliers, seuil=SEUIL):
+	tenus = [p['sessions'] for p in paliers
+			 if p['actions'].get('premier_affichage', {}).get('p95_ms', float('inf')) <= seuil * 1000]
+	return max(tenus) if tenus else 0
+
+
+def lancer(sessions=SESSIONS, duree=DUREE, pause=PAUSE, annees=ANNEES, echelle=ECHELLE, dossier='charge', graine=0, seuil=SEUIL):
+	depart = os.getcwd()
+	os.makedirs(dossier, exist_ok=True)
+	for fichier in bench.FICHIERS_CODE:
+		lien = os.path.join(dossier, fichier)
+		if not os.path.exists(lien):
+			os.symlink(os.path.join(bench.DOSSIER_CODE, fichier), lien)
+	os.chdir(dossier)
+	try:
+		preparer_donnees(annees, echelle)
+		# jamais le serveur distant : toutes les années doivent être dans l'entrepôt local
+		assert all(donnees.local(annee) for annee in annees)
+		paliers = []
+		for n in sessions:
+			paliers.append(lancer_palier(n, duree, pause, annees, graine))
+			print('(done) {} sessions : {} actions/s'.format(n, paliers[-1]['actions_par_seconde']))
+	finally:
+		os.chdir(depart)
+	return {'machine': bench.machine(), 'annees': annees, 'echelle': echelle, 'pause': pause,
+			'seuil_s': seuil, 'capacite': capacite(paliers, seuil), 'paliers': paliers}
+
+
+def tableau(resultats):
+	lignes = []
+	for p in resultats['paliers']:
+		for action, a in p['actions'].items():
+			lignes.append(dict(sessions=p['sessions'], action=action, **a))
+	return pd.DataFrame(lignes).set_index(['sessions', 'action'])
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="Test de charge : sessions simultanées sur un serveur streamlit de l'application")
+	parser.add_argument('--sessions', nargs='+', type=int, default=SESSIONS, help='nombres de sessions simultanées à tester')
+	parser.add_argument('--duree', type=float, default=DUREE, help='durée de chaque palier (s)')
+	parser.add_argument('--pause', type=float, default=PAUSE, help='temps de réflexion moyen entre deux actions (s)')
+	parser.add_argument('--annees', nargs='+', type=int, default=ANNEES)
+	parser.add_argument('--echelle', type=float, default=ECHELLE, help='taille relative à une année réelle')
+	parser.add_argument('--dossier', default='charge', help='dossier de travail (jeu synthétique réutilisé)')
+	parser.add_argument('--seuil', type=float, default=SEUIL, help='95e centile acceptable du premier affichage (s)')
+	parser.add_argument('--sortie', default='charge.json')
+	args = parser.parse_args()
+
+	resultats = lancer(args.sessions, args.duree, args.pause, args.annees, args.echelle, os.path.abspath(args.dossier), seuil=args.seuil)
+	with open(args.sortie, 'w') as f:
+		json.dump(resultats, f, indent=1)
+	pd.set_option('display.width', 200)
+	print(tableau(resultats).to_string())
+	print('(done) capacité du serveur : {} sessions (premier affichage p95 <= {} s), résultats dans {}'.format(resultats['capacite'], args.seuil, args.sortie))
@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import requests
+
+import entrepot
+import metriques
+import rafraichir
+from commun import DEPARTMENTS, DOSSIER_DATASET, DOSSIER_DERIVES, REGION_DEPARTEMENT, code_departement, mercator
+
+# contours des départements métropolitains (propriétés 'code' et 'nom')
+URL_GEOMETRIES = 'https://raw.githubusercontent.com/gregoiredavid/france-geojson/master/departements-version-simplifiee.geojson'
+CHEMIN_GEOMETRIES = os.path.join(DOSSIER_DATASET, 'geo', 'departements.json')
+DOSSIER_COMPTES = os.path.join(DOSSIER_DERIVES, 'departements')
+
+# tolérance de simplification des contours (en mètres, projection mercator)
+TOLERANCE = 1000
+
+MESURES = ['accidents', 'usagers', 'tués', 'blessés hospitalisés']
+
+
+# simplification de Douglas-Peucker d'un contour (tableau n x 2)
+def simplifier(points, tolerance=TOLERANCE):
+	if len(points) < 4:
+		return points
+	garder = np.zeros(len(points), dtype=bool)
+	garder[0] = garder[-1] = True
+	pile = [(0, len(points) - 1)]
+	while pile:
+		i, j = pile.pop()
+		if j <= i + 1:
+			continue
+		a, b = points[i], points[j]
+		segment = b - a
+		longueur = np.hypot(*segment)
+		milieu = points[i + 1:j] - a
+		if longueur == 0:
+			distances = np.hypot(milieu[:, 0], milieu[:, 1])
+		else:
+			distances = np.abs(segment[0] * milieu[:, 1] - segment[1] * milieu[:, 0]) / longueur
+		k = int(np.argmax(distances))
+		if distances[k] > tolerance:
+			garder[i + 1 + k] = True
+			pile.extend([(i, i + 1 + k), (i + 1 + k, j)])
+	return points[garder]
+
+
+# téléchargement, projection et simplification des contours, stockés localement une fois pour toutes
+def construire_geometries(url=URL_GEOMETRIES, chemin=CHEMIN_GEOMETRIES, tolerance=TOLERANCE):
+	geojson = requests.get(url, timeout=60).json()
+	departements = {}
+	for feature in geojson['features']:
+		geometrie = feature['geometry']
+		polygones = geometrie['coordinates'] if geometrie['type'] == 'MultiPolygon' else [geometrie['coordinates']]
+		contours = []
+		for polygone in polygones:
+			lonlat = np.asarray(polygone[0], dtype=float)
+			x, y = mercator(lonlat[:, 0], lonlat[:, 1])
+			contour = simplifier(np.column_stack([x, y]), tolerance)
+			if len(contour) >= 4:
+				contours.append(np.round(contour).astype(int).tolist())
+		departements[feature['properties']['code']] = contours
+	os.makedirs(os.path.dirname(chemin), exist_ok=True)
+	with open(chemin, 'w') as f:
+		json.dump(departements, f, separators=(',', ':'))
+	return departements
+
+
+@metriques.couche('choroplethe.geometries')
+@lru_cache(maxsize=1)
+def _charger_geometries(chemin, mtime):
+	with open(chemin, 'r') as f:
+		return json.load(f)
+
+
+def charger_geometries(chemin=CHEMIN_GEOMETRIES):
+	if not os.path.exists(chemin):
+		return None
+	return _charger_geometries(chemin, os.path.getmtime(chemin))
+
+
+def chemin(annee):
+	return os.path.join(DOSSIER_COMPTES, '{}.csv'.format(annee))
+
+
+# comptes par département d'une année, calculés au rafraîchissement
+@rafraichir.derive('departements')
+def construire_annee(annee):
+	accidents = entrepot.vue(annee, ['dep', 'grav_acc'], niveau='accident')
+	usagers = entrepot.vue(annee, ['dep', 'grav'])
+	codes = {dep: code_departement(dep) for dep in accidents['dep'].dropna().unique()}
+	comptes = pd.DataFrame({
+		'accidents': accidents['dep'].map(codes).value_counts(),
+		'usagers': usagers['dep'].map(codes).value_counts(),
+		'tués': usagers.loc[usagers['grav'] == 2, 'dep'].map(codes).value_counts(),
+		'blessés hospitalisés': usagers.loc[usagers['grav'] == 3, 'dep'].map(codes).value_counts(),
+		}).fillna(0).astype(int)
+	comptes.index.name = 'code'
+	os.makedirs(DOSSIER_COMPTES, exist_ok=True)
+	comptes.to_csv(chemin(annee) + '.tmp')
+	os.replace(chemin(annee) + '.tmp', chemin(annee))
+	return annee
+
+
+# années sans comptes par département (non construites ou en échec au rafraîchissement)
+def absentes(annees):
+	return [annee for annee in annees if not os.path.exists(chemin(annee))]
+
+
+# comptes par département (ou par région) cumulés sur plusieurs années ; les années absentes sont ignorées
+# (cf. absentes, à signaler avec le résultat)
+@metriques.instrumenter('agregat')
+def comptes(annees, niveau='departement'):
+	cumul = None
+	for annee in annees:
+		if not os.path.exists(chemin(annee)):
+			continue
+		c = pd.read_csv(chemin(annee), index_col='code', dtype={'code': str})
+		cumul = c if cumul is None else cumul.add(c, fill_value=0)
+	if cumul is None:
+		return None
+	cumul = cumul.astype(int)
+	if niveau == 'region':
+		cumul = cumul.groupby(cumul.index.map(REGION_DEPARTEMENT)).sum()
+		cumul.index.name = 'region'
+	else:
+		cumul.insert(0, 'departement', cumul.index.map(DEPARTMENTS))
+	return cumul
+
+
+# données des polygones (un par contour) colorés par la mesure du département ou de sa région
+@metriques.instrumenter('agregat')
+def polygones(geometries, comptes_niveau, mesure, niveau='departement'):
+	xs, ys, noms, valeurs = [], [], [], []
+	for code, contours in geometries.items():
+		cle = REGION_DEPARTEMENT.get(code) if niveau == 'region' else code
+		nom = cle if niveau == 'region' else DEPARTMENTS.get(code, code)
+		valeur = comptes_niveau[mesure].get(cle, 0)
+		for contour in contours:
+			contour = np.asarray(contour)
+			xs.append(contour[:, 0])
+			ys.append(contour[:, 1])
+			noms.append(nom)
+			valeurs.append(int(valeur))
+	return {'xs': xs, 'ys': ys, 'nom': noms, 'valeur': valeurs}
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Contours simplifiés des départements pour la carte choroplèthe')
+	parser.add_argument('--url', default=URL_GEOMETRIES)
+	parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='tolérance de simplification (m)')
+	args = parser.parse_args()
+
+	departements = construire_geometries(args.url, tolerance=args.tolerance)
+	print('(done) {} départements, {} points'.format(
+		len(departements), sum(len(c) for contours in departements.values() for c in contours)))
@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+
+# arborescence locale des données
+DOSSIER_DATASET = 'dataset'
+DOSSIER_BRUT = os.path.join(DOSSIER_DATASET, 'raw')
+
+# période étudiée
+ANNEES = list(range(2005, 2018))
+DOSSIER_ANNEES = os.path.join(DOSSIER_DATASET, 'annees')
+DOSSIER_DERIVES = os.path.join(DOSSIER_DATASET, 'derives')
+
+# colonnes dont les NaN sont remplacés par le mode
+nan_mode_cols = ['place','secu','lartpc','larrout','env1','infra','situ','vosp','nbv','plan','prof',
+				 'surf','circ','actp','locp','etatp','an_nais','obsm','obs','trajet',
+				 'manv','choc','senc','atm']
+
+# colonnes aux modalités erratiques, supprimées
+colonnes_supprimees = ['v2','v1','gps','pr1','pr','adr','voie']
+
+# départements et régions français
+# (d'après https://gist.github.com/mlorant/b4d7bb6f96c47776c8082cf7af44ad95)
+DEPARTMENTS = {
+	'01': 'Ain', '02': 'Aisne', '03': 'Allier', '04': 'Alpes-de-Haute-Provence', '05': 'Hautes-Alpes',
+	'06': 'Alpes-Maritimes', '07': 'Ardèche', '08': 'Ardennes', '09': 'Ariège', '10': 'Aube',
+	'11': 'Aude', '12': 'Aveyron', '13': 'Bouches-du-Rhône', '14': 'Calvados', '15': 'Cantal',
+	'16': 'Charente', '17': 'Charente-Maritime', '18': 'Cher', '19': 'Corrèze', '2A': 'Corse-du-Sud',
+	'2B': 'Haute-Corse', '21': "Côte-d'Or", '22': "Côtes-d'Armor", '23': 'Creuse', '24': 'Dordogne',
+	'25': 'Doubs', '26': 'Drôme', '27': 'Eure', '28': 'Eure-et-Loir', '29': 'Finistère',
+	'30': 'Gard', '31': 'Haute-Garonne', '32': 'Gers', '33': 'Gironde', '34': 'Hérault',
+	'35': 'Ille-et-Vilaine', '36': 'Indre', '37': 'Indre-et-Loire', '38': 'Isère', '39': 'Jura',
+	'40': 'Landes', '41': 'Loir-et-Cher', '42': 'Loire', '43': 'Haute-Loire', '44': 'Loire-Atlantique',
+	'45': 'Loiret', '46': 'Lot', '47': 'Lot-et-Garonne', '48': 'Lozère', '49': 'Maine-et-Loire',
+	'50': 'Manche', '51': 'Marne', '52': 'Haute-Marne', '53': 'Mayenne', '54': 'Meurthe-et-Moselle',
+	'55': 'Meuse', '56': 'Morbihan', '57': 'Moselle', '58': 'Nièvre', '59': 'Nord',
+	'60': 'Oise', '61': 'Orne', '62': 'Pas-de-Calais', '63': 'Puy-de-Dôme', '64': 'Pyrénées-Atlantiques',
+	'65': 'Hautes-Pyrénées', '66': 'Pyrénées-Orientales', '67': 'Bas-Rhin', '68': 'Haut-Rhin', '69': 'Rhône',
+	'70': 'Haute-Saône', '71': 'Saône-et-Loire', '72': 'Sarthe', '73': 'Savoie', '74': 'Haute-Savoie',
+	'75': 'Paris', '76': 'Seine-Maritime', '77': 'Seine-et-Marne', '78': 'Yvelines', '79': 'Deux-Sèvres',
+	'80': 'Somme', '81': 'Tarn', '82': 'Tarn-et-Garonne', '83': 'Var', '84': 'Vaucluse',
+	'85': 'Vendée', '86': 'Vienne', '87': 'Haute-Vienne', '88': 'Vosges', '89': 'Yonne',
+	'90': 'Territoire de Belfort', '91': 'Essonne', '92': 'Hauts-de-Seine', '93': 'Seine-Saint-Denis', '94': 'Val-de-Marne',
+	'95': "Val-d'Oise", '971': 'Guadeloupe', '972': 'Martinique', '973': 'Guyane', '974': 'La Réunion',
+	'976': 'Mayotte',
+}
+
+REGIONS = {
+	'Auvergne-Rhône-Alpes': ['01', '03', '07', '15', '26', '38', '42', '43', '63', '69', '73', '74'],
+	'Bourgogne-Franche-Comté': ['21', '25', '39', '58', '70', '71', '89', '90'],
+	'Bretagne': ['22', '29', '35', '56'],
+	'Centre-Val de Loire': ['18', '28', '36', '37', '41', '45'],
+	'Corse': ['2A', '2B'],
+	'Grand Est': ['08', '10', '51', '52', '54', '55', '57', '67', '68', '88'],
+	'Guadeloupe': ['971'],
+	'Guyane': ['973'],
+	'Hauts-de-France': ['02', '59', '60', '62', '80'],
+	'Île-de-France': ['75', '77', '78', '91', '92', '93', '94', '95'],
+	'La Réunion': ['974'],
+	'Martinique': ['972'],
+	'Mayotte': ['976'],
+	'Normandie': ['14', '27', '50', '61', '76'],
+	'Nouvelle-Aquitaine': ['16', '17', '19', '23', '24', '33', '40', '47', '64', '79', '86', '87'],
+	'Occitanie': ['09', '11', '12', '30', '31', '32', '34', '46', '48', '65', '66', '81', '82'],
+	'Pays de la Loire': ['44', '49', '53', '72', '85'],
+	"Provence-Alpes-Côte d'Azur": ['04', '05', '06', '13', '83', '84'],
+}
+
+REGION_DEPARTEMENT = {dep: region for region, deps in REGIONS.items() for dep in deps}
+
+
+# code département INSEE à partir du champ 'dep' des fichiers BAAC 2005-2017
+# ('590' -> '59', '201' -> '2A', '202' -> '2B', '971' -> '971')
+def code_departement(dep):
+	try:
+		dep = int(dep)
+	except (TypeError, ValueError):
+		return str(dep).upper() if str(dep).upper() in DEPARTMENTS else None
+	if dep >= 971:
+		return str(dep)
+	if dep in (201, 202):
+		return '2A' if dep == 201 else '2B'
+	return str(dep // 10).zfill(2)
+
+
+# conversion du CRS en mercator (lat/long en degrés)
+def mercator(long, lat):
+	k = 6378137
+	x = long * (k * np.pi / 180.0)
+	y = np.log(np.tan((90 + lat) * np.pi / 360.0)) * k
+	return x, y
@@ -0,0 +1,289 @@
+from datetime import date
+from functools import lru_cache
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import choroplethe
+import densite
+import donnees
+import graphiques
+import metriques
+import points_noirs
+import series
+
+# comparaison de deux années (ou de deux périodes) pour un graphique du registre : les comptes qu'il représente
+# sont ventilés selon ses dimensions (graphiques.enregistrer) et par gravité ou par mesure, année par année,
+# depuis l'agrégat dont il est calculé. Ces comptes partiels sont gardés en cache et additionnés sur chaque
+# période : deux années ne sont jamais chargées en même temps, et une comparaison déjà vue ne coûte que
+# la fusion de quelques tableaux.
+#
+# Chaque compte partiel porte sa variance : somme des carrés des poids de l'échantillon (le nombre lui-même
+# pour un compte exact, variabilité de Poisson d'une année à l'autre). L'écart entre les deux périodes
+# (en moyenne annuelle) est marqué significatif selon son écart réduit.
+LIBELLES_GRAVITE = {1: 'Indemne', 2: 'Tué', 3: 'Blessé hospitalisé', 4: 'Blessé léger'}
+
+# seuils de l'écart réduit (bilatéral : 5 %, 1 %, 0,1 %) et marques correspondantes
+SEUILS = [(3.29, '***'), (2.58, '**'), (1.96, '*')]
+
+# dimensions calculées : colonne de l'échantillon lue et regroupement de ses valeurs
+DIMENSIONS = {
+	'heure': ('hrmn', lambda s: (pd.to_numeric(s, errors='coerce') // 100).astype('Int64')),
+	'age': ('age', lambda s: (s // 10 * 10).clip(0, 90).astype('Int64')),
+	}
+
+# paramètres des graphiques pris en compte, par agrégat
+PARAMETRES = {
+	'densite': ['filtre'],
+	'series': ['mesure', 'regions'],
+	'choroplethe': ['niveau'],
+	'points_noirs': ['minimum', 'nombre'],
+	}
+
+# grappes comparées au plus (les plus chargées sur les deux périodes)
+GRAPPES = 50
+# barres de la figure au plus (les écarts réduits les plus forts)
+BARRES = 40
+
+
+def _long(cles, n, var=None):
+	df = pd.DataFrame(cles)
+	df['n'] = np.asarray(n, dtype=float)
+	df['var'] = df['n'] if var is None else np.asarray(var, dtype=float)
+	return df
+
+
+# comptes d'un échantillon par dimensions et gravité (pondérés par 'poids')
+def _echantillon(annee, palier, dimensions, filtre=None):
+	lues = ['grav'] + [DIMENSIONS.get(d, (d,))[0] for d in dimensions]
+	filtre = densite.FILTRES.get(filtre)
+	if filtre is not None:
+		lues.append(filtre[0])
+	df = donnees.preprocess(annee, palier, list(dict.fromkeys(lues)))
+	if filtre is not None:
+		df = df[df[filtre[0]] == filtre[1]]
+	cles = {d: DIMENSIONS[d][1](df[DIMENSIONS[d][0]]) if d in DIMENSIONS else df[d] for d in dimensions}
+	cles['grav'] = df['grav']
+	poids = df['poids'].to_numpy(dtype=float)
+	groupes = pd.DataFrame(cles).assign(n=poids, var=poids ** 2).groupby(dimensions + ['grav'], observed=True).sum().reset_index()
+	groupes['grav'] = groupes['grav'].map(LIBELLES_GRAVITE)
+	return groupes.rename(columns={'grav': 'mesure'})
+
+
+# histogrammes exacts de l'heure ou de l'âge, regroupés par heure ou par tranche de 10 ans
+def _densite(annee, dimensions, filtre=None):
+	dimension = dimensions[0]
+	histos = densite.histogrammes(annee, filtre=densite.FILTRES.get(filtre))[dimension]
+	bins = np.arange(histos.shape[1])
+	valeurs = bins // 60 if dimension == 'heure' else np.minimum(bins // 10 * 10, 90)
+	morceaux = []
+	for i, g in enumerate(densite.GRAVITES):
+		n = pd.Series(histos[i]).groupby(valeurs).sum()
+		morceaux.append(_long({dimension: n.index, 'mesure': LIBELLES_GRAVITE[g]}, n.to_numpy()))
+	return pd.concat(morceaux, ignore_index=True)
+
+
+# vue par accident : gravité de l'accident
+def _accidents(annee, dimensions):
+	df = donnees.accidents(annee, dimensions)
+	n = df.groupby(dimensions + ['grav_acc'], observed=True).size()
+	cles = {d: n.index.get_level_values(d) for d in dimensions}
+	cles['mesure'] = n.index.get_level_values('grav_acc').map(LIBELLES_GRAVITE)
+	return _long(cles, n.to_numpy())
+
+
+# cubes quotidiens : jours de l'année regroupés par mois ou par jour de la semaine
+def _series(annee, dimensions, mesure='accidents', regions=None):
+	cubes = series.charger()
+	if cubes is None:
+		return None
+	nom, gravites = series.MESURES[mesure]
+	i = (date(annee, 1, 1) - cubes['debut']).days
+	jours = pd.date_range(date(annee, 1, 1), date(annee, 12, 31))
+	if i < 0 or i + len(jours) > len(cubes[nom]) or annee not in cubes['annees']:
+		return None
+	cube = cubes[nom][i:i + len(jours)]
+	if regions:
+		cube = cube[:, [series.LISTE_REGIONS.index(r) for r in regions], :]
+	cube = cube.sum(axis=1, dtype=np.int64)
+	cle = jours.month if dimensions[0] == 'mois' else pd.Categorical(jours.day_name(), ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday'], ordered=True)
+	morceaux = []
+	for g in gravites:
+		n = pd.Series(cube[:, series.GRAVITES.index(g)]).groupby(cle, observed=True).sum()
+		morceaux.append(_long({dimensions[0]: n.index, 'mesure': LIBELLES_GRAVITE[g]}, n.to_numpy()))
+	return pd.concat(morceaux, ignore_index=True)
+
+
+# comptes par département (ou région) : une ligne par mesure
+def _choroplethe(annee, niveau='departement'):
+	comptes = choroplethe.comptes([annee], niveau)
+	if comptes is None:
+		return None
+	if niveau == 'departement':
+		comptes = comptes.set_index('departement')
+	morceaux = [_long({niveau: comptes.index, 'mesure': mesure}, comptes[mesure].to_numpy()) for mesure in choroplethe.MESURES]
+	return pd.concat(morceaux, ignore_index=True)
+
+
+# accidents graves de l'année dans les grappes de l'ensemble des deux périodes
+def _points_noirs(annee, union, minimum=points_noirs.MINIMUM, nombre=GRAPPES):
+	grappes = points_noirs.points_noirs(union, minimum, min(nombre, GRAPPES))
+	if grappes is None or str(annee) not in grappes.columns:
+		return None
+	libelles = ['{} ({:.4f}, {:.4f})'.format(rang, lat, long) for rang, lat, long in zip(grappes.index, grappes['latitude'], grappes['longitude'])]
+	return _long({'grappe': libelles, 'mesure': 'accidents graves'}, grappes[str(annee)].to_numpy())
+
+
+# source des comptes d'une année : échantillon du palier ou agrégat exact du graphique
+def source(graphique, annee):
+	return 'echantillon' if graphiques.echantillon(graphique, annee) else graphiques.declarations[graphique]['agregat']
+
+
+# comptes partiels d'une année (None si l'agrégat manque) ; palier None pour un agrégat exact
+@metriques.couche('comparaison.partiels')
+@lru_cache(maxsize=256)
+def _partiel(agregat, dimensions, annee, palier, parametres, union):
+	dimensions, parametres = list(dimensions), dict(parametres)
+	if agregat == 'echantillon':
+		return _echantillon(annee, palier, dimensions, **parametres)
+	if agregat == 'densite':
+		return _densite(annee, dimensions, **parametres)
+	if agregat == 'accidents':
+		return _accidents(annee, dimensions)
+	if agregat == 'series':
+		return _series(annee, dimensions, **parametres)
+	if agregat == 'choroplethe':
+		return _choroplethe(annee, **parametres)
+	return _points_noirs(annee, union, **parametres)
+
+
+def partiel(graphique, annee, palier, parametres, union):
+	declaration = graphiques.declarations[graphique]
+	agregat = source(graphique, annee)
+	# paramètres utiles à l'agrégat, sous forme hachable (les régions choisies sont une liste)
+	utiles = tuple((cle, tuple(valeur) if isinstance(valeur, list) else valeur)
+				   for cle, valeur in sorted(parametres.items()) if cle in PARAMETRES.get(declaration['agregat'], []))
+	return _partiel(agregat, tuple(declaration['dimensions']), annee, palier if agregat == 'echantillon' else None,
+					utiles, union if agregat == 'points_noirs' else None)
+
+
+# comptes d'une période en moyenne annuelle (variance de la moyenne) et années sans agrégat ;
+# comptes None dès qu'une année manque (une moyenne sur une partie de la période serait trompeuse)
+def fusionner(graphique, annees, palier, parametres, union):
+	partiels = {annee: partiel(graphique, annee, palier, parametres, union) for annee in annees}
+	absentes = [annee for annee, p in partiels.items() if p is None]
+	if absentes:
+		return None, absentes
+	partiels = list(partiels.values())
+	cles = [c for c in partiels[0].columns if c not in ('n', 'var')]
+	total = pd.concat(partiels, ignore_index=True).groupby(cles, observed=True, sort=False)[['n', 'var']].sum()
+	return total.assign(n=total['n'] / len(partiels), var=total['var'] / len(partiels) ** 2), []
+
+
+def libelle(periode):
+	debut, fin = periode
+	return str(debut) if debut == fin else '{}-{}'.format(debut, fin)
+
+
+# une comparaison n'est affinée palier après palier que si l'une de ses années est lue dans l'échantillon
+def exacte(graphique, periode_a, periode_b):
+	annees = set(range(periode_a[0], periode_a[1] + 1)) | set(range(periode_b[0], periode_b[1] + 1))
+	return all(source(graphique, annee) != 'echantillon' for annee in annees)
+
+
+def marque(z):
+	for seuil, signe in SEUILS:
+		if abs(z) >= seuil:
+			return signe
+	return ''
+
+
+# tableau de comparaison : comptes des deux périodes (moyennes annuelles), écarts absolu et relatif,
+# écart réduit et marque de significativité. Lignes 'Ensemble' : total de chaque mesure sur les dimensions
+# et, si les mesures sont des gravités, total des gravités pour chaque valeur des dimensions
+def tableau(a, b, libelle_a, libelle_b):
+	comptes = pd.concat([a, b], axis=1, keys=['a', 'b']).fillna(0)
+	noms = comptes.index.names
+	comptes.index = pd.MultiIndex.from_tuples([tuple(str(v) for v in (cle if isinstance(cle, tuple) else (cle,))) for cle in comptes.index], names=noms)
+	dimensions = noms[:-1]
+	morceaux = [comptes]
+	if len(set(comptes.index.get_level_values('mesure')) & set(LIBELLES_GRAVITE.values())) > 1:
+		gravites = comptes.groupby(level=dimensions, sort=False).sum() if dimensions else comptes.sum().to_frame().T
+		gravites.index = pd.MultiIndex.from_tuples([(cle if isinstance(cle, tuple) else (cle,))[:len(dimensions)] + ('Ensemble',) for cle in gravites.index], names=noms)
+		morceaux.append(gravites)
+	comptes = pd.concat(morceaux)
+	if dimensions:
+		ensemble = comptes.groupby(level='mesure', sort=False).sum()
+		ensemble.index = pd.MultiIndex.from_tuples([('Ensemble',) * len(dimensions) + (m,) for m in ensemble.index], names=noms)
+		# totaux des gravités à la suite de leur valeur des dimensions, dans l'ordre des comptes
+		valeurs = comptes.index.droplevel('mesure')
+		rang = pd.Index(valeurs.unique()).get_indexer(valeurs)
+		comptes = pd.concat([ensemble, comptes.iloc[np.argsort(rang, kind='stable')]])
+	ecart = comptes[('b', 'n')] - comptes[('a', 'n')]
+	ecart_type = np.sqrt(comptes[('a', 'var')] + comptes[('b', 'var')])
+	z = (ecart / ecart_type.where(ecart_type > 0)).fillna(0)
+	return pd.DataFrame({
+		libelle_a: comptes[('a', 'n')].round(1),
+		libelle_b: comptes[('b', 'n')].round(1),
+		'écart': ecart.round(1),
+		'écart (%)': (100 * ecart / comptes[('a', 'n')].where(comptes[('a', 'n')] > 0)).round(1),
+		'écart réduit': z.round(2),
+		'significatif': z.map(marque),
+		})
+
+
+# écarts relatifs de la mesure principale par valeur des dimensions, barres colorées si significatifs
+def figure(table, principale, titre):
+	dimensions = table.index.names[:-1]
+	if not dimensions:
+		return None
+	lignes = table[(table.index.get_level_values('mesure') == principale) & (table.index.get_level_values(0) != 'Ensemble')]
+	if len(lignes) <= 1:
+		return None
+	if len(lignes) > BARRES:
+		lignes = lignes.loc[lignes['écart réduit'].abs().sort_values(ascending=False).index[:BARRES]]
+	couleurs = ['grey' if not signe else ('tab:red' if e > 0 else 'tab:green') for signe, e in zip(lignes['significatif'], lignes['écart'])]
+	etiquettes = [' / '.join(cle[:-1]) for cle in lignes.index]
+	fig, ax = plt.subplots(figsize=(10, max(3, 0.3 * len(lignes))))
+	ax.barh(range(len(lignes)), lignes['écart (%)'].fillna(0), color=couleurs)
+	ax.set_yticks(range(len(lignes)))
+	ax.set_yticklabels(etiquettes)
+	ax.invert_yaxis()
+	ax.axvline(0, color='black', linewidth=0.8)
+	ax.set_xlabel('écart relatif (%) : ' + ('toutes gravités' if principale == 'Ensemble' else principale))
+	ax.set_title(titre)
+	fig.tight_layout()
+	return fig
+
+
+# comparaison d'un graphique entre deux périodes (debut, fin) : figure des écarts et tableau
+@metriques.instrumenter('agregat')
+def comparer(graphique, periode_a, periode_b, palier=None, **parametres):
+	union = tuple(range(min(periode_a[0], periode_b[0]), max(periode_a[1], periode_b[1]) + 1))
+	a, absentes_a = fusionner(graphique, range(periode_a[0], periode_a[1] + 1), palier, parametres, union)
+	b, absentes_b = fusionner(graphique, range(periode_b[0], periode_b[1] + 1), palier, parametres, union)
+	absentes = sorted(set(absentes_a) | set(absentes_b))
+	if absentes:
+		return ("Comparaison non disponible : agrégats absents pour " + ', '.join(str(a) for a in absentes)
+				+ " (lancer `python rafraichir.py`).")
+	if a.empty and b.empty:
+		return 'Aucun compte à comparer sur ces périodes.'
+	libelle_a, libelle_b = libelle(periode_a), libelle(periode_b)
+	if libelle_a == libelle_b:
+		libelle_a, libelle_b = libelle_a + ' (A)', libelle_b + ' (B)'
+	table = tableau(a, b, libelle_a, libelle_b)
+	resultat = []
+	mesures = list(table.index.get_level_values('mesure'))
+	principale = 'Ensemble' if 'Ensemble' in mesures else parametres.get('mesure') if parametres.get('mesure') in mesures else mesures[0]
+	titre = graphiques.declarations[graphique]['titre'] + ' : ' + libelle_b + ' comparé à ' + libelle_a
+	with graphiques.VERROU:
+		fig = figure(table, principale, titre)
+	if fig is not None:
+		resultat.append(fig)
+	if periode_a[0] != periode_a[1] or periode_b[0] != periode_b[1]:
+		resultat.append('Comptes en moyenne annuelle sur chaque période. * : écart significatif à 5 %, ** : à 1 %, *** : à 0,1 %.')
+	else:
+		resultat.append('* : écart significatif à 5 %, ** : à 1 %, *** : à 0,1 %.')
+	resultat.append(table)
+	return resultat
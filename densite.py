@@ -0,0 +1,116 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+
+import entrepot
+import metriques
+import rafraichir
+from commun import DOSSIER_DERIVES
+
+DOSSIER_DENSITES = os.path.join(DOSSIER_DERIVES, 'densites')
+
+GRAVITES = [1, 2, 3, 4]
+
+# résolution des histogrammes : la minute pour l'heure, l'année pour l'âge
+BINS = {'heure': 24 * 60, 'age': 121}
+
+# filtres proposés sur les graphiques de densité
+FILTRES = {
+	'Tous les usagers': None,
+	'Hommes': ('sexe', 1),
+	'Femmes': ('sexe', 2),
+	'Conducteurs': ('catu', 1),
+	'Passagers': ('catu', 2),
+	'Piétons': ('catu', 3),
+	}
+
+COLONNES = ['grav', 'hrmn', 'an', 'an_nais', 'sexe', 'catu']
+
+
+# histogrammes par gravité (4 x bins) de l'heure (en minutes) et de l'âge
+# (pondérés par la colonne 'poids' d'un échantillon stratifié si elle est présente)
+def calculer(df, filtre=None):
+	if filtre is not None:
+		col, valeur = filtre
+		df = df[df[col] == valeur]
+	grav = df['grav'].to_numpy()
+	poids = df['poids'].to_numpy() if 'poids' in df.columns else None
+	hrmn = np.nan_to_num(df['hrmn'].to_numpy().astype(float), nan=-1).astype(int)
+	minutes = np.where(hrmn >= 0, (hrmn // 100) * 60 + hrmn % 100, -1)
+	an = df['an'].to_numpy().astype(int)
+	age = np.where(an < 100, an + 2000, an) - df['an_nais'].to_numpy()
+	histos = {}
+	for nom, valeurs in (('heure', minutes), ('age', age)):
+		valides = (valeurs >= 0) & (valeurs < BINS[nom])
+		histos[nom] = np.zeros((len(GRAVITES), BINS[nom]), dtype=np.int64 if poids is None else np.float64)
+		for i, g in enumerate(GRAVITES):
+			masque = valides & (grav == g)
+			histos[nom][i] = np.bincount(valeurs[masque].astype(int),
+				weights=None if poids is None else poids[masque], minlength=BINS[nom])
+	return histos
+
+
+def chemin(annee):
+	return os.path.join(DOSSIER_DENSITES, '{}.npz'.format(annee))
+
+
+# histogrammes complets d'une année, précalculés au rafraîchissement
+@rafraichir.derive('densites')
+def construire_annee(annee):
+	histos = calculer(entrepot.vue(annee, COLONNES))
+	os.makedirs(DOSSIER_DENSITES, exist_ok=True)
+	np.savez_compressed(chemin(annee) + '.tmp.npz', **histos)
+	os.replace(chemin(annee) + '.tmp.npz', chemin(annee))
+	return annee
+
+
+# histogrammes d'une année : précalculés, sinon depuis l'entrepôt, sinon depuis le df fourni (échantillon)
+@metriques.instrumenter('agregat')
+def histogrammes(annee, df=None, filtre=None):
+	if filtre is None and os.path.exists(chemin(annee)):
+		with np.load(chemin(annee)) as f:
+			return {nom: f[nom] for nom in BINS}
+	if entrepot.existe(annee):
+		return _calculer_entrepot(annee, filtre)
+	return calculer(df, filtre)
+
+
+@metriques.couche('densite.histogrammes')
+@lru_cache(maxsize=16)
+def _calculer_entrepot(annee, filtre):
+	return calculer(entrepot.vue(annee, COLONNES), filtre)
+
+
+# lissage gaussien d'un histogramme par convolution (FFT), circulaire pour l'heure
+def lisser(histo, sigma, circulaire=False):
+	n = len(histo)
+	taille = n if circulaire else 2 * n
+	x = np.arange(taille)
+	x = np.minimum(x, taille - x)
+	noyau = np.exp(-0.5 * (x / sigma) ** 2)
+	noyau /= noyau.sum()
+	lisse = np.fft.irfft(np.fft.rfft(histo, taille) * np.fft.rfft(noyau, taille), taille)[:n]
+	return np.clip(lisse, 0, None)
+
+
+# largeur de bande (règle de Scott) estimée sur l'histogramme
+def largeur_bande(histo):
+	n = histo.sum()
+	if n < 2:
+		return 1.0
+	x = np.arange(len(histo))
+	moyenne = (x * histo).sum() / n
+	ecart = np.sqrt(((x - moyenne) ** 2 * histo).sum() / n)
+	return max(ecart * n ** (-1 / 5), 1.0)
+
+
+# densités empilées par gravité, normalisées sur l'ensemble (comme kdeplot(hue='grav', multiple='stack'))
+def densites(histo, circulaire=False):
+	total = histo.sum()
+	if total == 0:
+		return np.zeros(histo.shape, dtype=float)
+	return np.vstack([
+		lisser(h.astype(float), largeur_bande(h), circulaire) / total
+		for h in histo
+		])
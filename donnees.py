@@ -0,0 +1,129 @@
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+import echantillons
+import entrepot
+import metriques
+import partage
+from commun import mercator
+from entrepot import RANG_GRAVITE
+
+# jeux de données annuels publiés en ligne (utilisés si l'ETL n'a pas été lancé localement)
+URL_DONNEES = os.environ.get('PYSECUROUTE_URL', 'https://www.jazzreal.org/static/')
+
+
+# chargement du jeu de données d'une année (une ligne par usager) :
+# entrepôt local produit par etl.py, sinon le cloud
+def charger(annee, colonnes=None):
+	if entrepot.existe(annee):
+		return entrepot.vue(annee, colonnes)
+	df = _distant(annee)
+	return (df if colonnes is None else df[colonnes]).copy()
+
+
+# fichier distant gardé en mémoire : les paliers successifs d'une année ne le téléchargent qu'une fois
+@metriques.couche('donnees.distant')
+@lru_cache(maxsize=1)
+def _distant(annee):
+	return pd.read_csv(URL_DONNEES + 'df_' + str(annee) + '_v3.csv')
+
+
+def local(annee):
+	return entrepot.existe(annee)
+
+
+# échantillon stratifié par gravité d'un palier (cf. echantillons.PALIERS), colonne 'poids' en plus :
+# nombre d'usagers représentés par chaque ligne, pour que les comptages estiment ceux de l'année
+def charger_palier(annee, palier, colonnes=None):
+	if colonnes is not None and 'grav' not in colonnes:
+		colonnes = ['grav'] + list(colonnes)
+	paliers = entrepot.paliers(annee) if entrepot.existe(annee) else None
+	if paliers is not None:
+		df = entrepot.vue(annee, colonnes, palier=palier)
+		effectifs = paliers['effectifs']
+	else:
+		# entrepôt absent ou construit sans paliers : tirage en mémoire, même graine
+		df = charger(annee, colonnes)
+		tirage = echantillons.tirer(df['grav'], annee)
+		effectifs = echantillons.effectifs(df['grav'], tirage)
+		df = df[tirage <= palier].reset_index(drop=True)
+	df['poids'] = echantillons.poids(df['grav'], effectifs, palier)
+	return df
+
+
+# une ligne par accident, avec sa gravité (celle de l'usager le plus gravement atteint)
+@metriques.instrumenter('chargement')
+def accidents(annee, colonnes):
+	return _accidents(annee, tuple(colonnes))
+
+
+@metriques.couche('donnees.accidents')
+@lru_cache(maxsize=8)
+def _accidents(annee, colonnes):
+	colonnes = list(colonnes)
+	if entrepot.existe(annee):
+		return entrepot.vue(annee, ['grav_acc'] + colonnes, niveau='accident')
+	# sans entrepôt local : dédoublonnage des usagers par accident
+	df = charger(annee, ['Num_Acc', 'grav'] + colonnes)
+	rang = df['grav'].map(RANG_GRAVITE)
+	df = df.loc[rang.groupby(df['Num_Acc']).idxmax().dropna()]
+	return df.rename(columns={'grav': 'grav_acc'})[['grav_acc'] + colonnes].reset_index(drop=True)
+
+
+# colonnes calculées par preprocess et colonnes brutes dont elles dépendent
+DERIVEES = {
+	'date': ['an', 'mois', 'jour'],
+	'day': ['an', 'mois', 'jour'],
+	'age': ['an', 'an_nais'],
+	'x': ['long', 'lat'],
+	'y': ['long', 'lat'],
+	}
+
+
+# colonnes brutes à lire pour obtenir les colonnes demandées (None : toutes)
+def brutes(colonnes):
+	if colonnes is None:
+		return None
+	lues = []
+	for colonne in colonnes:
+		for brute in DERIVEES.get(colonne, [colonne]):
+			if brute not in lues and brute != 'poids':
+				lues.append(brute)
+	return lues
+
+
+# palier : 0 (1 %), 1 (10 %) ou 2 (année complète) ; colonnes : celles dont les graphiques ont besoin
+# (brutes ou calculées ci-dessous), toutes par défaut. Une année publiée en mémoire partagée (partage.py)
+# est renvoyée telle quelle, toutes colonnes, en lecture seule
+@metriques.instrumenter('chargement')
+def preprocess(annee, palier=len(echantillons.PALIERS) - 1, colonnes=None):
+	df = partage.attacher(annee, palier)
+	if df is not None:
+		return df
+	return preparer(annee, palier, colonnes)
+
+
+def preparer(annee, palier=len(echantillons.PALIERS) - 1, colonnes=None):
+	df = charger_palier(annee, palier, brutes(colonnes))
+
+	# gestion des dates (les partitions locales sont typées au plus juste : int8/int16)
+	dates = [c for c in ['an','mois','jour'] if c in df.columns]
+	df[dates] = df[dates].astype('int32')
+	if 'an' in df.columns:
+		df.an = df.an + 2000
+	if {'an','mois','jour'} <= set(df.columns):
+		df['date'] = pd.to_datetime((df.an*10000+df.mois*100+df.jour).apply(str), format='%Y%m%d', exact=False, errors='coerce')
+		df['day'] = pd.Categorical(df.date.dt.day_name(), ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday'], ordered=True)
+	if {'an','an_nais'} <= set(df.columns):
+		df['age'] = df.an - df.an_nais
+
+	if {'long','lat'} <= set(df.columns):
+		# conversion de la longitude en 'float64'
+		df['long'] = pd.to_numeric(df['long'], errors='coerce')
+
+		# conversion du CRS en mercator
+		df['x'], df['y'] = mercator(df['long'] / 100000, df['lat'] / 100000)
+
+	return df
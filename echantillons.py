@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+# paliers d'échantillonnage emboîtés : 1 % ⊂ 10 % ⊂ 100 %
+PALIERS = [0.01, 0.10, 1.0]
+LIBELLES = ['1 %', '10 %', '100 %']
+
+# effectif minimal conservé par gravité dans chaque palier (les tués sont rares)
+MINIMUM_STRATE = 200
+
+
+# palier de chaque ligne (0 = 1 %, 1 = 10 %, 2 = reste), tirage stratifié par gravité
+def tirer(grav, graine):
+	grav = pd.Series(grav).to_numpy()
+	rng = np.random.default_rng(graine)
+	paliers = np.full(len(grav), len(PALIERS) - 1, dtype=np.int8)
+	for g in pd.unique(grav[pd.notna(grav)]):
+		lignes = rng.permutation(np.flatnonzero(grav == g))
+		n = len(lignes)
+		for p in reversed(range(len(PALIERS) - 1)):
+			k = min(n, max(int(np.ceil(PALIERS[p] * n)), MINIMUM_STRATE))
+			paliers[lignes[:k]] = p
+	return paliers
+
+
+# effectifs cumulés par gravité : {gravité: [n palier 0, n paliers 0-1, n total]}
+def effectifs(grav, paliers):
+	comptes = pd.crosstab(pd.Series(grav).to_numpy(), np.asarray(paliers)) \
+		.reindex(columns=range(len(PALIERS)), fill_value=0).cumsum(axis=1)
+	return {int(g): [int(n) for n in ligne] for g, ligne in comptes.iterrows()}
+
+
+# poids de chaque ligne d'un palier : inverse de la fraction tirée dans sa gravité
+def poids(grav, effectifs_gravite, palier):
+	facteurs = {
+		g: n[-1] / n[palier] if n[palier] else 0.0
+		for g, n in effectifs_gravite.items()
+		}
+	return pd.Series(grav).map(facteurs).fillna(1.0).to_numpy(dtype=np.float64)
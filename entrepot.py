@@ -0,0 +1,200 @@
+import json
+import os
+import shutil
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import metriques
+from commun import DOSSIER_ANNEES
+
+# schéma en étoile : une table par niveau, reliées par des clés entières
+#   accidents (acc_id)          : caractéristiques + lieux + département/région + gravité de l'accident
+#   vehicules (veh_id, acc_id)  : véhicules impliqués
+#   usagers   (acc_id, veh_id)  : usagers impliqués (table maître de l'analyse)
+# les clés sont les positions des lignes : une jointure est un simple np.take
+# les usagers sont rangés par palier d'échantillonnage (paliers.json) : un palier = les premières lignes
+TABLES = ['usagers', 'vehicules', 'accidents']
+CLE = {'vehicules': 'veh_id', 'accidents': 'acc_id'}
+NIVEAUX = {'usager': 'usagers', 'vehicule': 'vehicules', 'accident': 'accidents'}
+
+# ordre de gravité croissante : 1 indemne < 4 blessé léger < 3 blessé hospitalisé < 2 tué
+RANG_GRAVITE = {1: 0, 4: 1, 3: 2, 2: 3}
+
+
+def dossier_annee(annee, dossier=DOSSIER_ANNEES):
+	return os.path.join(dossier, str(annee))
+
+
+def chemin(annee, table, dossier=DOSSIER_ANNEES):
+	return os.path.join(dossier_annee(annee, dossier), table + '.parquet')
+
+
+def existe(annee, dossier=DOSSIER_ANNEES):
+	return all(os.path.exists(chemin(annee, table, dossier)) for table in TABLES)
+
+
+def chemin_paliers(annee, dossier=DOSSIER_ANNEES):
+	return os.path.join(dossier_annee(annee, dossier), 'paliers.json')
+
+
+# usagers écrits palier par palier : chaque palier commence un nouveau groupe de lignes
+def _ecrire_par_paliers(df, fichier, bornes):
+	table = pa.Table.from_pandas(df, preserve_index=False)
+	with pq.ParquetWriter(fichier, table.schema) as writer:
+		debut = 0
+		for fin in bornes:
+			if fin > debut:
+				writer.write_table(table.slice(debut, fin - debut))
+			debut = fin
+
+
+# écriture des 3 tables d'une année (remplacement du dossier en une opération)
+# paliers : {'bornes': fin de chaque palier dans les usagers, 'effectifs': {gravité: effectifs cumulés}}
+def ecrire(annee, tables, dossier=DOSSIER_ANNEES, paliers=None):
+	final = dossier_annee(annee, dossier)
+	tmp, ancien = final + '.tmp', final + '.old'
+	shutil.rmtree(tmp, ignore_errors=True)
+	os.makedirs(tmp)
+	for table in TABLES:
+		fichier = os.path.join(tmp, table + '.parquet')
+		if table == 'usagers' and paliers is not None:
+			_ecrire_par_paliers(tables[table], fichier, paliers['bornes'])
+		else:
+			tables[table].to_parquet(fichier, index=False)
+	if paliers is not None:
+		with open(os.path.join(tmp, 'paliers.json'), 'w') as f:
+			json.dump(paliers, f)
+	shutil.rmtree(ancien, ignore_errors=True)
+	if os.path.exists(final):
+		os.replace(final, ancien)
+	os.replace(tmp, final)
+	shutil.rmtree(ancien, ignore_errors=True)
+
+
+@metriques.couche('entrepot.colonnes')
+@lru_cache(maxsize=256)
+def _colonnes(fichier, mtime):
+	return pq.read_schema(fichier).names
+
+
+# colonnes disponibles de chaque table
+def colonnes(annee, dossier=DOSSIER_ANNEES):
+	noms = {}
+	for table in TABLES:
+		fichier = chemin(annee, table, dossier)
+		noms[table] = [c for c in _colonnes(fichier, os.path.getmtime(fichier)) if c not in ('acc_id', 'veh_id')]
+	return noms
+
+
+# paliers d'échantillonnage d'une année (None si l'année a été construite sans)
+def paliers(annee, dossier=DOSSIER_ANNEES):
+	fichier = chemin_paliers(annee, dossier)
+	if not os.path.exists(fichier):
+		return None
+	with open(fichier, 'r') as f:
+		p = json.load(f)
+	p['effectifs'] = {int(g): n for g, n in p['effectifs'].items()}
+	return p
+
+
+# lignes : ne lire que les premières lignes (des groupes entiers, coupés ensuite)
+def lire(annee, table, cols=None, dossier=DOSSIER_ANNEES, lignes=None):
+	if lignes is None:
+		return pd.read_parquet(chemin(annee, table, dossier), columns=cols)
+	fichier = pq.ParquetFile(chemin(annee, table, dossier))
+	groupes, n = [], 0
+	while n < lignes and len(groupes) < fichier.num_row_groups:
+		n += fichier.metadata.row_group(len(groupes)).num_rows
+		groupes.append(len(groupes))
+	return fichier.read_row_groups(groupes, columns=cols).to_pandas().iloc[:lignes]
+
+
+# report des colonnes d'une table de dimension sur les lignes de la table de base
+def _reporter(serie, positions):
+	if (positions >= 0).all():
+		return serie.take(positions).reset_index(drop=True)
+	valeurs = serie.take(np.where(positions >= 0, positions, 0)).reset_index(drop=True)
+	return valeurs.where(positions >= 0)
+
+
+# vue à la demande : ne lit et ne joint que les colonnes demandées
+# niveau 'usager' (une ligne par usager), 'vehicule' ou 'accident'
+# palier : au niveau usager, ne lire que l'échantillon stratifié de ce palier
+@metriques.instrumenter('chargement')
+def vue(annee, cols=None, niveau='usager', dossier=DOSSIER_ANNEES, palier=None):
+	base = NIVEAUX[niveau]
+	disponibles = colonnes(annee, dossier)
+	accessibles = TABLES[TABLES.index(base):]
+	if cols is None:
+		cols = [c for table in accessibles for c in disponibles[table]]
+
+	par_table = {table: [] for table in accessibles}
+	for col in cols:
+		table = next((t for t in accessibles if col in disponibles[t]), None)
+		if table is None:
+			raise KeyError("colonne '{}' absente au niveau '{}'".format(col, niveau))
+		if col not in par_table[table]:
+			par_table[table].append(col)
+
+	lignes = None
+	if palier is not None and base == 'usagers':
+		lignes = paliers(annee, dossier)['bornes'][palier]
+
+	cles = [CLE[table] for table in accessibles[1:] if par_table[table]]
+	df = lire(annee, base, par_table[base] + cles, dossier, lignes)
+	for table in accessibles[1:]:
+		if not par_table[table]:
+			continue
+		dimension = lire(annee, table, par_table[table], dossier)
+		positions = df[CLE[table]].to_numpy()
+		for col in par_table[table]:
+			df[col] = _reporter(dimension[col], positions)
+	return df[list(cols)]
+
+
+# lecture des usagers par lots de 'taille' lignes, colonnes jointes comme dans vue(), sans charger la table entière ;
+# filtres : {colonne: valeurs admises}, appliqués à chaque lot avant la jointure des colonnes demandées
+def lots(annee, cols, filtres=None, taille=100000, dossier=DOSSIER_ANNEES):
+	filtres = filtres or {}
+	disponibles = colonnes(annee, dossier)
+	par_table = {table: [] for table in TABLES}
+	for col in list(cols) + list(filtres):
+		table = next((t for t in TABLES if col in disponibles[t]), None)
+		if table is None:
+			raise KeyError("colonne '{}' absente en {}".format(col, annee))
+		if col not in par_table[table]:
+			par_table[table].append(col)
+
+	# tables de dimension lues une fois (colonnes utiles seulement), lignes admises par les filtres
+	dimensions, admises = {}, {}
+	for table in TABLES[1:]:
+		if not par_table[table]:
+			continue
+		dimensions[table] = lire(annee, table, par_table[table], dossier)
+		if any(col in filtres for col in par_table[table]):
+			masque = np.ones(len(dimensions[table]), dtype=bool)
+			for col in par_table[table]:
+				if col in filtres:
+					masque &= dimensions[table][col].isin(filtres[col]).to_numpy()
+			admises[table] = masque
+
+	fichier = pq.ParquetFile(chemin(annee, 'usagers', dossier))
+	for lot in fichier.iter_batches(batch_size=taille, columns=par_table['usagers'] + [CLE[table] for table in dimensions]):
+		df = lot.to_pandas()
+		masque = np.ones(len(df), dtype=bool)
+		for col in par_table['usagers']:
+			if col in filtres:
+				masque &= df[col].isin(filtres[col]).to_numpy()
+		for table, admis in admises.items():
+			positions = df[CLE[table]].to_numpy()
+			masque &= (positions >= 0) & admis[np.maximum(positions, 0)]
+		df = df[masque].reset_index(drop=True)
+		for table, dimension in dimensions.items():
+			positions = df[CLE[table]].to_numpy()
+			for col in par_table[table]:
+				df[col] = _reporter(dimension[col], positions)
+		yield df[list(cols)]
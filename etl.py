@@ -0,0 +1,206 @@
+import argparse
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import catalogue
+import echantillons
+import entrepot
+from commun import (ANNEES, DOSSIER_ANNEES, DOSSIER_BRUT, DEPARTMENTS, REGION_DEPARTEMENT,
+					code_departement, colonnes_supprimees, nan_mode_cols)
+from entrepot import RANG_GRAVITE
+
+# colonnes textuelles conservées telles quelles
+COLONNES_TEXTE = ['num_veh', 'departement', 'region']
+
+
+# détection de l'encodage et du séparateur sur le début du fichier
+# (caracteristiques_2009.csv est en fait un TSV, les anciens fichiers sont en latin-1)
+def detecter_format(chemin, taille=1 << 16):
+	with open(chemin, 'rb') as f:
+		echantillon = f.read(taille)
+	try:
+		texte = echantillon.decode('utf-8')
+		encodage = 'utf-8'
+	except UnicodeDecodeError as e:
+		# un caractère multi-octets peut être coupé en fin d'échantillon
+		if e.start >= len(echantillon) - 3:
+			texte = echantillon[:e.start].decode('utf-8')
+			encodage = 'utf-8'
+		else:
+			texte = echantillon.decode('latin-1')
+			encodage = 'latin-1'
+	entete = texte.splitlines()[0]
+	try:
+		separateur = csv.Sniffer().sniff(entete, delimiters=',;\t|').delimiter
+	except csv.Error:
+		separateur = ','
+	return encodage, separateur
+
+
+# lecture d'un fichier brut, quel que soit son format
+def lire(chemin, **kwargs):
+	encodage, separateur = detecter_format(chemin)
+	return pd.read_csv(chemin, sep=separateur, encoding=encodage, low_memory=False, **kwargs)
+
+
+# fichiers publiés à partir de 2019 (année sur 4 chiffres, coordonnées décimales, 'dep' sur 2 caractères)
+# ramenés au format 2005-2017
+def harmoniser(caracteristiques):
+	car = caracteristiques
+	if pd.to_numeric(car['an'], errors='coerce').max() < 100:
+		return car
+	car['an'] = pd.to_numeric(car['an'], errors='coerce') % 100
+	car['hrmn'] = pd.to_numeric(car['hrmn'].astype(str).str.replace(':', '', regex=False), errors='coerce')
+	for col in ['lat', 'long']:
+		degres = pd.to_numeric(car[col].astype(str).str.replace(',', '.', regex=False), errors='coerce')
+		car[col] = (degres * 100000).round()
+	car['dep'] = car['dep'].astype(str).str.upper().map(_dep_ancien_format)
+	return car
+
+
+# '75' -> 750, '2A' -> 201, '974' -> 974
+def _dep_ancien_format(dep):
+	if dep in ('2A', '2B'):
+		return 201 if dep == '2A' else 202
+	if not dep.isdigit():
+		return None
+	return int(dep) if len(dep) == 3 else int(dep) * 10
+
+
+# chemins des 4 fichiers bruts d'une année
+def fichiers_annee(annee, dossier_brut=DOSSIER_BRUT):
+	ressources = catalogue.ressources_annee(annee)
+	manquants = set(catalogue.TABLES) - set(ressources)
+	if manquants:
+		raise ValueError('{} : fichiers absents du catalogue : {}'.format(annee, ', '.join(sorted(manquants))))
+	return {table: os.path.join(dossier_brut, r['nom']) for table, r in ressources.items()}
+
+
+# ajout des colonnes 'departement' et 'region' (dictionnaire appliqué aux seules valeurs distinctes)
+def ajouter_localisation(df):
+	codes = {dep: code_departement(dep) for dep in df['dep'].dropna().unique()}
+	code = df['dep'].map(codes)
+	df['departement'] = code.map(DEPARTMENTS)
+	df['region'] = code.map(REGION_DEPARTEMENT)
+	return df
+
+
+# conversion numérique de la majorité des colonnes
+def convertir(df):
+	for col in df.columns:
+		if col not in COLONNES_TEXTE:
+			df[col] = pd.to_numeric(df[col], errors='coerce')
+	return df
+
+
+# réduction des types (entiers au plus juste, float32, catégories)
+def typer(df):
+	for col in df.columns:
+		if col in COLONNES_TEXTE:
+			df[col] = df[col].astype('category')
+		elif df[col].notna().all() and (df[col] == np.floor(df[col])).all():
+			df[col] = pd.to_numeric(df[col], downcast='integer')
+		elif df[col].dtype.kind == 'f':
+			df[col] = df[col].astype('float32')
+	return df
+
+
+# mode pondéré : chaque ligne compte pour le nombre d'usagers qui s'y rattachent
+# (même résultat que df[col].mode()[0] sur le jeu de données joint)
+def mode_pondere(serie, poids):
+	return pd.Series(poids).groupby(serie.to_numpy()).sum().idxmax()
+
+
+# data cleaning : remplacement des NaN par le mode
+def imputer(df, poids=None):
+	for col in nan_mode_cols:
+		if col in df.columns and df[col].isna().any():
+			mode = df[col].mode()[0] if poids is None else mode_pondere(df[col], poids)
+			df[col] = df[col].fillna(mode)
+	return df
+
+
+# tables d'une année : accidents (caractéristiques + lieux), véhicules et usagers reliés par des clés entières
+def construire_annee(annee, dossier_brut=DOSSIER_BRUT, dossier_sortie=DOSSIER_ANNEES):
+	fichiers = fichiers_annee(annee, dossier_brut)
+	usagers = lire(fichiers['usagers'])
+	caracteristiques = harmoniser(lire(fichiers['caracteristiques']))
+	lieux = lire(fichiers['lieux'])
+	vehicules = lire(fichiers['vehicules'])
+
+	# une ligne par accident
+	accidents = caracteristiques.merge(lieux, on='Num_Acc', how='left')
+	accidents = accidents.drop(columns=[c for c in colonnes_supprimees if c in accidents.columns])
+	accidents = ajouter_localisation(accidents)
+	accidents = convertir(accidents)
+	vehicules = convertir(vehicules)
+	usagers = convertir(usagers)
+
+	# clés de substitution : position de la ligne dans sa table
+	accidents['acc_id'] = np.arange(len(accidents), dtype='int32')
+	acc_id = pd.Series(accidents['acc_id'].to_numpy(), index=accidents['Num_Acc'].to_numpy())
+	vehicules = vehicules.drop_duplicates(subset=['Num_Acc', 'num_veh'])
+	vehicules['acc_id'] = vehicules['Num_Acc'].map(acc_id)
+	vehicules = vehicules[vehicules['acc_id'].notna()].reset_index(drop=True)
+	vehicules['veh_id'] = np.arange(len(vehicules), dtype='int32')
+	usagers['acc_id'] = usagers['Num_Acc'].map(acc_id)
+	sans_accident = usagers['acc_id'].isna()
+	if sans_accident.any():
+		print('(warning) {} : {} usagers sans accident ignorés'.format(annee, int(sans_accident.sum())))
+		usagers = usagers[~sans_accident].reset_index(drop=True)
+	usagers = usagers.merge(vehicules[['Num_Acc', 'num_veh', 'veh_id']], on=['Num_Acc', 'num_veh'], how='left')
+	usagers['veh_id'] = usagers['veh_id'].fillna(-1)
+	usagers = usagers.drop(columns=['Num_Acc', 'num_veh'])
+	vehicules = vehicules.drop(columns=['Num_Acc'])
+
+	# gravité de l'accident : la plus grave de ses usagers
+	rang = usagers['grav'].map(RANG_GRAVITE).fillna(-1).astype(int).to_numpy()
+	positions = usagers['acc_id'].astype(int).to_numpy()
+	rang_max = np.full(len(accidents), -1)
+	np.maximum.at(rang_max, positions, rang)
+	gravite = {r: g for g, r in RANG_GRAVITE.items()}
+	accidents['grav_acc'] = pd.Series(rang_max).map(gravite)
+
+	# imputation pondérée par le nombre d'usagers de chaque accident / véhicule
+	usagers = imputer(usagers)
+	accidents = imputer(accidents, np.bincount(positions, minlength=len(accidents)))
+	veh_id = usagers['veh_id'].astype(int).to_numpy()
+	vehicules = imputer(vehicules, np.bincount(veh_id[veh_id >= 0], minlength=len(vehicules)))
+
+	# usagers rangés par palier d'échantillonnage : un palier = les premières lignes de la table
+	paliers = echantillons.tirer(usagers['grav'], annee)
+	effectifs = echantillons.effectifs(usagers['grav'], paliers)
+	usagers = usagers.take(np.argsort(paliers, kind='stable')).reset_index(drop=True)
+	bornes = np.cumsum(np.bincount(paliers, minlength=len(echantillons.PALIERS))).tolist()
+
+	tables = {'usagers': typer(usagers), 'vehicules': typer(vehicules), 'accidents': typer(accidents)}
+	entrepot.ecrire(annee, tables, dossier_sortie, {'bornes': bornes, 'effectifs': effectifs})
+	return annee, len(usagers)
+
+
+# une année par process, dans la limite du nombre de coeurs
+def construire(annees=ANNEES, workers=None, dossier_brut=DOSSIER_BRUT, dossier_sortie=DOSSIER_ANNEES):
+	workers = min(workers or os.cpu_count() or 1, len(annees))
+	resultats = {}
+	with ProcessPoolExecutor(max_workers=workers) as pool:
+		futures = [pool.submit(construire_annee, annee, dossier_brut, dossier_sortie) for annee in annees]
+		for future in as_completed(futures):
+			annee, n = future.result()
+			resultats[annee] = n
+			print('(done) {} : {} usagers'.format(annee, n))
+	return resultats
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="Construction des jeux de données annuels à partir des fichiers bruts")
+	parser.add_argument('annees', nargs='*', type=int, default=ANNEES)
+	parser.add_argument('--workers', type=int, help='nombre de process (défaut : nombre de coeurs)')
+	parser.add_argument('--brut', default=DOSSIER_BRUT)
+	parser.add_argument('--sortie', default=DOSSIER_ANNEES)
+	args = parser.parse_args()
+
+	construire(args.annees, args.workers, args.brut, args.sortie)
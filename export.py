@@ -0,0 +1,277 @@
+import argparse
+import io
+import os
+import shlex
+import sys
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import donnees
+import entrepot
+from commun import ANNEES, DEPARTMENTS, REGIONS
+
+# export d'une partie des données (une ligne par usager) filtrée par années, régions, départements et gravités,
+# colonnes au choix, en CSV ou en parquet. Seules les partitions des années demandées et les colonnes utiles
+# sont lues, par lots d'usagers (entrepot.lots) écrits au fur et à mesure : l'extraction n'est jamais
+# entière en mémoire et son téléchargement commence dès le premier lot.
+#
+# Depuis l'application, le téléchargement passe par un petit serveur HTTP (démarré une fois par process,
+# cf. demarrer) qui écrit l'extraction dans la réponse lot après lot ; en ligne de commande, dans un fichier.
+FORMATS = {'csv': 'text/csv; charset=utf-8', 'parquet': 'application/octet-stream'}
+GRAVITES = {1: 'Indemne', 2: 'Tué', 3: 'Blessé hospitalisé', 4: 'Blessé léger'}
+
+# usagers lus par lot
+LOT = 20000
+
+PORT = int(os.environ.get('PYSECUROUTE_EXPORT_PORT', 8502))
+# interface d'écoute du serveur d'export (0.0.0.0 pour le rendre joignable depuis d'autres machines)
+HOTE = os.environ.get('PYSECUROUTE_EXPORT_HOTE', '127.0.0.1')
+# adresse du serveur d'export vue du navigateur ; sans elle, pas de lien de téléchargement dans l'application
+# (une adresse par défaut ne serait juste que pour un navigateur ouvert sur la machine du serveur)
+URL_EXPORT = os.environ.get('PYSECUROUTE_EXPORT_URL')
+
+# filtres d'une extraction (listes vides : pas de filtre) et colonne filtrée par chacun
+FILTRES = {'regions': 'region', 'departements': 'departement', 'gravites': 'grav'}
+
+
+# en-tête du CSV distant d'une année (lu une fois par process)
+@lru_cache(maxsize=None)
+def _entete_distante(annee):
+	return tuple(pd.read_csv(donnees.URL_DONNEES + 'df_' + str(annee) + '_v3.csv', nrows=0).columns)
+
+
+# colonnes exportables (celles des années locales, dans l'ordre des tables ; sinon l'en-tête du CSV distant)
+def colonnes_disponibles(annees):
+	noms = []
+	for annee in sorted(annees):
+		if entrepot.existe(annee):
+			disponibles = entrepot.colonnes(annee)
+			noms += [c for table in entrepot.TABLES for c in disponibles[table]]
+		else:
+			noms += list(_entete_distante(annee))
+	return list(dict.fromkeys(noms))
+
+
+# type de chaque colonne sur l'ensemble des années (schéma des fichiers) : un seul schéma pour tous les lots
+def _type(types):
+	if all(pa.types.is_integer(t) for t in types):
+		return pa.int64()
+	if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+		return pa.float64()
+	if all(pa.types.is_boolean(t) for t in types):
+		return pa.bool_()
+	return pa.string()
+
+
+def schema(annees, colonnes):
+	types = {colonne: [] for colonne in colonnes}
+	for annee in annees:
+		for table in entrepot.TABLES:
+			fichier = pq.read_schema(entrepot.chemin(annee, table))
+			for champ in fichier:
+				if champ.name in types:
+					types[champ.name].append(champ.type.value_type if pa.types.is_dictionary(champ.type) else champ.type)
+	return pa.schema([(colonne, _type(t)) for colonne, t in types.items()])
+
+
+# types pandas correspondants (entiers nullables : une jointure sans correspondance ne les change pas en réels)
+def _types_pandas(schema):
+	return {champ.name: 'Int64' if pa.types.is_integer(champ.type) else 'float64' if pa.types.is_floating(champ.type)
+			else 'bool' if pa.types.is_boolean(champ.type) else object for champ in schema}
+
+
+# lots d'usagers d'un CSV distant (lu par morceaux, sans le garder)
+def _lots_distants(annee, colonnes, filtres, taille):
+	lues = list(dict.fromkeys(colonnes + list(filtres)))
+	for df in pd.read_csv(donnees.URL_DONNEES + 'df_' + str(annee) + '_v3.csv', usecols=lues, chunksize=taille):
+		for colonne, valeurs in filtres.items():
+			df = df[df[colonne].isin(valeurs)]
+		yield df[colonnes]
+
+
+# lots de l'extraction, année après année ; filtres : {'regions': [...], 'departements': [...], 'gravites': [...]}
+# (une colonne absente d'une année y est vide)
+def lots(annees, colonnes, filtres, taille=LOT, types=None):
+	filtres = {FILTRES[nom]: valeurs for nom, valeurs in filtres.items() if valeurs}
+	for annee in sorted(annees):
+		disponibles = set(colonnes_disponibles([annee]))
+		presentes = [c for c in colonnes if c in disponibles]
+		if entrepot.existe(annee):
+			source = entrepot.lots(annee, presentes, filtres, taille)
+		else:
+			source = _lots_distants(annee, presentes, filtres, taille)
+		for lot in source:
+			if len(lot):
+				lot = lot.reindex(columns=colonnes)
+				yield lot if types is None else lot.astype(types)
+
+
+# CSV : en-tête avant le premier lot
+def ecrire_csv(lots, colonnes):
+	yield (','.join(colonnes) + '\n').encode('utf-8')
+	for lot in lots:
+		yield lot.to_csv(index=False, header=False).encode('utf-8')
+
+
+# sortie du parquet : garde les octets écrits jusqu'à ce qu'ils soient envoyés, et la position pour le pied de page
+class Flux(io.RawIOBase):
+	def __init__(self):
+		self.morceaux = []
+		self.position = 0
+
+	def writable(self):
+		return True
+
+	def write(self, octets):
+		self.morceaux.append(bytes(octets))
+		self.position += len(octets)
+		return len(octets)
+
+	def tell(self):
+		return self.position
+
+	def vider(self):
+		octets = b''.join(self.morceaux)
+		self.morceaux = []
+		return octets
+
+
+# parquet : un groupe de lignes par lot, envoyé dès qu'il est écrit
+def ecrire_parquet(lots, schema):
+	flux = Flux()
+	writer = pq.ParquetWriter(flux, schema)
+	try:
+		for lot in lots:
+			writer.write_table(pa.Table.from_pandas(lot, schema=schema, preserve_index=False))
+			yield flux.vider()
+	finally:
+		writer.close()
+	yield flux.vider()
+
+
+# extraction complète sous forme de blocs d'octets ; ValueError si la demande n'est pas valide
+def extraire(annees, colonnes=None, regions=(), departements=(), gravites=(), format='csv', taille=LOT):
+	annees = sorted(int(annee) for annee in annees)
+	if not annees or not set(annees) <= set(ANNEES):
+		raise ValueError('années à choisir parmi {}-{}'.format(min(ANNEES), max(ANNEES)))
+	if format not in FORMATS:
+		raise ValueError('format à choisir parmi ' + ', '.join(FORMATS))
+	disponibles = colonnes_disponibles(annees)
+	colonnes = list(colonnes) if colonnes else disponibles
+	inconnues = [c for c in colonnes if c not in disponibles]
+	if inconnues:
+		raise ValueError('colonnes inconnues : ' + ', '.join(inconnues))
+	filtres = {'regions': list(regions), 'departements': list(departements), 'gravites': [int(g) for g in gravites]}
+	if format == 'parquet':
+		if not all(entrepot.existe(annee) for annee in annees):
+			raise ValueError("export parquet : l'entrepôt local des années demandées est nécessaire (python rafraichir.py)")
+		s = schema(annees, colonnes)
+		return ecrire_parquet(lots(annees, colonnes, filtres, taille, _types_pandas(s)), s)
+	types = _types_pandas(schema(annees, colonnes)) if all(entrepot.existe(annee) for annee in annees) else None
+	return ecrire_csv(lots(annees, colonnes, filtres, taille, types), colonnes)
+
+
+def nom_fichier(annees, format):
+	annees = sorted(int(annee) for annee in annees)
+	return 'accidents_{}.{}'.format(annees[0] if len(annees) == 1 else '{}-{}'.format(annees[0], annees[-1]), format)
+
+
+# paramètres d'une extraction dans l'adresse du serveur (listes répétées : annees=2016&annees=2017)
+def url(annees, colonnes=None, regions=(), departements=(), gravites=(), format='csv'):
+	parametres = {'annees': list(annees), 'colonnes': list(colonnes or []), 'regions': list(regions),
+				  'departements': list(departements), 'gravites': list(gravites), 'format': format}
+	return URL_EXPORT + '?' + urlencode({k: v for k, v in parametres.items() if v}, doseq=True)
+
+
+# ligne de commande équivalente
+def commande(annees, colonnes=None, regions=(), departements=(), gravites=(), format='csv'):
+	morceaux = ['python export.py', '--annees'] + [str(a) for a in annees]
+	for option, valeurs in (('--colonnes', colonnes), ('--regions', regions), ('--departements', departements), ('--gravites', gravites)):
+		if valeurs:
+			morceaux += [option] + [shlex.quote(str(v)) for v in valeurs]
+	return ' '.join(morceaux + ['--format', format, '--sortie', nom_fichier(annees, format)])
+
+
+class Handler(BaseHTTPRequestHandler):
+
+	def do_GET(self):
+		adresse = urlsplit(self.path)
+		if adresse.path.rstrip('/') != '/export':
+			self.send_error(404)
+			return
+		parametres = parse_qs(adresse.query)
+		format = parametres.get('format', ['csv'])[0]
+		try:
+			blocs = extraire(parametres.get('annees', []), parametres.get('colonnes'), parametres.get('regions', []),
+							 parametres.get('departements', []), parametres.get('gravites', []), format)
+			premier = next(blocs)
+		except (ValueError, KeyError) as e:
+			self.send_error(400, explain=str(e))
+			return
+		# pas de longueur annoncée : la réponse se termine à la fermeture de la connexion
+		self.send_response(200)
+		self.send_header('Content-Type', FORMATS[format])
+		self.send_header('Content-Disposition', 'attachment; filename="{}"'.format(nom_fichier(parametres['annees'], format)))
+		self.send_header('Connection', 'close')
+		self.end_headers()
+		try:
+			self.wfile.write(premier)
+			for bloc in blocs:
+				self.wfile.write(bloc)
+		except (BrokenPipeError, ConnectionResetError):
+			blocs.close()
+
+	def log_message(self, format, *args):
+		pass
+
+
+# serveur d'export (port 0 = port libre choisi par le système)
+def serveur(port=PORT, hote=HOTE):
+	return ThreadingHTTPServer((hote, port), Handler)
+
+
+# serveur d'export de l'application, démarré une fois par process dans un thread ; si le port est déjà pris
+# (un autre worker streamlit de la machine sert déjà les exports), celui-ci est utilisé
+@lru_cache(maxsize=1)
+def demarrer(port=PORT, hote=HOTE):
+	try:
+		httpd = serveur(port, hote)
+	except OSError:
+		return None
+	threading.Thread(target=httpd.serve_forever, daemon=True).start()
+	return httpd
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Export filtré des usagers accidentés, écrit par lots')
+	parser.add_argument('--annees', nargs='+', type=int, default=[max(ANNEES)])
+	parser.add_argument('--colonnes', nargs='*', help='colonnes exportées (toutes par défaut)')
+	parser.add_argument('--regions', nargs='*', default=[], choices=list(REGIONS), metavar='REGION')
+	parser.add_argument('--departements', nargs='*', default=[], choices=sorted(set(DEPARTMENTS.values())), metavar='DEPARTEMENT')
+	parser.add_argument('--gravites', nargs='*', type=int, default=[], choices=list(GRAVITES))
+	parser.add_argument('--format', choices=list(FORMATS), default='csv')
+	parser.add_argument('--sortie', default='-', help="fichier de sortie ('-' : sortie standard)")
+	parser.add_argument('--serveur', action='store_true', help="servir les exports sur http://127.0.0.1:PORT/export")
+	parser.add_argument('--port', type=int, default=PORT)
+	parser.add_argument('--hote', default=HOTE, help="interface d'écoute du serveur (0.0.0.0 : toutes)")
+	args = parser.parse_args()
+
+	if args.serveur:
+		httpd = serveur(args.port, args.hote)
+		print('(done) exports sur http://{}:{}/export'.format(*httpd.server_address))
+		httpd.serve_forever()
+	else:
+		blocs = extraire(args.annees, args.colonnes, args.regions, args.departements, args.gravites, args.format)
+		sortie = sys.stdout.buffer if args.sortie == '-' else open(args.sortie + '.tmp', 'wb')
+		with sortie:
+			for bloc in blocs:
+				sortie.write(bloc)
+		if args.sortie != '-':
+			os.replace(args.sortie + '.tmp', args.sortie)
+			print('(done) ' + args.sortie, file=sys.stderr)
@@ -0,0 +1,624 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+import choroplethe
+import densite
+import donnees
+import modele
+import points_noirs
+import recherche
+import series
+
+# graphiques de l'analyse : fonctions (df, annee, **paramètres) sans appel à streamlit,
+# qui renvoient une figure matplotlib, une figure bokeh, un tableau, un message (str) ou une liste de ceux-ci.
+# df est un échantillon stratifié par gravité (donnees.preprocess) : chaque ligne compte pour son 'poids'.
+# bokeh n'est importé que par les cartes qui s'en servent
+
+# pyplot garde une figure courante par process : les sessions streamlit (des threads du même process)
+# tracent et rendent leurs graphiques l'une après l'autre
+VERROU = threading.RLock()
+
+# registre des graphiques, dans l'ordre de déclaration : titre -> déclaration
+registre = {}
+declarations = {}
+
+# agrégats dont un graphique peut être calculé : l'échantillon du palier (donnees.preprocess), les densités
+# (exactes avec l'entrepôt local), la vue par accident, les comptes par département, les séries quotidiennes
+# et les grilles des accidents graves
+AGREGATS = ['echantillon', 'densite', 'accidents', 'choroplethe', 'series', 'points_noirs']
+# classes de coût du rendu (tableau, figure matplotlib, carte ou grille de figures)
+COUTS = ['leger', 'moyen', 'lourd']
+
+
+## déclaration d'un graphique : titre affiché, mots-clés de recherche en plus du titre, colonnes de
+## l'échantillon utilisées, agrégat dont il est calculé, classe de coût et dimensions selon lesquelles ses
+## comptes sont ventilés pour comparer deux années (comparaison.py ; par défaut ses colonnes hors gravité et position)
+def enregistrer(titre, mots='', colonnes=(), agregat='echantillon', cout='moyen', dimensions=None):
+	assert agregat in AGREGATS and cout in COUTS
+	if dimensions is None:
+		dimensions = [c for c in colonnes if c not in ('grav', 'x', 'y')]
+	def decorateur(fonction):
+		declaration = {'titre': titre, 'fonction': fonction, 'mots': mots, 'colonnes': list(colonnes), 'agregat': agregat, 'cout': cout,
+					   'dimensions': list(dimensions)}
+		registre[titre] = declaration
+		declarations[fonction] = declaration
+		return fonction
+	return decorateur
+
+
+GRAVITES_AXE = ['Indemne',
+				'Tué',
+				'Blessé hospitalisé',
+				'Blessé léger']
+
+
+# équivalent pondéré de sns.countplot
+def compter(x, hue=None, data=None, ax=None):
+	return sns.barplot(x=x, y='poids', hue=hue, data=data, estimator=np.sum, ci=None, ax=ax)
+
+
+# comptes pondérés par modalité, du plus grand au plus petit (équivalent de value_counts)
+def comptes(df, colonne):
+	return df.groupby(colonne, observed=True)['poids'].sum().round().astype(int).sort_values(ascending=False)
+
+
+def croiser(df, colonne, rownames):
+	return pd.crosstab(df.grav, df[colonne], values=df.poids, aggfunc='sum',
+					   rownames=rownames, colnames=[colonne]).fillna(0).round().astype(int)
+
+
+def par_region_departement(df):
+	return df.groupby(['region', 'departement'], observed=True)['poids'].sum().round().astype(int).to_frame('grav')
+
+
+def palmares(df, colonne, titre_max, titre_min, ylabel=True):
+	max_col = comptes(df, colonne).head(5)
+	min_col = comptes(df, colonne).tail(5)
+	fig, (ax1, ax2) = plt.subplots(nrows=1, ncols=2, figsize=(16,6), sharey=True)
+	sns.barplot(x=max_col.index, y=max_col, order=max_col.index, ax=ax1)
+	if ylabel:
+		ax1.set_ylabel('nombre')
+	ax1.title.set_text(titre_max)
+	labels = ax1.get_xticklabels()
+	plt.setp(labels, rotation=45, horizontalalignment='right')
+	sns.barplot(x=min_col.index, y=min_col, order=min_col.index, ax=ax2)
+	ax2.title.set_text(titre_min)
+	if ylabel:
+		ax2.set_ylabel('nombre')
+	plt.xticks(rotation=45);
+	return fig
+
+
+## tableau des régions avec le plus d'accidentés pour comparé avec le plus de blessés
+@enregistrer("tableau des régions avec le plus d'accidentés pour comparé avec le plus de blessés", mots='gravité tableau', colonnes=['grav', 'region'], cout='leger')
+def Tableau_Des_Régions_Avec_Le_Plus_D_accidentés_Pour_Comparé_Avec_Le_Plus_De_Blessés(df, annee):
+	return croiser(df, 'region', ['gravite'])
+
+
+## tableau des régions avec le plus de tués pour comparé avec le plus de blessés
+@enregistrer("tableau des régions avec le plus de tués pour comparé avec le plus de blessés", mots='mortalité morts décès', colonnes=['grav', 'region'], cout='leger')
+def Tableau_Des_Régions_Avec_Le_Plus_De_Tués_Pour_Comparé_Avec_Le_Plus_De_Blessés(df, annee):
+	return croiser(df[df['grav']==2], 'region', ['nombre de Tués'])
+
+## tableau des départements avec le plus de tués
+@enregistrer("tableau des départements avec le plus de tués", mots='mortalité morts décès', colonnes=['grav', 'departement'], cout='leger')
+def Tableau_Des_Départements_Avec_Le_Plus_De_Tués(df, annee):
+	return croiser(df[df['grav']==2], 'departement', ['nombre de Tués'])
+
+## tableau des régions avec le plus de blessés pour comparaison
+@enregistrer("tableau des régions avec le plus de blessés pour comparaison", mots='gravité', colonnes=['grav', 'region'], cout='leger')
+def Tableau_Des_Régions_Avec_Le_Plus_De_Blessés_Pour_Comparaison(df, annee):
+	return croiser(df, 'region', ['gravite'])
+
+## distribution des accidentés par région/département
+@enregistrer("distribution des accidentés par région/département", mots='tableau géographie', colonnes=['grav', 'region', 'departement'], cout='leger')
+def Distribution_Des_Accidentés_Par_Régiondépartement(df, annee):
+	return par_region_departement(df)
+
+## tableau des nombre de tués par région et département
+@enregistrer("tableau des nombre de tués par région et département", mots='mortalité morts décès géographie', colonnes=['grav', 'region', 'departement'], cout='leger')
+def Tableau_Des_Nombre_De_Tués_Par_Région_Et_Département(df, annee):
+	pd.set_option("display.max_rows", None)
+	return par_region_departement(df[df['grav']==2])
+
+
+## palmarès des régions avec le plus et le moins d'accidentés
+@enregistrer("palmarès des régions avec le plus et le moins d'accidentés", mots='classement top', colonnes=['grav', 'region'], cout='moyen')
+def Palmarès_Des_Régions_Avec_Le_Plus_Et_Le_Moins_Daccidentés(df, annee):
+	return palmares(df, 'region', "5 régions avec le plus d'accidents corporels", "5 regions avec le moins d'accidents corporels")
+
+## palmarès des régions avec le plus et le moins de tués
+@enregistrer("palmarès des régions avec le plus et le moins de tués", mots='classement top mortalité morts', colonnes=['grav', 'region'], cout='moyen')
+def Palmarès_Des_Régions_Avec_Le_Plus_Et_Le_Moins_De_Tués(df, annee):
+	return palmares(df[df['grav']==2], 'region', "5 régions avec le plus d'accidents mortels", "5 régions avec le moins d'accidents mortels")
+
+## palmarès des départements avec le plus d'accidents corporels
+@enregistrer("palmarès des départements avec le plus d'accidents corporels", mots='classement top accidentés', colonnes=['grav', 'departement'], cout='moyen')
+def Palmarès_Des_Départements_Avec_Le_Plus_Daccidents_Corporels(df, annee):
+	return palmares(df, 'departement', "5 départements avec le plus d'accidents corporels", "5 départements avec le moins d'accidents corporels", ylabel=False)
+
+## palmarès des Départements avec le plus et le moins de Tués
+@enregistrer("palmarès des Départements avec le plus et le moins de Tués", mots='classement top mortalité morts', colonnes=['grav', 'departement'], cout='moyen')
+def Palmarès_Des_Départements_Avec_Le_Plus_Et_Le_Moins_De_Tués(df, annee):
+	return palmares(df[df['grav']==2], 'departement', "5 départements avec le plus de Tués", "5 départements avec le moins de Tués", ylabel=False)
+
+## distribution des accidenté(e)s par gravité de blessure
+@enregistrer("distribution des accidenté(e)s par gravité de blessure", mots='blessés tués indemnes', colonnes=['grav'], cout='moyen')
+def Distribution_Des_Accidentées_Par_Gravité_De_Blessure(df, annee):
+	fig, ax = plt.subplots(figsize=(10,5))
+	compter(x="grav",data=df)
+	plt.xticks([0,1,2,3],GRAVITES_AXE)
+	plt.xlabel("Gravité du bléssé")
+	plt.ylabel('nombre')
+	plt.title("Distribution des accidenté(e)s par gravité des blessures");
+	return fig
+
+##BOKEH##
+## carte intéractive des accidentés par gravité
+@enregistrer("carte intéractive des accidentés par gravité", mots='points géographie localisation bokeh', colonnes=['grav', 'x', 'y'], cout='lourd', dimensions=['departement'])
+def Carte_Intéractive_Des_Accidentés_Par_Gravité(df, annee):
+	from bokeh.models import CDSView, ColumnDataSource, CustomJSFilter
+	from bokeh.plotting import figure
+	from bokeh.tile_providers import get_provider, OSM
+	tile_provider = get_provider(OSM)
+	tools = "pan,wheel_zoom,reset"
+	p = figure(x_range=(-1000000, 2000000), y_range=(5000000, 7000000),
+			   x_axis_type="mercator", y_axis_type="mercator",
+			   tools=tools,
+			   plot_width=800,
+			   plot_height=600,
+			   title='Accidents de la route par gravité ('+str(annee)+')'
+			   )
+	p.add_tile(tile_provider)
+	# une seule source envoyée au navigateur en tableaux binaires : x/y en float32 (précision < 1 m)
+	# et la gravité sur un octet ; chaque gravité est une vue filtrée côté navigateur (légende cliquable)
+	x = df['x'].to_numpy(dtype=np.float32)
+	y = df['y'].to_numpy(dtype=np.float32)
+	localises = np.isfinite(x) & np.isfinite(y)
+	source = ColumnDataSource(data={'x': x[localises], 'y': y[localises], 'grav': df['grav'].to_numpy(dtype=np.uint8)[localises]})
+	for gravite, couleur, libelle in ((1, 'green', 'Indemne'), (4, 'yellow', 'Blessé léger'), (3, 'orange', 'Blessé hospitalisé'), (2, 'red', 'Tué')):
+		filtre = CustomJSFilter(args={'gravite': gravite}, code="""
+			const grav = source.data['grav'], indices = []
+			for (let i = 0; i < grav.length; i++)
+				if (grav[i] == gravite) indices.push(i)
+			return indices
+		""")
+		p.circle(x='x', y='y', size=5, alpha=0.5, source=source, view=CDSView(source=source, filters=[filtre]),
+				 color=couleur, legend_label=libelle)
+	p.xgrid.grid_line_color = None
+	p.ygrid.grid_line_color = None
+	p.xaxis.major_label_text_color = None
+	p.yaxis.major_label_text_color = None
+	p.xaxis.major_tick_line_color = None
+	p.xaxis.minor_tick_line_color = None
+	p.yaxis.major_tick_line_color = None
+	p.yaxis.minor_tick_line_color = None
+	p.yaxis.axis_line_color = None
+	p.xaxis.axis_line_color = None
+	p.legend.click_policy = "hide"
+	return p
+
+## carte choroplèthe des accidentés par département / région, sur une ou plusieurs années
+@enregistrer("carte choroplèthe des accidentés par département et région ( carte, tués )", mots='région département géographie période', agregat='choroplethe', cout='lourd', dimensions=['departement'])
+def Carte_Choroplèthe_Par_Département_Et_Région(df, annee, niveau='departement', mesure='accidents', annees=None):
+	geometries = choroplethe.charger_geometries()
+	if geometries is None:
+		return "Contours des départements non disponibles : lancer `python choroplethe.py`."
+	debut, fin = annees or (int(annee), int(annee))
+	comptes_niveau = choroplethe.comptes(range(debut, fin+1), niveau)
+	if comptes_niveau is None:
+		return "Comptes par département non disponibles : lancer `python rafraichir.py`."
+	absentes = choroplethe.absentes(range(debut, fin+1))
+	polygones = choroplethe.polygones(geometries, comptes_niveau, mesure, niveau)
+	from bokeh.models import ColumnDataSource, ColorBar, LinearColorMapper
+	from bokeh.palettes import Reds9
+	from bokeh.plotting import figure
+	mapper = LinearColorMapper(palette=Reds9[::-1], low=0, high=max(polygones['valeur']) or 1)
+	p = figure(x_range=(-600000, 1200000), y_range=(5000000, 6700000),
+			   x_axis_type="mercator", y_axis_type="mercator",
+			   tools="pan,wheel_zoom,reset,hover",
+			   tooltips=[('', '@nom'), (mesure, '@valeur')],
+			   plot_width=800,
+			   plot_height=700,
+			   title='Nombre de '+mesure+' ('+(str(debut) if debut == fin else str(debut)+'-'+str(fin))+')'
+			   )
+	p.patches('xs', 'ys', source=ColumnDataSource(polygones),
+			  fill_color={'field':'valeur', 'transform':mapper}, line_color='white', line_width=0.5)
+	p.add_layout(ColorBar(color_mapper=mapper, location=(0,0)), 'right')
+	p.xgrid.grid_line_color = None
+	p.ygrid.grid_line_color = None
+	p.axis.visible = False
+	resultat = [p, comptes_niveau.sort_values(by=mesure, ascending=False)]
+	if absentes:
+		resultat.insert(0, "Comptes absents pour "+', '.join(str(a) for a in absentes)+", non comptés sur la carte : lancer `python rafraichir.py`.")
+	return resultat
+
+## points noirs : grappes des accidents graves sur une ou plusieurs années (carte et tableau)
+@enregistrer("carte des points noirs ( grappes d'accidents graves, tendance )", mots='tués blessés hospitalisés zones dangereuses localisation géographie période', agregat='points_noirs', cout='lourd', dimensions=['grappe'])
+def Carte_Des_Points_Noirs(df, annee, annees=None, minimum=points_noirs.MINIMUM, nombre=100):
+	debut, fin = annees or (int(annee), int(annee))
+	grappes = points_noirs.points_noirs(range(debut, fin+1), minimum, nombre)
+	if grappes is None:
+		return "Grilles des accidents graves non disponibles : lancer `python rafraichir.py`."
+	if grappes.empty:
+		return "Aucune grappe d'au moins "+str(minimum)+" accidents graves."
+	from bokeh.models import ColumnDataSource, ColorBar, LinearColorMapper
+	from bokeh.palettes import RdYlGn9
+	from bokeh.plotting import figure
+	from bokeh.tile_providers import get_provider, OSM
+	# couleur : tendance (rouge si les accidents graves augmentent), taille : nombre d'accidents graves
+	borne = float(np.nanmax(np.abs(grappes['tendance']))) if grappes['tendance'].notna().any() else 0
+	mapper = LinearColorMapper(palette=RdYlGn9, low=-(borne or 1), high=borne or 1, nan_color='grey')
+	source = ColumnDataSource(data={
+		'x': grappes['x'].to_numpy(), 'y': grappes['y'].to_numpy(),
+		'rang': grappes.index.to_numpy(), 'accidents': grappes['accidents'].to_numpy(),
+		'tues': grappes['tués'].to_numpy(), 'hospitalises': grappes['blessés hospitalisés'].to_numpy(),
+		'tendance': grappes['tendance'].to_numpy(dtype=float),
+		'taille': 6 + 24 * np.sqrt(grappes['accidents'].to_numpy() / grappes['accidents'].max()),
+		})
+	p = figure(x_range=(-600000, 1200000), y_range=(5000000, 6700000),
+			   x_axis_type="mercator", y_axis_type="mercator",
+			   tools="pan,wheel_zoom,reset,hover",
+			   tooltips=[('rang', '@rang'), ('accidents graves', '@accidents'), ('tués', '@tues'),
+						 ('blessés hospitalisés', '@hospitalises'), ('tendance (par an)', '@tendance{0.0}')],
+			   plot_width=800,
+			   plot_height=700,
+			   title='Points noirs ('+(str(debut) if debut == fin else str(debut)+'-'+str(fin))+')'
+			   )
+	p.add_tile(get_provider(OSM))
+	p.circle(x='x', y='y', size='taille', source=source, fill_color={'field':'tendance', 'transform':mapper},
+			 fill_alpha=0.7, line_color='black', line_width=0.5)
+	if borne:
+		p.add_layout(ColorBar(color_mapper=mapper, location=(0,0), title='tendance'), 'right')
+	p.xgrid.grid_line_color = None
+	p.ygrid.grid_line_color = None
+	p.axis.visible = False
+	return [p, grappes.drop(columns=['x', 'y']).round({'tendance': 2, 'longitude': 5, 'latitude': 5})]
+
+## distribution des accidentés par mois
+@enregistrer("distribution des accidentés par mois", mots='gravité saison calendrier', colonnes=['grav', 'mois'], cout='moyen')
+def Distribution_Des_Accidentés_Par_Mois(df, annee):
+	fig, ax = plt.subplots(figsize=(10,10))
+	compter(x="grav", hue="mois", data=df);
+	plt.legend(labels=['Janvier',
+					   'Février',
+					   'Mars',
+					   'Avril',
+					   'Mai',
+					   'Juin',
+					   'Juillet',
+					   'Août',
+					   'Septembre',
+					   'Octobre',
+					   'Novembre',
+					   'Décembre'])
+	plt.xticks([0,1,2,3],GRAVITES_AXE)
+	plt.xlabel("Gravité du blessé")
+	plt.ylabel('nombre')
+	plt.title("Distribution des accidenté(e)s par gravité des blessures en fonction des mois de l'année");
+	return fig
+
+## distribution des accidentés par jour de la semaine
+@enregistrer("distribution des accidentés par jour de la semaine", mots='gravité semaine week-end', colonnes=['grav', 'day'], cout='moyen')
+def Distribution_Des_Accidentés_Par_Jour_De_La_Semaine(df, annee):
+	fig, ax = plt.subplots(figsize=(10,5))
+	compter(x="grav", hue="day", data=df);
+	plt.legend(labels=['Lundi','Mardi','Mercredi','Jeudi','Vendredi','Samedi','Dimanche'])
+	plt.xticks([0,1,2,3],GRAVITES_AXE)
+	plt.xlabel("Gravité du bléssé")
+	plt.ylabel('nombre')
+	plt.title("Distribution des accidenté(e)s par gravité des blessures en fonction des jours de la semaine");
+	return fig
+
+## densités empilées par gravité à partir des histogrammes
+def densite_empilee(x, densites):
+	fig, ax = plt.subplots(figsize=(11,5))
+	ax.stackplot(x, densites, labels=[modele.GRAVITES[g] for g in densite.GRAVITES], alpha=0.75)
+	plt.legend()
+	return fig
+
+## distribution par heure / minutes
+@enregistrer("distribution par heure / minutes", mots='gravité densité horaire nuit', colonnes=densite.COLONNES, agregat='densite', cout='moyen', dimensions=['heure'])
+def Distribution_Par_Heure_Minutes(df, annee, filtre='Tous les usagers'):
+	histos = densite.histogrammes(annee, df, densite.FILTRES[filtre])
+	fig = densite_empilee(np.arange(densite.BINS['heure']), densite.densites(histos['heure'], circulaire=True))
+	plt.xticks([0,300,600,900,1200],['0:00','5:00','10:00','15:00','20:00'])
+	plt.xlim(0, densite.BINS['heure'])
+	plt.xlabel('Heures')
+	plt.ylabel('Densité')
+	plt.title("Distribution des accidenté(e)s par gravité des blessures en fonction de l'heure");
+	return fig
+
+## graphique par catégorie de véhicule
+@enregistrer("graphique par catégorie de véhicule", mots='gravité voiture moto vélo poids lourd', colonnes=['grav', 'catv'], cout='moyen')
+def Graphique_Par_Catégorie_De_Véhicule(df, annee):
+	fig, ax = plt.subplots(figsize=(15,15))
+	compter(x="grav", hue="catv", data=df);
+	plt.legend(labels=['01 - Bicyclette',
+					   '02 - Cyclomoteur <50cm3',
+					   '03 - Voiturette (Quadricycle à moteur carrossé)',
+					   '04 - scooter immatriculé',
+					   '05 - motocyclette',
+					   '06 - side-car',
+					   '07 - VL seul',
+					   '08 - VL + caravane',
+					   '09 - VL + remorque',
+					   '10 - VU seul 1,5T <= PTAC <= 3,5T avec ou sans remorque',
+					   '11 - VU (10) + caravane',
+					   '12 - VU (10) + remorque',
+					   '13 - PL seul 3,5T <PTCA <= 7,5T',
+					   '14 - PL seul > 7,5T',
+					   '15 - PL > 3,5T + remorque',
+					   '16 - Tracteur routier seul',
+					   '17 - Tracteur routier + semi-remorque',
+					   '18 - transport en commun',
+					   '19 - tramway',
+					   '20 - Engin spécial',
+					   '21 - Tracteur agricole',
+					   '30 - Scooter < 50 cm3',
+					   '31 - Motocyclette > 50 cm3 et <= 125 cm3',
+					   '32 - Scooter > 50 cm3 et <= 125 cm3',
+					   '33 - Motocyclette > 125 cm3',
+					   '34 - Scooter > 125 cm3',
+					   '35 - Quad léger <= 50 cm3 (Quadricycle à moteur non carrossé)',
+					   '36 - Quad lourd > 50 cm3 (Quadricycle à moteur non carrossé)',
+					   '37 - Autobus',
+					   '38 - Autocar',
+					   '39 - Train',
+					   '40 - Tramway',
+					   '99 - Autre véhicule'])
+	plt.xticks([0,1,2,3],GRAVITES_AXE)
+	plt.xlabel("Gravité du blessé")
+	plt.ylabel('nombre')
+	plt.title('Distribution des accidenté(e)s par gravité des blessures en fonction des catégories de véhicule');
+	return fig
+
+## graphique par catégorie de route
+@enregistrer("graphique par catégorie de route", mots='gravité accidents autoroute nationale', agregat='accidents', cout='moyen', dimensions=['catr'])
+def Graphique_Par_Catégorie_De_Route(df, annee):
+	fig, ax = plt.subplots(figsize=(10,5))
+	sns.countplot(x="grav_acc", hue="catr", order=[1,2,3,4], data=donnees.accidents(annee, ['catr','col']));
+	plt.legend(labels=['1 - Autoroute',
+					   '2 - Route nationale',
+					   '3 - Route Départementale',
+					   '4 - Voie Communale',
+					   '5 - Hors réseau public',
+					   '6 - Parc de stationnement ouvert à la circulation publique',
+					   '9 - autre'])
+	plt.xticks([0,1,2,3],GRAVITES_AXE)
+	plt.xlabel("Gravité de l'accident (usager le plus gravement atteint)")
+	plt.ylabel("nombre d'accidents")
+	plt.title('Distribution des accidents par gravité en fonction des catégories de route');
+	return fig
+
+## graphique par type de collision
+@enregistrer("graphique par type de collision", mots='gravité accidents choc frontale', agregat='accidents', cout='moyen', dimensions=['col'])
+def Graphique_Par_Type_De_Collision(df, annee):
+	fig, ax = plt.subplots(figsize=(10,5))
+	sns.countplot(x="grav_acc", hue="col", order=[1,2,3,4], data=donnees.accidents(annee, ['catr','col']));
+	plt.legend(labels=['Deux véhicules - frontale',
+					   'Deux véhicules - par l’arrière',
+					   'Deux véhicules - par le coté',
+					   'Trois véhicules et plus – en chaîne',
+					   'Trois véhicules et plus - collisions multiples',
+					   'Autre collision',
+					   'Sans collision'])
+	plt.xticks([0,1,2,3],GRAVITES_AXE)
+	plt.xlabel("Gravité de l'accident (usager le plus gravement atteint)")
+	plt.ylabel("nombre d'accidents")
+	plt.title("Distribution des accidents par gravité en fonction du type de collision");
+	return fig
+
+## proportion masculin / féminin (accidentés) (sexe)
+@enregistrer("proportion masculin / féminin (accidentés) ( sexe )", mots='homme femme genre', colonnes=['grav', 'sexe'], cout='moyen')
+def Proportion_Masculin_Féminin_accidentés(df, annee):
+	fig, ax = plt.subplots(figsize=(5,5))
+	compter(x="sexe",data=df)
+	plt.xticks([0,1],['M','F'])
+	plt.xlabel("Sexe de l'accidenté(e)")
+	plt.ylabel("nombre Usagers")
+	plt.title('Distribution des accidentés par sexe');
+	return fig
+
+## proportion masculin/féminin ( tués ) (sexe)
+@enregistrer("proportion masculin/féminin ( tués ) ( sexe )", mots='homme femme genre mortalité', colonnes=['grav', 'sexe'], cout='moyen')
+def Proportion_Masculinféminin_Tués_(df, annee):
+	fig, ax = plt.subplots(figsize=(5,5))
+	compter(x="sexe",data=df[df['grav']==2])
+	plt.xticks([0,1],['M','F'])
+	plt.xlabel("Sexe de l'accidenté(e)")
+	plt.ylabel("nombre de Tués")
+	plt.title("Distribution des Tué(e)s par sexe");
+	return fig
+
+## histogramme pondéré pour FacetGrid.map_dataframe
+def histogramme(data, color=None, label=None):
+	plt.hist(data['age'], weights=data['poids'], color=color)
+
+## proportion masculin/féminin ( tués par âge )
+@enregistrer("proportion masculin/féminin ( tués par âge ) ( sexe )", mots='homme femme genre mortalité âge', colonnes=['grav', 'sexe', 'age'], cout='lourd')
+def Proportion_Masculinféminin_Tués_Par_Age_(df, annee):
+	g = sns.FacetGrid(df[df['grav']==2], col='sexe')
+	g.map_dataframe(histogramme);
+	return g.fig
+
+## graphique par sexe
+@enregistrer("graphique par sexe", mots='gravité homme femme genre', colonnes=['grav', 'sexe'], cout='moyen')
+def Graphique_Par_Sexe(df, annee):
+	fig, ax = plt.subplots(figsize=(10,5))
+	compter(x="grav", hue="sexe", data=df);
+	plt.legend(labels=['M','F'])
+	plt.xticks([0,1,2,3],GRAVITES_AXE)
+	plt.xlabel("Gravité du blessé")
+	plt.ylabel('nombre')
+	plt.title('Distribution des accidenté(e)s par gravité des blessures en fonction du sexe');
+	return fig
+
+## distribution des accidenté(e)s par gravité des blessures en fonction de l'âge
+@enregistrer("distribution des accidenté(e)s par gravité des blessures en fonction de l'âge", mots='densité jeunes seniors', colonnes=densite.COLONNES, agregat='densite', cout='moyen', dimensions=['age'])
+def Distribution_Des_Accidentées_Par_Gravité_Des_Blessures_En_Fonction_De_Lâge(df, annee, filtre='Tous les usagers'):
+	histos = densite.histogrammes(annee, df, densite.FILTRES[filtre])
+	fig = densite_empilee(np.arange(densite.BINS['age']), densite.densites(histos['age']))
+	plt.xlim(0, 110)
+	plt.xlabel('Age')
+	plt.ylabel('Densité')
+	plt.title("Distribution des accidenté(e)s par gravité des blessures en fonction de l'âge");
+	return fig
+
+## graphique par catégorie d'usager
+@enregistrer("graphique par catégorie d'usager", mots='gravité conducteur passager piéton', colonnes=['grav', 'catu'], cout='moyen')
+def Graphique_Par_Catégorie_Dusager(df, annee):
+	fig, ax = plt.subplots(figsize=(10,5))
+	compter(x="grav", hue="catu", data=df);
+	plt.legend(labels=['1 - Conducteur',
+					   '2 - Passager',
+					   '3 - Piéton',
+					   '4 - Pieton Roller/Trotinette'])
+	plt.xticks([0,1,2,3],GRAVITES_AXE)
+	plt.xlabel("Gravité du bléssé")
+	plt.ylabel('nombre')
+	plt.title("Distribution des accidenté(e)s par gravité des blessures en fonction des catégories d'usagers");
+	return fig
+
+## graphique par type de trajet
+@enregistrer("graphique par type de trajet", mots='gravité domicile travail loisirs', colonnes=['grav', 'trajet'], cout='moyen')
+def Graphique_Par_Type_De_Trajet(df, annee):
+	fig, ax = plt.subplots(figsize=(10,10))
+	compter(x="grav", hue="trajet", data=df);
+	plt.legend(labels=['Non renseigné',
+					   'Domicile – travail',
+					   'Domicile – école',
+					   'Courses – achats',
+					   'Utilisation professionnelle',
+					   'Promenade – loisirs',
+					   'Autre'])
+	plt.xticks([0,1,2,3],GRAVITES_AXE)
+	plt.xlabel("Gravité du bléssé")
+	plt.ylabel('nombre')
+	plt.title('Distribution des accidenté(e)s par gravité des blessures en fonction du type de trajet');
+	return fig
+
+## série temporelle quotidienne : tendance et comparaison avec l'année précédente
+@enregistrer("série temporelle quotidienne ( jour, mois, tendance, année )", mots='évolution période glissante', agregat='series', cout='moyen', dimensions=['mois'])
+def Série_Temporelle_Quotidienne(df, annee, mesure='accidents', regions=None, periode=None, fenetre=28):
+	cubes = series.charger()
+	if cubes is None:
+		return "Séries quotidiennes non disponibles : lancer `python rafraichir.py` pour les construire."
+	periode = periode or series.periode(cubes)
+	s = series.serie(cubes, mesure, periode[0], periode[1], regions)
+	fig1, ax = plt.subplots(figsize=(15,5))
+	ax.plot(s.index, s.values, alpha=0.3, label='par jour')
+	ax.plot(s.index, series.glissante(s, fenetre).values, label='moyenne sur '+str(fenetre)+' jours')
+	plt.legend()
+	plt.ylabel('nombre')
+	plt.title('Nombre quotidien de '+mesure);
+	comparaison = series.annee_sur_annee(cubes, mesure, annee, regions, fenetre)
+	fig2, ax = plt.subplots(figsize=(15,5))
+	comparaison.plot(ax=ax)
+	plt.xlabel("Jour de l'année")
+	plt.ylabel('nombre (moyenne sur '+str(fenetre)+' jours)')
+	plt.title('Nombre quotidien de '+mesure+' : '+str(annee)+' comparé à '+str(annee-1));
+	absentes = series.absentes(cubes, min(periode[0], pd.Timestamp(annee-1, 1, 1)), max(periode[1], pd.Timestamp(annee, 12, 31)))
+	if absentes:
+		return [fig1, fig2, "Années absentes des séries, comptées à zéro : "+', '.join(str(a) for a in absentes)+" (lancer `python rafraichir.py`)."]
+	return [fig1, fig2]
+
+## calendrier des accidents par jour
+@enregistrer("calendrier des accidents par jour ( jour, mois, semaine )", mots='heatmap série', agregat='series', cout='moyen', dimensions=['day'])
+def Calendrier_Des_Accidents_Par_Jour(df, annee, mesure='accidents'):
+	cubes = series.charger()
+	if cubes is None:
+		return "Séries quotidiennes non disponibles : lancer `python rafraichir.py` pour les construire."
+	if series.absentes(cubes, pd.Timestamp(annee, 1, 1), pd.Timestamp(annee, 12, 31)):
+		return "Série quotidienne de "+str(annee)+" non disponible : lancer `python rafraichir.py` pour la construire."
+	fig, ax = plt.subplots(figsize=(16,4))
+	sns.heatmap(series.calendrier(cubes, mesure, annee), cmap='Reds', ax=ax,
+				yticklabels=['Lundi','Mardi','Mercredi','Jeudi','Vendredi','Samedi','Dimanche'])
+	plt.xlabel("Semaine de l'année")
+	plt.ylabel('')
+	plt.title('Calendrier du nombre de '+mesure+' ('+str(annee)+')');
+	return fig
+
+
+# paramètres des graphiques qui en ont : widgets affichés une fois, avant le rendu (st passé en argument)
+def controles_choroplethe(st, annee):
+	return {
+		'niveau': st.radio('Niveau', ['departement','region'], format_func={'departement':'Département','region':'Région'}.get, key='choro_niveau'),
+		'mesure': st.selectbox('Mesure', choroplethe.MESURES, key='choro_mesure'),
+		'annees': st.slider('Années', 2005, 2017, (int(annee), int(annee)), key='choro_annees'),
+		}
+
+def controles_points_noirs(st, annee):
+	return {
+		'annees': st.slider('Années', 2005, 2017, (int(annee), int(annee)), key='points_noirs_annees'),
+		'minimum': st.slider('Accidents graves minimum par grappe', 2, 100, points_noirs.MINIMUM, key='points_noirs_minimum'),
+		'nombre': st.slider('Grappes affichées', 10, 500, 100, step=10, key='points_noirs_nombre'),
+		}
+
+def controles_heure(st, annee):
+	return {'filtre': st.selectbox('Usagers', list(densite.FILTRES), key='filtre_heure')}
+
+def controles_age(st, annee):
+	return {'filtre': st.selectbox('Usagers', list(densite.FILTRES), key='filtre_age')}
+
+def controles_serie(st, annee):
+	cubes = series.charger()
+	if cubes is None:
+		return {}
+	debut, fin = series.periode(cubes)
+	parametres = {
+		'mesure': st.selectbox('Mesure', list(series.MESURES), key='serie_mesure'),
+		'regions': st.multiselect('Régions (toutes par défaut)', series.LISTE_REGIONS, key='serie_regions'),
+		'periode': st.date_input('Période', (debut.date(), fin.date()), min_value=debut.date(), max_value=fin.date(), key='serie_periode'),
+		'fenetre': st.slider('Moyenne glissante (jours)', 1, 90, 28, key='serie_fenetre'),
+		}
+	# période en cours de saisie (une seule date choisie)
+	if len(parametres['periode']) != 2:
+		parametres['periode'] = None
+	return parametres
+
+def controles_calendrier(st, annee):
+	return {'mesure': st.selectbox('Mesure', list(series.MESURES), key='calendrier_mesure')}
+
+
+graphs = {titre: declaration['fonction'] for titre, declaration in registre.items()}
+
+# index de recherche sur les titres et les mots-clés déclarés, construit une fois à l'import
+index = recherche.indexer({titre: titre + ' ' + declaration['mots'] for titre, declaration in registre.items()})
+
+
+def chercher(requete):
+	return [registre[titre] for titre in recherche.chercher(index, requete)]
+
+
+controles = {
+	Carte_Choroplèthe_Par_Département_Et_Région: controles_choroplethe,
+	Carte_Des_Points_Noirs: controles_points_noirs,
+	Distribution_Par_Heure_Minutes: controles_heure,
+	Distribution_Des_Accidentées_Par_Gravité_Des_Blessures_En_Fonction_De_Lâge: controles_age,
+	Série_Temporelle_Quotidienne: controles_serie,
+	Calendrier_Des_Accidents_Par_Jour: controles_calendrier,
+	}
+
+# graphique calculé depuis l'échantillon du palier (les densités le sont sans entrepôt local)
+def echantillon(graphique, annee):
+	agregat = declarations[graphique]['agregat']
+	return agregat == 'echantillon' or (agregat == 'densite' and not donnees.local(annee))
+
+
+# un graphique exact n'est rendu qu'une fois, les autres sont affinés palier après palier
+def exact(graphique, annee):
+	return not echantillon(graphique, annee)
+
+
+# colonnes de l'échantillon à charger pour un ensemble de graphiques (None : aucun ne s'en sert)
+def colonnes_echantillon(selection, annee):
+	utiles = [graphique for graphique in selection if echantillon(graphique, annee)]
+	if not utiles:
+		return None
+	return sorted({colonne for graphique in utiles for colonne in declarations[graphique]['colonnes']})
@@ -0,0 +1,48 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from commun import DOSSIER_DATASET
+
+# manifeste des données construites : pour chaque partition ou agrégat,
+# la signature des entrées à partir desquelles il a été produit
+CHEMIN_MANIFESTE = os.path.join(DOSSIER_DATASET, 'manifeste.json')
+
+
+# empreinte stable d'un dictionnaire d'entrées
+def signature(entrees):
+	texte = json.dumps(entrees, sort_keys=True, default=str)
+	return hashlib.sha1(texte.encode('utf-8')).hexdigest()
+
+
+def charger(chemin=CHEMIN_MANIFESTE):
+	if not os.path.exists(chemin):
+		return {}
+	with open(chemin, 'r') as f:
+		return json.load(f)
+
+
+def sauver(manifeste, chemin=CHEMIN_MANIFESTE):
+	os.makedirs(os.path.dirname(chemin) or '.', exist_ok=True)
+	with open(chemin + '.tmp', 'w') as f:
+		json.dump(manifeste, f, indent=1, sort_keys=True)
+	os.replace(chemin + '.tmp', chemin)
+
+
+# l'élément a-t-il été construit à partir de ces entrées exactement ?
+def a_jour(manifeste, cle, entrees):
+	return manifeste.get(cle, {}).get('signature') == signature(entrees)
+
+
+def enregistrer(manifeste, cle, entrees):
+	manifeste[cle] = {
+		'signature': signature(entrees),
+		'entrees': entrees,
+		'construit': datetime.now().isoformat(timespec='seconds'),
+		}
+
+
+# version des données d'une partition (utilisée pour invalider les caches en aval)
+def version(manifeste, cle):
+	return manifeste.get(cle, {}).get('signature')
@@ -0,0 +1,179 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# instrumentation des chemins chauds : durée et mémoire des chargements, agrégats, graphiques et prédictions,
+# taux de succès des caches. Les événements de l'exécution en cours (une par session streamlit) alimentent
+# le panneau de l'application ; les cumuls du process sont exportés au format texte Prometheus.
+
+# journal JSON (une ligne par événement) et fichier texte Prometheus (collecteur textfile), si définis
+JOURNAL = os.environ.get('PYSECUROUTE_JOURNAL')
+FICHIER_PROMETHEUS = os.environ.get('PYSECUROUTE_METRIQUES')
+
+_verrou = threading.Lock()
+_execution = threading.local()
+
+# cumuls du process : (etape, nom) -> [nombre, secondes, secondes max]
+_cumuls = {}
+
+# couches de cache : nom -> fonction renvoyant (succès, défauts)
+_couches = {}
+# compteurs des caches instrumentés à la main (st.cache) : nom -> [accès, défauts]
+_compteurs = {}
+
+
+# mémoire résidente du process (ou d'un autre process, par son pid) en Mo, None hors Linux
+def rss_mo(pid='self'):
+	try:
+		with open('/proc/{}/statm'.format(pid), 'r') as f:
+			pages = int(f.read().split()[1])
+	except (OSError, ValueError, IndexError):
+		return None
+	return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+# début d'une exécution du script : les événements précédents de la session sont oubliés
+def debut_execution():
+	_execution.evenements = []
+
+
+def evenements():
+	return getattr(_execution, 'evenements', [])
+
+
+def _enregistrer(evenement):
+	if not hasattr(_execution, 'evenements'):
+		_execution.evenements = []
+	_execution.evenements.append(evenement)
+	with _verrou:
+		cumul = _cumuls.setdefault((evenement['etape'], evenement['nom']), [0, 0.0, 0.0])
+		cumul[0] += 1
+		cumul[1] += evenement['secondes']
+		cumul[2] = max(cumul[2], evenement['secondes'])
+		if JOURNAL:
+			with open(JOURNAL, 'a', encoding='utf-8') as f:
+				f.write(json.dumps(evenement, ensure_ascii=False, default=str) + '\n')
+
+
+# mesure d'un bloc : with chrono('graphique', 'Graphique_Par_Sexe', '2009 / 1 %'): ...
+@contextmanager
+def chrono(etape, nom, details=''):
+	avant = rss_mo()
+	debut = time.perf_counter()
+	erreur = None
+	try:
+		yield
+	except Exception as e:
+		erreur = repr(e)
+		raise
+	finally:
+		apres = rss_mo()
+		evenement = {
+			'date': datetime.now().isoformat(timespec='milliseconds'),
+			'etape': etape,
+			'nom': nom,
+			'details': details,
+			'secondes': time.perf_counter() - debut,
+			'memoire_mo': None if apres is None else round(apres, 1),
+			'delta_memoire_mo': None if apres is None or avant is None else round(apres - avant, 1),
+			}
+		if erreur:
+			evenement['erreur'] = erreur
+		_enregistrer(evenement)
+
+
+def _details(args, kwargs):
+	texte = ', '.join([repr(a) for a in args if not hasattr(a, 'shape')] + ['{}={!r}'.format(k, v) for k, v in kwargs.items()])
+	return texte[:80]
+
+
+# décorateur : chaque appel de la fonction est mesuré sous l'étape donnée
+def instrumenter(etape, nom=None):
+	def decorateur(fonction):
+		@functools.wraps(fonction)
+		def enveloppe(*args, **kwargs):
+			with chrono(etape, nom or fonction.__module__ + '.' + fonction.__name__, _details(args, kwargs)):
+				return fonction(*args, **kwargs)
+		return enveloppe
+	return decorateur
+
+
+# déclaration d'une couche de cache functools.lru_cache (décorateur placé au-dessus de @lru_cache)
+def couche(nom):
+	def decorateur(fonction):
+		_couches[nom] = lambda: (fonction.cache_info().hits, fonction.cache_info().misses)
+		return fonction
+	return decorateur
+
+
+# caches sans statistiques (st.cache) : accès comptés à l'appel, défauts dans le corps de la fonction cachée
+def acces(nom):
+	with _verrou:
+		_compteurs.setdefault(nom, [0, 0])[0] += 1
+
+
+def defaut(nom):
+	with _verrou:
+		_compteurs.setdefault(nom, [0, 0])[1] += 1
+
+
+# succès, défauts et taux de succès de chaque couche de cache
+def caches():
+	lignes = {}
+	for nom, stats in _couches.items():
+		lignes[nom] = stats()
+	with _verrou:
+		for nom, (nombre, defauts) in _compteurs.items():
+			lignes[nom] = (max(nombre - defauts, 0), defauts)
+	return {
+		nom: {'succes': succes, 'defauts': defauts, 'taux': round(succes / (succes + defauts), 3) if succes + defauts else None}
+		for nom, (succes, defauts) in sorted(lignes.items())
+		}
+
+
+def _etiquettes(**valeurs):
+	return ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in valeurs.items())
+
+
+# cumuls du process au format texte Prometheus
+def prometheus():
+	lignes = [
+		'# HELP pysecuroute_duree_secondes Durée des étapes instrumentées',
+		'# TYPE pysecuroute_duree_secondes summary',
+		]
+	with _verrou:
+		cumuls = sorted(_cumuls.items())
+	for (etape, nom), (nombre, total, maximum) in cumuls:
+		e = _etiquettes(etape=etape, nom=nom)
+		lignes.append('pysecuroute_duree_secondes_count{%s} %d' % (e, nombre))
+		lignes.append('pysecuroute_duree_secondes_sum{%s} %.6f' % (e, total))
+	lignes += ['# HELP pysecuroute_duree_max_secondes Durée maximale observée',
+			   '# TYPE pysecuroute_duree_max_secondes gauge']
+	for (etape, nom), (nombre, total, maximum) in cumuls:
+		lignes.append('pysecuroute_duree_max_secondes{%s} %.6f' % (_etiquettes(etape=etape, nom=nom), maximum))
+	lignes += ['# HELP pysecuroute_cache_total Accès aux caches par résultat',
+			   '# TYPE pysecuroute_cache_total counter']
+	for nom, c in caches().items():
+		lignes.append('pysecuroute_cache_total{%s} %d' % (_etiquettes(couche=nom, resultat='succes'), c['succes']))
+		lignes.append('pysecuroute_cache_total{%s} %d' % (_etiquettes(couche=nom, resultat='defaut'), c['defauts']))
+	memoire = rss_mo()
+	if memoire is not None:
+		lignes += ['# HELP pysecuroute_memoire_residente_octets Mémoire résidente du process',
+				   '# TYPE pysecuroute_memoire_residente_octets gauge',
+				   'pysecuroute_memoire_residente_octets %d' % (memoire * 2 ** 20)]
+	return '\n'.join(lignes) + '\n'
+
+
+# export en fin d'exécution (fichier lu par le collecteur textfile de node_exporter)
+def ecrire_prometheus(chemin=None):
+	chemin = chemin or FICHIER_PROMETHEUS
+	if not chemin:
+		return
+	tmp = '{}.{}.tmp'.format(chemin, threading.get_ident())
+	with open(tmp, 'w', encoding='utf-8') as f:
+		f.write(prometheus())
+	os.replace(tmp, chemin)
@@ -0,0 +1,206 @@
+import pickle
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import metriques
+
+# variables explicatives attendues par le DecisionTree (dans l'ordre)
+FEATURES = ['catr','secu','nbv','col','agg','situ','obsm','larrout','obs']
+
+GRAVITES = {
+		1:'Indemne',
+		2:'Tué',
+		3:'Blessé hospitalisé',
+		4:'Blessé léger'
+		}
+
+# Catégorie de route
+catr_switch = {
+		'Autoroute':1,
+		'Route Nationale':2,
+		'Route Départementale':3,
+		'Voie Communale':4,
+		'Hors réseau public':5,
+		'Parc de stationnement public':6,
+		'Autre':9
+		}
+
+# Présence et utilisation d'équipement de sécurité
+secu_switch = {
+		'Ceinture utilisée':11,
+		'Ceinture non utilisée':12,
+		'Ceinture, utilisation indéterminable':13,
+		'Casque utilisé':21,
+		'Casque non utilisé':22,
+		'Casque, utilisation indéterminable':23,
+		'Dispositif enfants utilisé':31,
+		'Dispositif enfants non utilisé':32,
+		'Dispositif enfants, utilisation indéterminable':33,
+		'Equipement réfléchissant utilisé':41,
+		'Equipement réfléchissant non utilisé':42,
+		'Equipement réfléchissant, utilisation indéterminable':43,
+		'Autre équipement utilisé':91,
+		'Autre équipement non utilisé':92,
+		'Autre équipement, utilisation indéterminable':93
+		}
+
+# Type de collision
+col_switch = {
+		'Deux véhicules, collision frontale':1,
+		'Deux véhicules, collision par l\'arrière':2,
+		'Deux véhicules, collision par le coté':3,
+		'Trois véhicules et plus, collision en chaîne':4,
+		'Trois véhicules et plus, collisions multiples':5,
+		'Autres types de collision':6,
+		'Aucune collision':7
+		}
+
+# En/hors agglomération
+agg_switch = {
+		'Hors agglomération':1,
+		'En agglomération':2
+		}
+
+# Situation de l'accident
+situ_switch = {
+			'Sur chaussée':1,
+			"Sur bande d'arrêt d'urgence":2,
+			'Sur accotement':3,
+			'Sur trottoir':4,
+			'Sur piste cyclable':5
+		}
+
+# Obstacle mobile heurté
+obsm_switch = {
+		'Piéton':1,
+		'Véhicule':2,
+		'Véhicule sur rail':4,
+		'Animal domestique':5,
+		'Animal sauvage':6,
+		'Autre':9
+		}
+
+# Obstacle fixe heurté
+obs_switch = {
+		'Véhicule en stationnement':1,
+		'Arbre':2,
+		'Glissière métallique':3,
+		'Glissière béton':4,
+		'Autre type de glissière':5,
+		'Bâtiment, mur, pile de pont':6,
+		'Support de signalisation verticale ou poste d\'appel d\'urgence':7,
+		'Poteau':8,
+		'Mobilier urbain':9,
+		'Parapet':10,
+		'Ilot, refuge, borne haute':11,
+		'Bordure de trottoir':12,
+		'Fossé, talus, paroi rocheuse':13,
+		'Autre obstacle fixe sur la chaussée':14,
+		'Autre obstacle fixe sur le trottoir ou l\'accotement':15,
+		'Sortie de chaussée sans obstacle':16
+		}
+
+
+# chargement du modèle entraîné via pickle (une seule fois par process)
+@metriques.couche('modele.charger')
+@lru_cache(maxsize=None)
+def charger_modele(chemin='clf_dt3-pickle.pkl'):
+	with open(chemin, 'rb') as pickle_fichier:
+		return pickle.load(pickle_fichier)
+
+
+# distribution des classes pour chaque noeud de l'arbre, précalculée une fois par modèle
+@metriques.couche('modele.distributions')
+@lru_cache(maxsize=8)
+def distributions_noeuds(clf):
+	valeurs = clf.tree_.value[:, 0, :]
+	return valeurs / valeurs.sum(axis=1, keepdims=True)
+
+
+# prédiction + chemins de décision en une seule passe vectorisée
+# (fonctionne pour une ligne comme pour un lot complet)
+def expliquer(clf, X):
+	X = np.asarray(X, dtype=np.float32)
+	if X.ndim == 1:
+		X = X.reshape(1, -1)
+	tree = clf.tree_
+	dist = distributions_noeuds(clf)
+
+	chemins = clf.decision_path(X)
+	chemins.sort_indices()
+	indptr, noeuds = chemins.indptr, chemins.indices
+
+	# les identifiants croissent le long d'un chemin : la feuille est le dernier noeud
+	feuilles = noeuds[indptr[1:] - 1]
+	probas = dist[feuilles]
+	predictions = clf.classes_[probas.argmax(axis=1)]
+
+	# une étape par noeud interne traversé
+	lignes = np.repeat(np.arange(len(X)), np.diff(indptr))
+	internes = tree.children_left[noeuds] != -1
+	position = np.flatnonzero(internes)
+	noeud = noeuds[position]
+	feature = tree.feature[noeud]
+	seuil = tree.threshold[noeud]
+	valeur = X[lignes[position], feature]
+	etapes = pd.DataFrame({
+		'ligne': lignes[position],
+		'noeud': noeud,
+		'variable': np.asarray(FEATURES)[feature],
+		'seuil': seuil,
+		'valeur': valeur,
+		'gauche': valeur <= seuil,
+		'suivant': noeuds[position + 1],
+		})
+
+	return {
+		'predictions': predictions,
+		'probas': probas,
+		'classes': clf.classes_,
+		'etapes': etapes,
+		}
+
+
+# tableau lisible du chemin de décision d'une ligne
+def tableau_chemin(clf, explication, ligne=0):
+	etapes = explication['etapes']
+	etapes = etapes[etapes['ligne'] == ligne]
+	dist = distributions_noeuds(clf)
+	conditions = [
+		'{} {} {:g}'.format(v, '≤' if g else '>', s)
+		for v, g, s in zip(etapes['variable'], etapes['gauche'], etapes['seuil'])
+		]
+	tableau = pd.DataFrame({
+		'condition': conditions,
+		'valeur saisie': etapes['valeur'].astype(int).values,
+		})
+	probas = dist[etapes['suivant'].values]
+	for i, classe in enumerate(explication['classes']):
+		tableau[GRAVITES.get(classe, classe)] = (probas[:, i] * 100).round(1)
+	tableau.index = np.arange(1, len(tableau) + 1)
+	return tableau
+
+
+# Fonction qui réalisera la prédiction en utilisant les données entrées par l'utilisateur
+@metriques.instrumenter('prediction')
+def prediction(catr_select, secu_select, nbv_select, col_select, agg_select, situ_select, obsm_select, larrout_select, obs_select):
+	# Pre-processing des entrées de l'utilisateur
+	catr = catr_switch[catr_select]
+	secu = secu_switch[secu_select]
+	col = col_switch[col_select]
+	agg = agg_switch[agg_select]
+	situ = situ_switch[situ_select]
+	obsm = obsm_switch[obsm_select]
+	obs = obs_switch[obs_select]
+
+	# Largeur de route
+	larrout = larrout_select
+
+	# Nombre de voies
+	nbv = nbv_select
+
+	# Réalisation de la prediction personnalisée et de son explication
+	# ~ nos prédictions renvoient les modalités : 2,3,4
+	return expliquer(charger_modele(), [[catr, secu, nbv, col, agg, situ, obsm, larrout, obs]])
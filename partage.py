@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import echantillons
+import entrepot
+import manifeste
+import metriques
+import rafraichir
+from commun import ANNEES, DOSSIER_DERIVES
+
+# jeux annuels prétraités (donnees.preprocess) publiés une fois, au rafraîchissement, en fichiers .npy
+# que chaque process streamlit projette en mémoire en lecture seule (np.load(mmap_mode='r')) :
+# les pages sont partagées par le cache du système, un worker de plus ne coûte pas une copie de plus.
+#
+# partage/<annee>/<version>/ : une matrice par type de colonnes (colonnes x usagers), les codes des
+# catégories et les poids de chaque palier ; les usagers sont dans l'ordre des paliers (cf. etl.py),
+# le palier p est donc le début des matrices. partage/<annee>/courant désigne la version active :
+# il est remplacé atomiquement par une nouvelle publication et relu par les workers à chaque chargement.
+# meta.json garde l'empreinte de la partition publiée : une partition reconstruite depuis (etl.py seul)
+# n'est plus servie par la publication périmée, chaque chargement repasse par donnees.preparer.
+DOSSIER_PARTAGE = os.path.join(DOSSIER_DERIVES, 'partage')
+
+
+def dossier(annee):
+	return os.path.join(DOSSIER_PARTAGE, str(annee))
+
+
+def chemin_courant(annee):
+	return os.path.join(dossier(annee), 'courant')
+
+
+# version publiée de l'année (None si rien n'est publié)
+def version_courante(annee):
+	try:
+		with open(chemin_courant(annee), 'r') as f:
+			return f.read().strip() or None
+	except FileNotFoundError:
+		return None
+
+
+# empreinte des fichiers de la partition d'une année (taille et date de modification) : change à chaque
+# reconstruction, par rafraichir.py ou etl.py
+def empreinte(annee):
+	fichiers = [entrepot.chemin(annee, table) for table in entrepot.TABLES] + [entrepot.chemin_paliers(annee)]
+	return manifeste.signature({os.path.basename(f): [os.path.getsize(f), os.path.getmtime(f)]
+								for f in fichiers if os.path.exists(f)})
+
+
+def _sauver(chemin, tableau):
+	with open(chemin + '.tmp', 'wb') as f:
+		np.save(f, np.ascontiguousarray(tableau))
+	os.replace(chemin + '.tmp', chemin)
+
+
+# écriture d'un jeu prétraité complet dans le dossier d'une version
+def ecrire(df, paliers, destination, partition=None):
+	shutil.rmtree(destination, ignore_errors=True)
+	os.makedirs(destination)
+	meta = {'lignes': len(df), 'bornes': paliers['bornes'], 'blocs': {}, 'categories': {}, 'partition': partition}
+	colonnes = [c for c in df.columns if c != 'poids']
+	for colonne in colonnes:
+		serie = df[colonne]
+		if isinstance(serie.dtype, pd.CategoricalDtype):
+			codes = serie.cat.codes
+			meta['categories'][colonne] = {'valeurs': serie.cat.categories.tolist(), 'ordonnee': bool(serie.cat.ordered),
+										   'bloc': 'codes_' + str(codes.dtype)}
+			meta['blocs'].setdefault('codes_' + str(codes.dtype), []).append(colonne)
+		else:
+			meta['blocs'].setdefault(str(serie.dtype), []).append(colonne)
+	for i, noms in enumerate(meta['blocs'].values()):
+		valeurs = [df[c].cat.codes if c in meta['categories'] else df[c] for c in noms]
+		_sauver(os.path.join(destination, 'bloc_{}.npy'.format(i)), np.stack([v.to_numpy() for v in valeurs]))
+	for palier in range(len(echantillons.PALIERS)):
+		n = paliers['bornes'][palier]
+		_sauver(os.path.join(destination, 'poids_{}.npy'.format(palier)),
+				echantillons.poids(df['grav'].iloc[:n], paliers['effectifs'], palier))
+	with open(os.path.join(destination, 'meta.json'), 'w') as f:
+		json.dump(meta, f)
+
+
+# publication d'une année : nouvelle version écrite à part, puis bascule du pointeur 'courant' ;
+# les versions plus anciennes que la précédente sont supprimées (un worker peut encore lire la précédente)
+@rafraichir.derive('partage')
+def publier(annee):
+	import donnees
+	paliers = entrepot.paliers(annee)
+	if paliers is None:
+		return None
+	# une version par publication : partition d'origine et instant (une republication ne réécrit rien en place)
+	partition = empreinte(annee)
+	version = '{}-{}'.format(partition[:12], int(time.time() * 1000))
+	precedente = version_courante(annee)
+	destination = os.path.join(dossier(annee), version)
+	ecrire(donnees.preparer(annee), paliers, destination + '.tmp', partition)
+	os.replace(destination + '.tmp', destination)
+	with open(chemin_courant(annee) + '.tmp', 'w') as f:
+		f.write(version)
+	os.replace(chemin_courant(annee) + '.tmp', chemin_courant(annee))
+	for ancienne in os.listdir(dossier(annee)):
+		if ancienne not in (version, precedente, 'courant', 'courant.tmp'):
+			shutil.rmtree(os.path.join(dossier(annee), ancienne), ignore_errors=True)
+	return annee
+
+
+# projection en mémoire des fichiers d'une version (une fois par process et par version)
+@metriques.couche('partage.projections')
+@lru_cache(maxsize=2 * len(ANNEES))
+def _projeter(annee, version):
+	source = os.path.join(dossier(annee), version)
+	with open(os.path.join(source, 'meta.json'), 'r') as f:
+		meta = json.load(f)
+	blocs = {bloc: np.load(os.path.join(source, 'bloc_{}.npy'.format(i)), mmap_mode='r') for i, bloc in enumerate(meta['blocs'])}
+	poids = [np.load(os.path.join(source, 'poids_{}.npy'.format(palier)), mmap_mode='r')
+			 for palier in range(len(echantillons.PALIERS))]
+	return meta, blocs, poids
+
+
+# jeu prétraité d'un palier, adossé aux fichiers projetés (sans copie, en lecture seule) ;
+# None si l'année n'est pas publiée ou si sa publication est antérieure à la partition actuelle
+# (défauts de la couche 'partage.attacher' dans les métriques)
+def attacher(annee, palier):
+	metriques.acces('partage.attacher')
+	version = version_courante(annee)
+	if version is None:
+		metriques.defaut('partage.attacher')
+		return None
+	meta, blocs, poids = _projeter(annee, version)
+	if meta.get('partition') != empreinte(annee):
+		metriques.defaut('partage.attacher')
+		return None
+	n = meta['bornes'][palier]
+	parties = []
+	for bloc, noms in meta['blocs'].items():
+		if bloc.startswith('codes_'):
+			for i, colonne in enumerate(noms):
+				categories = meta['categories'][colonne]
+				codes = blocs[bloc][i, :n]
+				parties.append(pd.Series(pd.Categorical.from_codes(codes, categories['valeurs'], categories['ordonnee']), name=colonne, copy=False))
+		else:
+			parties.append(pd.DataFrame(blocs[bloc][:, :n].T, columns=noms, copy=False))
+	parties.append(pd.Series(poids[palier], name='poids', copy=False))
+	return pd.concat(parties, axis=1, copy=False)
@@ -0,0 +1,190 @@
+import argparse
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import entrepot
+import metriques
+import rafraichir
+from commun import ANNEES, DOSSIER_DERIVES, mercator
+
+# points noirs : regroupement des accidents graves (un tué ou un blessé hospitalisé, grav_acc 2/3)
+# selon leur position projetée, sur une période quelconque.
+#
+# Au rafraîchissement, chaque année (en parallèle, cf. rafraichir.py) compte ses accidents graves par
+# cellule d'une grille uniforme de CELLULE mètres (mercator). Pour une période, les grilles annuelles
+# sont additionnées puis chaque cellule est rattachée à la plus dense de ses 8 voisines (densité : accidents
+# de la fenêtre 3 x 3 autour de la cellule) : les grappes sont les bassins des maxima locaux. Les voisines
+# sont trouvées par recherche dichotomique dans les clés triées des cellules, sans comparer les accidents
+# deux à deux : le coût est en n log n du nombre de cellules occupées.
+DOSSIER_POINTS_NOIRS = os.path.join(DOSSIER_DERIVES, 'points_noirs')
+
+# côté d'une cellule en mètres mercator (de 125 à 150 m au sol en métropole selon la latitude : 200 x cos(latitude))
+CELLULE = 200
+# décalage des indices de cellule (positifs sur toute la projection) et largeur d'une colonne de clés
+DECALAGE = 2 ** 17
+GRAVITES = [2, 3]
+# accidents graves minimum d'une grappe retenue
+MINIMUM = 10
+
+# comptes par cellule : accidents graves, accidents mortels, tués, blessés hospitalisés, sommes des positions
+COMPTES = ['accidents', 'mortels', 'tués', 'blessés hospitalisés']
+VOISINES = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+def chemin(annee):
+	return os.path.join(DOSSIER_POINTS_NOIRS, '{}.npz'.format(annee))
+
+
+def cles(ix, iy):
+	return (ix.astype(np.int64) + DECALAGE) * (2 * DECALAGE) + (iy.astype(np.int64) + DECALAGE)
+
+
+# accidents graves d'une année comptés par cellule de la grille
+def grille(accidents, usagers):
+	tues = np.bincount(usagers.loc[usagers['grav'] == 2, 'acc_id'], minlength=len(accidents))
+	hospitalises = np.bincount(usagers.loc[usagers['grav'] == 3, 'acc_id'], minlength=len(accidents))
+	long = pd.to_numeric(accidents['long'], errors='coerce').to_numpy(dtype=np.float64)
+	lat = pd.to_numeric(accidents['lat'], errors='coerce').to_numpy(dtype=np.float64)
+	# positions absentes : NaN ou 0 dans les fichiers sources
+	graves = accidents['grav_acc'].isin(GRAVITES).to_numpy() & (long != 0) & (lat != 0) & np.isfinite(long) & np.isfinite(lat)
+	x, y = mercator(long[graves] / 100000, lat[graves] / 100000)
+	ix = np.floor(x / CELLULE).astype(np.int32)
+	iy = np.floor(y / CELLULE).astype(np.int32)
+	occupees, inverse = np.unique(cles(ix, iy), return_inverse=True)
+	premier = np.zeros(len(occupees), dtype=np.int64)
+	premier[inverse] = np.arange(len(inverse))
+	def somme(valeurs):
+		return np.bincount(inverse, weights=valeurs, minlength=len(occupees))
+	return {
+		'ix': ix[premier],
+		'iy': iy[premier],
+		'accidents': np.bincount(inverse, minlength=len(occupees)).astype(np.int32),
+		'mortels': somme((accidents['grav_acc'].to_numpy()[graves] == 2).astype(float)).astype(np.int32),
+		'tués': somme(tues[graves].astype(float)).astype(np.int32),
+		'blessés hospitalisés': somme(hospitalises[graves].astype(float)).astype(np.int32),
+		'sx': somme(x),
+		'sy': somme(y),
+		}
+
+
+# grille d'une année, calculée au rafraîchissement
+@rafraichir.derive('points_noirs')
+def construire_annee(annee):
+	accidents = entrepot.vue(annee, ['long', 'lat', 'grav_acc'], niveau='accident')
+	usagers = entrepot.lire(annee, 'usagers', ['acc_id', 'grav'])
+	os.makedirs(DOSSIER_POINTS_NOIRS, exist_ok=True)
+	np.savez(chemin(annee) + '.tmp.npz', **grille(accidents, usagers))
+	os.replace(chemin(annee) + '.tmp.npz', chemin(annee))
+	return annee
+
+
+# indice de chaque clé dans les clés triées de la grille (-1 si la cellule est vide)
+def positions(occupees, voisines):
+	i = np.minimum(np.searchsorted(occupees, voisines), len(occupees) - 1)
+	return np.where(occupees[i] == voisines, i, -1)
+
+
+# grappes des cellules d'une période : indice de la cellule maximum locale (racine) de chaque cellule
+def rattacher(ix, iy, accidents):
+	occupees = cles(ix, iy)
+	voisines = [positions(occupees, cles(ix + dx, iy + dy)) for dx, dy in VOISINES]
+	densite = np.zeros(len(occupees), dtype=np.int64)
+	for i in voisines:
+		densite += np.where(i >= 0, accidents[i], 0)
+	# plus dense des voisines (la cellule elle-même comprise), à égalité la plus grande clé : pas de cycle
+	parent = np.arange(len(occupees))
+	for i in voisines:
+		meilleure = (i >= 0) & ((densite[i] > densite[parent]) | ((densite[i] == densite[parent]) & (i > parent)))
+		parent = np.where(meilleure, i, parent)
+	# saut de pointeurs jusqu'aux racines
+	while True:
+		suivant = parent[parent]
+		if np.array_equal(suivant, parent):
+			return parent, densite
+		parent = suivant
+
+
+def _charger_annee(annee):
+	with np.load(chemin(annee)) as f:
+		return {nom: f[nom] for nom in f.files}
+
+
+# inverse de la projection mercator (degrés)
+def degres(x, y):
+	k = 6378137
+	return x / (k * np.pi / 180.0), 360.0 / np.pi * np.arctan(np.exp(y / k)) - 90
+
+
+# grappes d'une période classées par nombre d'accidents graves, avec leurs comptes par année
+# et leur tendance (pente des moindres carrés, en accidents graves par an) ; None sans grilles annuelles
+@metriques.instrumenter('agregat')
+def grappes(annees):
+	annees = tuple(a for a in sorted(annees) if os.path.exists(chemin(a)))
+	if not annees:
+		return None
+	return _grappes(annees, tuple(os.path.getmtime(chemin(a)) for a in annees))
+
+
+@metriques.couche('points_noirs.grappes')
+@lru_cache(maxsize=8)
+def _grappes(annees, mtimes):
+	grilles = [_charger_annee(annee) for annee in annees]
+	rang = np.concatenate([np.full(len(g['ix']), i) for i, g in enumerate(grilles)])
+	cellules = {nom: np.concatenate([g[nom] for g in grilles]) for nom in grilles[0]}
+
+	# cellules de la période : grilles annuelles additionnées
+	occupees, inverse = np.unique(cles(cellules['ix'], cellules['iy']), return_inverse=True)
+	premier = np.zeros(len(occupees), dtype=np.int64)
+	premier[inverse] = np.arange(len(inverse))
+	sommes = {nom: np.bincount(inverse, weights=cellules[nom], minlength=len(occupees)) for nom in COMPTES + ['sx', 'sy']}
+	parent, densite = rattacher(cellules['ix'][premier], cellules['iy'][premier], sommes['accidents'].astype(np.int64))
+
+	# comptes des grappes
+	racines, grappe = np.unique(parent, return_inverse=True)
+	resultat = pd.DataFrame({nom: np.bincount(grappe, weights=sommes[nom]).astype(int) for nom in COMPTES})
+	resultat['cellules'] = np.bincount(grappe)
+	resultat['densité max'] = densite[racines]
+	# barycentre des accidents de la grappe
+	resultat['x'] = np.bincount(grappe, weights=sommes['sx']) / resultat['accidents']
+	resultat['y'] = np.bincount(grappe, weights=sommes['sy']) / resultat['accidents']
+	resultat['longitude'], resultat['latitude'] = degres(resultat['x'], resultat['y'])
+
+	# accidents graves par grappe et par année, tendance
+	par_annee = np.bincount(grappe[inverse] * len(annees) + rang, weights=cellules['accidents'],
+							minlength=len(racines) * len(annees)).reshape(len(racines), len(annees))
+	t = np.array(annees, dtype=float) - np.mean(annees)
+	resultat['tendance'] = par_annee @ t / (t @ t) if len(annees) > 1 else np.nan
+	for i, annee in enumerate(annees):
+		resultat[str(annee)] = par_annee[:, i].astype(int)
+
+	resultat = resultat.sort_values(['accidents', 'tués'], ascending=False, kind='mergesort').reset_index(drop=True)
+	resultat.index = resultat.index + 1
+	resultat.index.name = 'rang'
+	return resultat
+
+
+# grappes retenues (au moins 'minimum' accidents graves), les 'nombre' premières
+def points_noirs(annees, minimum=MINIMUM, nombre=None):
+	resultat = grappes(annees)
+	if resultat is None:
+		return None
+	resultat = resultat[resultat['accidents'] >= minimum]
+	return resultat if nombre is None else resultat.head(nombre)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Points noirs : grappes des accidents graves sur une période')
+	parser.add_argument('--annees', nargs=2, type=int, default=[min(ANNEES), max(ANNEES)], metavar=('DEBUT', 'FIN'))
+	parser.add_argument('--minimum', type=int, default=MINIMUM, help='accidents graves minimum par grappe')
+	parser.add_argument('--nombre', type=int, default=30)
+	args = parser.parse_args()
+
+	resultat = points_noirs(range(args.annees[0], args.annees[1] + 1), args.minimum, args.nombre)
+	if resultat is None:
+		print('grilles annuelles absentes : lancer `python rafraichir.py`')
+	else:
+		pd.set_option('display.width', 200)
+		print(resultat.drop(columns=['x', 'y']).round(2).to_string())
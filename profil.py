@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import catalogue
+import etl
+import metriques
+import rafraichir
+from commun import ANNEES, DOSSIER_BRUT, DOSSIER_DERIVES
+
+DOSSIER_PROFIL = os.path.join(DOSSIER_DERIVES, 'profil')
+CHEMIN_PROFIL = os.path.join(DOSSIER_DERIVES, 'profil.json')
+
+# au-delà, seules les modalités les plus fréquentes d'une colonne sont gardées (identifiants, coordonnées, adresses...)
+LIMITE_MODALITES = 1000
+
+
+# profil d'une colonne : nombre de valeurs, de NaN et fréquences des modalités
+# (sous-estimées d'au plus 'erreur' une fois la colonne tronquée)
+def _colonne():
+	return {'n': 0, 'nan': 0, 'frequences': Counter(), 'tronque': False, 'erreur': 0}
+
+
+# valeurs numériques écrites différemment selon les années ou les morceaux ('60.0', '60.50') ramenées
+# à une seule écriture ('60', '60.5') ; les codes à zéros en tête ('01') sont gardés tels quels
+def _normaliser(comptes):
+	index = comptes.index.str.replace(r'^(-?\d+\.\d*?)0+$', r'\1', regex=True).str.replace(r'^(-?\d+)\.$', r'\1', regex=True)
+	return comptes.groupby(index).sum()
+
+
+# résumé de Misra-Gries : au-delà de LIMITE_MODALITES compteurs, le (LIMITE_MODALITES + 1)-ième compte est retiré
+# de tous et les compteurs tombés à zéro disparaissent. Une modalité de fréquence supérieure à n / (LIMITE_MODALITES + 1)
+# est toujours gardée, le mode en particulier ; les résumés annuels se fusionnent de la même façon
+def _reduire(profil):
+	if len(profil['frequences']) <= LIMITE_MODALITES:
+		return
+	seuil = sorted(profil['frequences'].values(), reverse=True)[LIMITE_MODALITES]
+	profil['frequences'] = Counter({v: c - seuil for v, c in profil['frequences'].items() if c > seuil})
+	profil['erreur'] += seuil
+	profil['tronque'] = True
+
+
+def _ajouter(profil, serie):
+	profil['n'] += len(serie)
+	profil['nan'] += int(serie.isna().sum())
+	comptes = serie.value_counts(dropna=True)
+	if len(comptes):
+		profil['frequences'].update(_normaliser(comptes).to_dict())
+	_reduire(profil)
+
+
+# une seule lecture par morceaux de chaque fichier de l'année
+def profiler_annee(annee, dossier_brut=DOSSIER_BRUT, chunksize=100000):
+	profil = {}
+	for table, chemin in sorted(etl.fichiers_annee(annee, dossier_brut).items()):
+		encodage, separateur = etl.detecter_format(chemin)
+		colonnes = {}
+		for morceau in pd.read_csv(chemin, sep=separateur, encoding=encodage, dtype=str, chunksize=chunksize):
+			for col in morceau.columns:
+				valeurs = morceau[col].str.strip()
+				_ajouter(colonnes.setdefault(col, _colonne()), valeurs.where(valeurs != ''))
+		profil[table] = colonnes
+	return profil
+
+
+# fusion des profils annuels
+def fusionner(profils):
+	total = {}
+	for profil in profils:
+		for table, colonnes in profil.items():
+			for col, p in colonnes.items():
+				t = total.setdefault(table, {}).setdefault(col, _colonne())
+				t['n'] += p['n']
+				t['nan'] += p['nan']
+				t['tronque'] = t['tronque'] or p['tronque']
+				t['erreur'] += p.get('erreur', 0)
+				t['frequences'].update(p['frequences'])
+				_reduire(t)
+	return total
+
+
+def _vers_json(profil):
+	return {
+		table: {
+			col: {
+				'n': p['n'],
+				'nan': p['nan'],
+				'tronque': p['tronque'],
+				'erreur': p['erreur'],
+				'frequences': dict(p['frequences'].most_common()),
+				}
+			for col, p in colonnes.items()
+			}
+		for table, colonnes in profil.items()
+		}
+
+
+def _depuis_json(data):
+	return {
+		table: {col: dict(p, frequences=Counter(p['frequences']), erreur=p.get('erreur', 0)) for col, p in colonnes.items()}
+		for table, colonnes in data.items()
+		}
+
+
+def _ecrire(data, chemin):
+	os.makedirs(os.path.dirname(chemin), exist_ok=True)
+	with open(chemin + '.tmp', 'w') as f:
+		json.dump(data, f, ensure_ascii=False)
+	os.replace(chemin + '.tmp', chemin)
+
+
+@metriques.instrumenter('chargement')
+def charger(chemin=CHEMIN_PROFIL):
+	if not os.path.exists(chemin):
+		return None
+	with open(chemin, 'r') as f:
+		return json.load(f)
+
+
+# rapport consolidé sur la période
+def construire_fusion(annees):
+	profils = [_depuis_json(charger(os.path.join(DOSSIER_PROFIL, '{}.json'.format(annee)))) for annee in annees]
+	rapport = _vers_json(fusionner(profils))
+	rapport['annees'] = list(annees)
+	_ecrire(rapport, CHEMIN_PROFIL)
+	return rapport
+
+
+# profil d'une année mis en cache (agrégat déclaré au rafraîchissement)
+@rafraichir.derive('profil', fusion=construire_fusion)
+def construire_annee(annee):
+	_ecrire(_vers_json(profiler_annee(annee)), os.path.join(DOSSIER_PROFIL, '{}.json'.format(annee)))
+	return annee
+
+
+# synthèse par colonne : NaN, nombre de modalités, mode (équivalent de show_nan_rep et des boucles sur unique()) ;
+# le mode d'une colonne tronquée vient de ses modalités les plus fréquentes
+def synthese(rapport):
+	lignes = []
+	for table in catalogue.TABLES:
+		for col, p in rapport.get(table, {}).items():
+			frequences = p['frequences']
+			lignes.append({
+				'table': table,
+				'colonne': col,
+				'nbre': p['n'],
+				'NaN': p['nan'],
+				'%': round(p['nan'] / p['n'] * 100, 2) if p['n'] else 0,
+				'modalités': '> {}'.format(LIMITE_MODALITES) if p['tronque'] else len(frequences),
+				'mode': max(frequences, key=frequences.get) if frequences else None,
+				})
+	return pd.DataFrame(lignes)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Profil des données brutes (NaN, modalités, modes) en une passe par année')
+	parser.add_argument('annees', nargs='*', type=int, default=ANNEES)
+	parser.add_argument('--workers', type=int, help='nombre de process (défaut : nombre de coeurs)')
+	args = parser.parse_args()
+
+	with ProcessPoolExecutor(max_workers=min(args.workers or os.cpu_count() or 1, len(args.annees))) as pool:
+		list(pool.map(construire_annee, args.annees))
+	rapport = construire_fusion(args.annees)
+	print(synthese(rapport).sort_values(by='NaN', ascending=False).to_string(index=False))
@@ -0,0 +1,132 @@
+import argparse
+import importlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import catalogue
+import etl
+import manifeste
+import telechargement
+from commun import ANNEES
+
+# agrégats dérivés des partitions annuelles : nom -> {'annee': fonction(annee), 'fusion': fonction(annees), 'version': n}
+DERIVES = {}
+
+# modules déclarant des agrégats (importés au moment du rafraîchissement)
+MODULES_DERIVES = ['profil', 'densite', 'series', 'choroplethe', 'points_noirs', 'partage']
+
+
+# déclaration d'un agrégat construit année par année (et éventuellement fusionné sur la période)
+def derive(nom, fusion=None, version=1):
+	def decorateur(fonction):
+		DERIVES[nom] = {'annee': fonction, 'fusion': fusion, 'version': version}
+		return fonction
+	return decorateur
+
+
+def charger_derives():
+	for module in MODULES_DERIVES:
+		importlib.import_module(module)
+	return DERIVES
+
+
+# entrées d'une partition : dateModified et taille des 4 fichiers de l'année dans data.json
+def entrees_annee(annee):
+	return {r['nom']: [r['modifie'], r['taille']] for r in catalogue.ressources_annee(annee).values()}
+
+
+# clés des tâches réussies, au fur et à mesure qu'elles se terminent ; les échecs sont notés dans 'erreurs'
+def _executer(pool, taches, erreurs):
+	futures = {pool.submit(*tache): cle for cle, tache in taches.items()}
+	for future in as_completed(futures):
+		cle = futures[future]
+		try:
+			future.result()
+		except Exception as e:
+			erreurs[cle] = repr(e)
+			print('(erreur) {} : {!r}'.format(cle, e))
+			continue
+		yield cle
+
+
+# reconstruction des seules partitions, agrégats et fusions dont les entrées ont changé
+def rafraichir(annees=ANNEES, workers=None, telecharger=True, miroir=None, forcer=False):
+	annees = sorted(annees)
+	derives = charger_derives()
+	m = manifeste.charger()
+	bilan = {'partitions': [], 'derives': [], 'fusions': []}
+
+	if telecharger:
+		_, erreurs = telechargement.telecharger_tout(annees, miroir=miroir)
+		if erreurs:
+			raise IOError('téléchargement incomplet : ' + ', '.join(sorted(erreurs)))
+
+	# échecs par partition (année) ou agrégat ('derives/<nom>/<année>')
+	erreurs = {}
+
+	entrees = {annee: entrees_annee(annee) for annee in annees}
+	workers = min(workers or os.cpu_count() or 1, max(len(annees), 1))
+	with ProcessPoolExecutor(max_workers=workers) as pool:
+
+		# partitions annuelles
+		taches = {
+			annee: (etl.construire_annee, annee)
+			for annee in annees
+			if forcer or not manifeste.a_jour(m, 'annees/{}'.format(annee), entrees[annee])
+			}
+		# chaque année terminée est inscrite tout de suite : un échec n'oblige pas à reconstruire les autres
+		for annee in _executer(pool, taches, erreurs):
+			manifeste.enregistrer(m, 'annees/{}'.format(annee), entrees[annee])
+			manifeste.sauver(m)
+			bilan['partitions'].append(annee)
+			print('(done) partition {}'.format(annee))
+
+		# agrégats annuels : dépendent de la version de la partition et du code qui les produit
+		versions = {annee: manifeste.version(m, 'annees/{}'.format(annee)) for annee in annees}
+		taches, cles = {}, {}
+		for nom, d in derives.items():
+			for annee in annees:
+				if annee in erreurs:
+					continue
+				cle = 'derives/{}/{}'.format(nom, annee)
+				cles[cle] = {'partition': versions[annee], 'version': d['version']}
+				if forcer or not manifeste.a_jour(m, cle, cles[cle]):
+					taches[cle] = (d['annee'], annee)
+		for cle in _executer(pool, taches, erreurs):
+			manifeste.enregistrer(m, cle, cles[cle])
+			manifeste.sauver(m)
+			bilan['derives'].append(cle)
+			print('(done) ' + cle)
+
+	# fusions sur toutes les années construites : dépendent des agrégats annuels qui les composent
+	construites = sorted(int(cle.split('/')[1]) for cle in m if cle.startswith('annees/'))
+	for nom, d in derives.items():
+		# pas de fusion sur des agrégats annuels en échec
+		if d['fusion'] is None or any(str(cle).startswith('derives/{}/'.format(nom)) for cle in erreurs):
+			continue
+		cle = 'fusions/{}'.format(nom)
+		composants = {annee: manifeste.version(m, 'derives/{}/{}'.format(nom, annee)) for annee in construites}
+		if forcer or not manifeste.a_jour(m, cle, composants):
+			d['fusion'](construites)
+			manifeste.enregistrer(m, cle, composants)
+			bilan['fusions'].append(cle)
+			print('(done) ' + cle)
+	manifeste.sauver(m)
+
+	if erreurs:
+		raise RuntimeError('rafraîchissement incomplet : ' + ', '.join('{} ({})'.format(cle, e) for cle, e in erreurs.items()))
+	return bilan
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="Rafraîchissement incrémental : ne reconstruit que ce dont les fichiers sources ont changé")
+	parser.add_argument('annees', nargs='*', type=int, default=ANNEES)
+	parser.add_argument('--workers', type=int, help='nombre de process (défaut : nombre de coeurs)')
+	parser.add_argument('--sans-telechargement', action='store_true', help='utiliser les fichiers bruts déjà présents')
+	parser.add_argument('--miroir', help="URL d'un miroir servant les fichiers par nom")
+	parser.add_argument('--forcer', action='store_true', help='tout reconstruire')
+	args = parser.parse_args()
+
+	# les modules d'agrégats s'enregistrent auprès du module 'rafraichir', pas de '__main__'
+	import rafraichir as module
+	module.rafraichir(args.annees, args.workers, not args.sans_telechargement, args.miroir, args.forcer)
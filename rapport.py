@@ -0,0 +1,226 @@
+import argparse
+import hashlib
+import html
+import inspect
+import io
+import json
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+import choroplethe
+import densite
+import donnees
+import graphiques
+import manifeste
+import points_noirs
+import series
+from commun import ANNEES
+
+# rapport statique : chaque graphique de graphiques.graphs pour chaque année (et période), sans streamlit
+DOSSIER_RAPPORT = 'rapport'
+FORMATS = ['png', 'svg', 'html']
+
+# modules dont le code détermine le rendu (une modification invalide tout le rapport)
+MODULES_RENDU = [graphiques, donnees, densite, series, choroplethe, points_noirs]
+
+
+def slug(titre):
+	texte = unicodedata.normalize('NFKD', titre).encode('ascii', 'ignore').decode('ascii')
+	return re.sub(r'[^a-z0-9]+', '-', texte.lower()).strip('-')
+
+
+def version_code():
+	sources = ''.join(inspect.getsource(module) for module in MODULES_RENDU)
+	return hashlib.sha1(sources.encode('utf-8')).hexdigest()
+
+
+# version des données d'un ensemble d'années : partitions et agrégats du manifeste, fusions comprises
+def version_donnees(m, annees):
+	suffixes = tuple('/{}'.format(annee) for annee in annees)
+	entrees = {cle: manifeste.version(m, cle) for cle in m if cle.endswith(suffixes) or cle.startswith('fusions/')}
+	if not any(cle.startswith('annees/') for cle in entrees):
+		entrees['distant'] = donnees.URL_DONNEES
+	return manifeste.signature(entrees)
+
+
+def _initialiser():
+	matplotlib.use('Agg')
+
+
+def _ecrire_texte(chemin, texte):
+	with open(chemin + '.tmp', 'w', encoding='utf-8') as f:
+		f.write(texte)
+	os.replace(chemin + '.tmp', chemin)
+
+
+def _page(titre, corps):
+	return '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{}</title></head>\n<body>\n{}\n</body></html>\n' \
+		.format(html.escape(titre), corps)
+
+
+# écriture du résultat d'un graphique dans les formats demandés ; renvoie les fichiers écrits (relatifs au dossier)
+def ecrire(resultat, dossier, nom, formats, titre=''):
+	if isinstance(resultat, list):
+		fichiers = []
+		for i, r in enumerate(resultat):
+			fichiers += ecrire(r, dossier, '{}_{}'.format(nom, i + 1), formats, titre)
+		return fichiers
+	os.makedirs(os.path.dirname(os.path.join(dossier, nom)), exist_ok=True)
+	fichiers = []
+	if isinstance(resultat, plt.Figure):
+		for fmt in formats:
+			fichier = nom + '.' + fmt
+			if fmt == 'html':
+				svg = io.StringIO()
+				resultat.savefig(svg, format='svg', bbox_inches='tight')
+				_ecrire_texte(os.path.join(dossier, fichier), _page(titre, svg.getvalue()))
+			else:
+				resultat.savefig(os.path.join(dossier, fichier + '.tmp'), format=fmt, bbox_inches='tight')
+				os.replace(os.path.join(dossier, fichier + '.tmp'), os.path.join(dossier, fichier))
+			fichiers.append(fichier)
+		plt.close(resultat)
+	elif isinstance(resultat, (pd.DataFrame, pd.Series)):
+		# tableaux : html seulement
+		if 'html' in formats:
+			_ecrire_texte(os.path.join(dossier, nom + '.html'), _page(titre, resultat.to_frame().to_html() if isinstance(resultat, pd.Series) else resultat.to_html()))
+			fichiers.append(nom + '.html')
+	elif not isinstance(resultat, str):
+		# figures bokeh : html autonome (png/svg demanderaient un navigateur)
+		if 'html' in formats:
+			from bokeh.embed import file_html
+			from bokeh.resources import CDN
+			_ecrire_texte(os.path.join(dossier, nom + '.html'), file_html(resultat, CDN, titre))
+			fichiers.append(nom + '.html')
+	return fichiers
+
+
+# rendu (dans un process) des graphiques d'une année ou d'une période : [(titre, annee, parametres, nom)]
+def rendre(taches, dossier, formats):
+	df = {}
+	resultats = {}
+	for titre, annee, parametres, nom in taches:
+		graphique = graphiques.graphs[titre]
+		if not graphiques.exact(graphique, annee) and annee not in df:
+			df[annee] = donnees.preprocess(annee)
+		try:
+			resultat = graphique(df.get(annee), annee, **parametres)
+			fichiers = ecrire(resultat, dossier, nom, formats, titre)
+			resultats[nom] = {'fichiers': fichiers} if fichiers else {'message': str(resultat) if isinstance(resultat, str) else 'aucun format applicable'}
+		except Exception as e:
+			resultats[nom] = {'erreur': repr(e)}
+		plt.close('all')
+	return resultats
+
+
+def charger_etat(dossier):
+	chemin = os.path.join(dossier, 'etat.json')
+	if not os.path.exists(chemin):
+		return {}
+	with open(chemin, 'r') as f:
+		return json.load(f)
+
+
+def _sauver_etat(etat, dossier):
+	_ecrire_texte(os.path.join(dossier, 'etat.json'), json.dumps(etat, indent=1, sort_keys=True))
+
+
+# page d'index : un tableau graphique x année (ou période), liens vers les fichiers produits
+def ecrire_index(etat, dossier):
+	colonnes = sorted({e['groupe'] for e in etat.values()})
+	lignes = sorted({e['titre'] for e in etat.values()})
+	corps = ['<h1>PySecuRoute - rapport</h1>', '<table border="1" cellpadding="4">',
+			 '<tr><th></th>' + ''.join('<th>{}</th>'.format(c) for c in colonnes) + '</tr>']
+	par_cellule = {(e['titre'], e['groupe']): e for e in etat.values()}
+	for titre in lignes:
+		cellules = []
+		for groupe in colonnes:
+			e = par_cellule.get((titre, groupe))
+			if e is None:
+				cellules.append('<td></td>')
+			elif e.get('fichiers'):
+				cellules.append('<td>' + ' '.join('<a href="{0}">{1}</a>'.format(html.escape(f), f.rsplit('.', 1)[1])
+											   for f in e['fichiers']) + '</td>')
+			else:
+				cellules.append('<td title="{}">-</td>'.format(html.escape(e.get('message') or e.get('erreur', ''))))
+		corps.append('<tr><th align="left">{}</th>{}</tr>'.format(html.escape(titre), ''.join(cellules)))
+	corps.append('</table>')
+	_ecrire_texte(os.path.join(dossier, 'index.html'), _page('PySecuRoute - rapport', '\n'.join(corps)))
+
+
+# graphiques paramétrés par une plage d'années (rendus aussi pour chaque période demandée)
+def par_periode(graphique):
+	return 'annees' in inspect.signature(graphique).parameters
+
+
+def generer(annees=ANNEES, periodes=(), formats=FORMATS, workers=None, dossier=DOSSIER_RAPPORT, mots=None, forcer=False):
+	m = manifeste.charger()
+	etat = charger_etat(dossier)
+	code = version_code()
+	titres = [t for t in graphiques.graphs if not mots or any(mot in t for mot in mots)]
+
+	# groupes de rendu : une année, ou une période pour les graphiques qui en acceptent une
+	groupes = {str(annee): [(titre, annee, {}) for titre in titres] for annee in annees}
+	for debut, fin in periodes:
+		groupes['{}-{}'.format(debut, fin)] = [
+			(titre, fin, {'annees': (debut, fin)}) for titre in titres if par_periode(graphiques.graphs[titre])]
+
+	taches, versions = {}, {}
+	for groupe, graphes in groupes.items():
+		debut, _, fin = groupe.partition('-')
+		donnees_groupe = version_donnees(m, range(int(debut), int(fin or debut) + 1))
+		for titre, annee, parametres in graphes:
+			nom = '{}/{}'.format(groupe, slug(titre))
+			versions[nom] = manifeste.signature({'donnees': donnees_groupe, 'code': code, 'parametres': parametres, 'formats': formats})
+			precedent = etat.get(nom, {})
+			inchange = precedent.get('version') == versions[nom] and precedent.get('fichiers') \
+				and all(os.path.exists(os.path.join(dossier, f)) for f in precedent['fichiers'])
+			if forcer or not inchange:
+				taches.setdefault(groupe, []).append((titre, annee, parametres, nom))
+			etat[nom] = dict(precedent, titre=titre, groupe=groupe)
+
+	bilan = {'rendus': 0, 'inchanges': sum(len(g) for g in groupes.values()) - sum(len(t) for t in taches.values()), 'erreurs': 0}
+	os.makedirs(dossier, exist_ok=True)
+	if taches:
+		workers = min(workers or os.cpu_count() or 1, len(taches))
+		with ProcessPoolExecutor(max_workers=workers, initializer=_initialiser) as pool:
+			futures = {pool.submit(rendre, t, dossier, formats): groupe for groupe, t in taches.items()}
+			for future in as_completed(futures):
+				for nom, resultat in future.result().items():
+					etat[nom] = dict(etat[nom], version=versions[nom] if 'fichiers' in resultat else None, **{
+						'fichiers': resultat.get('fichiers', []),
+						'message': resultat.get('message'),
+						'erreur': resultat.get('erreur'),
+						})
+					bilan['erreurs' if 'erreur' in resultat else 'rendus'] += 1
+				_sauver_etat(etat, dossier)
+				print('(done) {}'.format(futures[future]))
+	ecrire_index(etat, dossier)
+	return bilan
+
+
+def _periode(texte):
+	debut, fin = texte.split('-')
+	return int(debut), int(fin)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Rendu statique de tous les graphiques, pour chaque année (sans streamlit)')
+	parser.add_argument('annees', nargs='*', type=int, default=ANNEES)
+	parser.add_argument('--periodes', nargs='*', type=_periode, default=[(min(ANNEES), max(ANNEES))], help='plages d\'années (ex. 2005-2017)')
+	parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+	parser.add_argument('--mots', nargs='*', help='ne rendre que les graphiques dont le titre contient un de ces mots')
+	parser.add_argument('--workers', type=int, help='nombre de process (défaut : nombre de coeurs)')
+	parser.add_argument('--sortie', default=DOSSIER_RAPPORT)
+	parser.add_argument('--forcer', action='store_true', help='tout rendre, même inchangé')
+	args = parser.parse_args()
+
+	bilan = generer(args.annees, args.periodes, args.formats, args.workers, args.sortie, args.mots, args.forcer)
+	print('(done) {rendus} rendus, {inchanges} inchangés, {erreurs} erreurs'.format(**bilan))
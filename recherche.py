@@ -0,0 +1,48 @@
+import bisect
+import re
+import unicodedata
+
+# recherche par mots-clés : index inversé insensible aux accents et à la casse,
+# chaque mot de la requête est complété par préfixe ("reg" trouve "région", "regions"...)
+
+# mots trop fréquents pour discriminer quoi que ce soit
+MOTS_VIDES = {'au', 'aux', 'avec', 'de', 'des', 'du', 'en', 'et', 'la', 'le', 'les', 'par', 'pour'}
+
+
+def normaliser(texte):
+	return unicodedata.normalize('NFKD', texte).encode('ascii', 'ignore').decode('ascii').lower()
+
+
+def mots(texte):
+	return [mot for mot in re.findall(r'[a-z0-9]+', normaliser(texte)) if len(mot) > 1 and mot not in MOTS_VIDES]
+
+
+# documents : {clé: texte} ; l'index garde l'ordre des documents pour classer les résultats
+def indexer(documents):
+	inverse = {}
+	for cle, texte in documents.items():
+		for mot in mots(texte):
+			inverse.setdefault(mot, set()).add(cle)
+	return {'mots': sorted(inverse), 'documents': inverse, 'ordre': {cle: i for i, cle in enumerate(documents)}}
+
+
+# mots de l'index commençant par le préfixe (recherche dichotomique dans la liste triée)
+def completer(index, prefixe):
+	liste = index['mots']
+	i = bisect.bisect_left(liste, prefixe)
+	while i < len(liste) and liste[i].startswith(prefixe):
+		yield liste[i]
+		i += 1
+
+
+# clés des documents trouvés par au moins un mot de la requête,
+# classées par nombre de mots trouvés puis dans l'ordre des documents
+def chercher(index, requete):
+	scores = {}
+	for mot in set(mots(requete)):
+		trouves = set()
+		for complet in completer(index, mot):
+			trouves |= index['documents'][complet]
+		for cle in trouves:
+			scores[cle] = scores.get(cle, 0) + 1
+	return sorted(scores, key=lambda cle: (-scores[cle], index['ordre'][cle]))
@@ -0,0 +1,157 @@
+import os
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import entrepot
+import metriques
+import rafraichir
+from commun import DOSSIER_DERIVES, REGIONS
+
+DOSSIER_SERIES = os.path.join(DOSSIER_DERIVES, 'series')
+CHEMIN_SERIES = os.path.join(DOSSIER_DERIVES, 'series.npz')
+
+# axes du cube quotidien : jour x région x gravité
+LISTE_REGIONS = list(REGIONS) + ['Non renseignée']
+GRAVITES = [1, 2, 3, 4]
+
+# mesures disponibles : (cube, gravités retenues)
+MESURES = {
+	'accidents': ('accidents', GRAVITES),
+	'usagers': ('usagers', GRAVITES),
+	'tués': ('usagers', [2]),
+	'blessés hospitalisés': ('usagers', [3]),
+	}
+
+
+# comptage par (jour de l'année, région, gravité) d'un niveau de l'entrepôt
+def _cube(df, annee, colonne_gravite):
+	jours = (date(annee, 12, 31) - date(annee, 1, 1)).days + 1
+	dates = pd.to_datetime(pd.DataFrame({'year': annee, 'month': df['mois'], 'day': df['jour']}), errors='coerce')
+	jour = (dates - pd.Timestamp(annee, 1, 1)).dt.days.to_numpy()
+	region = pd.Categorical(df['region'].astype(object), categories=LISTE_REGIONS).codes.astype(int)
+	region[region < 0] = len(LISTE_REGIONS) - 1
+	grav = pd.Categorical(df[colonne_gravite], categories=GRAVITES).codes.astype(int)
+	valides = ~np.isnan(jour) & (grav >= 0)
+	index = np.ravel_multi_index(
+		(jour[valides].astype(int), region[valides], grav[valides]),
+		(jours, len(LISTE_REGIONS), len(GRAVITES)))
+	comptes = np.bincount(index, minlength=jours * len(LISTE_REGIONS) * len(GRAVITES))
+	return comptes.reshape(jours, len(LISTE_REGIONS), len(GRAVITES)).astype(np.uint16)
+
+
+def chemin(annee):
+	return os.path.join(DOSSIER_SERIES, '{}.npz'.format(annee))
+
+
+def _sauver(chemin_npz, **tableaux):
+	os.makedirs(os.path.dirname(chemin_npz), exist_ok=True)
+	np.savez_compressed(chemin_npz + '.tmp.npz', **tableaux)
+	os.replace(chemin_npz + '.tmp.npz', chemin_npz)
+
+
+# série de la période : concaténation des cubes annuels, année après année sans trou (le jour i est toujours
+# debut + i) ; une année sans cube est comptée à zéro et absente de la liste 'annees' de la série
+def construire_fusion(annees):
+	cubes = {'accidents': [], 'usagers': []}
+	presentes = []
+	for annee in range(min(annees), max(annees) + 1):
+		if os.path.exists(chemin(annee)):
+			with np.load(chemin(annee)) as f:
+				for nom in cubes:
+					cubes[nom].append(f[nom])
+			presentes.append(annee)
+		else:
+			print('(erreur) série {} absente : comptée à zéro'.format(annee))
+			jours = (date(annee, 12, 31) - date(annee, 1, 1)).days + 1
+			for nom in cubes:
+				cubes[nom].append(np.zeros((jours, len(LISTE_REGIONS), len(GRAVITES)), dtype=np.uint16))
+	debut = date(min(annees), 1, 1).toordinal()
+	_sauver(CHEMIN_SERIES, debut=debut, annees=np.array(presentes, dtype=np.int64),
+			**{nom: np.concatenate(c) for nom, c in cubes.items()})
+
+
+# cubes quotidiens d'une année (accidents et usagers), calculés au rafraîchissement
+@rafraichir.derive('series', fusion=construire_fusion)
+def construire_annee(annee):
+	accidents = entrepot.vue(annee, ['mois', 'jour', 'region', 'grav_acc'], niveau='accident')
+	usagers = entrepot.vue(annee, ['mois', 'jour', 'region', 'grav'])
+	_sauver(chemin(annee),
+		accidents=_cube(accidents, annee, 'grav_acc'),
+		usagers=_cube(usagers, annee, 'grav'))
+	return annee
+
+
+@metriques.couche('series.cubes')
+@lru_cache(maxsize=2)
+def _charger(chemin_npz, mtime):
+	with np.load(chemin_npz) as f:
+		debut = date.fromordinal(int(f['debut']))
+		return {
+			'debut': debut,
+			'accidents': f['accidents'],
+			'usagers': f['usagers'],
+			# séries construites avant la liste des années : toutes présentes
+			'annees': f['annees'].tolist() if 'annees' in f.files else sorted(set(pd.date_range(debut, periods=len(f['usagers'])).year)),
+			}
+
+
+# cubes de la période (None si la série n'a pas été construite)
+def charger(chemin_npz=CHEMIN_SERIES):
+	if not os.path.exists(chemin_npz):
+		return None
+	return _charger(chemin_npz, os.path.getmtime(chemin_npz))
+
+
+# années de [debut, fin] comptées à zéro faute de cube annuel
+def absentes(cubes, debut, fin):
+	return [a for a in range(pd.Timestamp(debut).year, pd.Timestamp(fin).year + 1) if a not in cubes['annees']]
+
+
+def periode(cubes):
+	debut = pd.Timestamp(cubes['debut'])
+	return debut, debut + pd.Timedelta(days=len(cubes['usagers']) - 1)
+
+
+# série quotidienne d'une mesure sur [debut, fin], éventuellement restreinte à des régions
+@metriques.instrumenter('agregat')
+def serie(cubes, mesure, debut, fin, regions=None):
+	nom, gravites = MESURES[mesure]
+	origine = pd.Timestamp(cubes['debut'])
+	i = max((pd.Timestamp(debut) - origine).days, 0)
+	j = min((pd.Timestamp(fin) - origine).days + 1, len(cubes[nom]))
+	cube = cubes[nom][i:j]
+	if regions:
+		cube = cube[:, [LISTE_REGIONS.index(r) for r in regions], :]
+	valeurs = cube[:, :, [GRAVITES.index(g) for g in gravites]].sum(axis=(1, 2), dtype=np.int64)
+	return pd.Series(valeurs, index=pd.date_range(origine + pd.Timedelta(days=i), periods=len(valeurs)), name=mesure)
+
+
+# moyenne glissante par sommes cumulées
+def glissante(s, fenetre):
+	cumul = np.concatenate([[0], np.cumsum(s.to_numpy(dtype=np.float64))])
+	moyenne = np.full(len(s), np.nan)
+	if fenetre <= len(s):
+		moyenne[fenetre - 1:] = (cumul[fenetre:] - cumul[:-fenetre]) / fenetre
+	return pd.Series(moyenne, index=s.index, name=s.name)
+
+
+# comparaison d'une année avec la précédente, alignées sur le jour de l'année
+@metriques.instrumenter('agregat')
+def annee_sur_annee(cubes, mesure, annee, regions=None, fenetre=7):
+	colonnes = {}
+	for a in (annee - 1, annee):
+		s = glissante(serie(cubes, mesure, date(a, 1, 1), date(a, 12, 31), regions), fenetre)
+		colonnes[str(a)] = pd.Series(s.to_numpy(), index=s.index.dayofyear)
+	return pd.DataFrame(colonnes)
+
+
+# matrice calendrier (semaines x jours de la semaine) d'une année
+@metriques.instrumenter('agregat')
+def calendrier(cubes, mesure, annee, regions=None):
+	s = serie(cubes, mesure, date(annee, 1, 1), date(annee, 12, 31), regions)
+	semaine = (s.index.dayofyear + pd.Timestamp(annee, 1, 1).dayofweek - 1) // 7
+	return pd.DataFrame({'semaine': semaine, 'jour': s.index.dayofweek, 'n': s.to_numpy()}) \
+		.pivot(index='jour', columns='semaine', values='n')
@@ -0,0 +1,93 @@
+import argparse
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+# serveur HTTP local servant un dossier de fichiers par leur nom
+# (support de Last-Modified / If-Modified-Since et des requêtes Range)
+# permet de tester hors-ligne le téléchargement et l'application
+
+
+class Handler(BaseHTTPRequestHandler):
+	dossier = '.'
+
+	def _fichier(self):
+		nom = os.path.basename(unquote(urlsplit(self.path).path))
+		chemin = os.path.join(self.dossier, nom)
+		return chemin if nom and os.path.isfile(chemin) else None
+
+	def do_HEAD(self):
+		self._servir(corps=False)
+
+	def do_GET(self):
+		self._servir(corps=True)
+
+	def _servir(self, corps):
+		chemin = self._fichier()
+		if chemin is None:
+			self.send_error(404)
+			return
+		stat = os.stat(chemin)
+		taille = int(stat.st_size)
+		mtime = int(stat.st_mtime)
+		last_modified = formatdate(mtime, usegmt=True)
+
+		ims = self.headers.get('If-Modified-Since')
+		if ims and 'Range' not in self.headers:
+			try:
+				if mtime <= parsedate_to_datetime(ims).timestamp():
+					self.send_response(304)
+					self.send_header('Last-Modified', last_modified)
+					self.end_headers()
+					return
+			except (TypeError, ValueError):
+				pass
+
+		debut = 0
+		m = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+		if_range = self.headers.get('If-Range')
+		if m and (if_range is None or if_range == last_modified):
+			debut = int(m.group(1))
+			if debut >= taille:
+				self.send_response(416)
+				self.send_header('Content-Range', 'bytes */{}'.format(taille))
+				self.end_headers()
+				return
+			self.send_response(206)
+			self.send_header('Content-Range', 'bytes {}-{}/{}'.format(debut, taille - 1, taille))
+		else:
+			self.send_response(200)
+		self.send_header('Content-Length', str(taille - debut))
+		self.send_header('Last-Modified', last_modified)
+		self.send_header('Accept-Ranges', 'bytes')
+		self.end_headers()
+		if corps:
+			with open(chemin, 'rb') as f:
+				f.seek(debut)
+				while True:
+					bloc = f.read(1 << 16)
+					if not bloc:
+						break
+					self.wfile.write(bloc)
+
+	def log_message(self, format, *args):
+		pass
+
+
+# démarrage du serveur (port 0 = port libre choisi par le système)
+def serveur(dossier, port=8000, hote='127.0.0.1'):
+	handler = type('Handler', (Handler,), {'dossier': dossier})
+	return ThreadingHTTPServer((hote, port), handler)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Serveur HTTP local (miroir hors-ligne des fichiers de données)')
+	parser.add_argument('dossier')
+	parser.add_argument('--port', type=int, default=8000)
+	args = parser.parse_args()
+
+	httpd = serveur(args.dossier, args.port)
+	print('(done) miroir local sur http://{}:{}/'.format(*httpd.server_address))
+	httpd.serve_forever()
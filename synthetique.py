@@ -0,0 +1,206 @@
+import argparse
+import calendar
+import os
+
+import numpy as np
+import pandas as pd
+
+import catalogue
+from commun import DEPARTMENTS, DOSSIER_BRUT, DOSSIER_DATASET
+
+# jeu de données synthétique au format des fichiers bruts 2005-2017 (mêmes colonnes, mêmes modalités,
+# distributions marginales proches de celles d'une année réelle), pour les mesures de performance hors-ligne
+
+# fichiers synthétiques, à part des fichiers téléchargés
+DOSSIER_SYNTHETIQUE = os.path.join(DOSSIER_DATASET, 'synthetique')
+
+# nombre d'accidents d'une année à l'échelle 1 (de 60 000 à 85 000 selon les années)
+ACCIDENTS_PAR_AN = 65000
+
+# distributions marginales : modalité -> fréquence relative
+GRAV = {1: 0.42, 2: 0.027, 3: 0.19, 4: 0.363}
+CATR = {1: 0.07, 2: 0.09, 3: 0.33, 4: 0.46, 5: 0.02, 6: 0.01, 9: 0.02}
+COL = {1: 0.12, 2: 0.17, 3: 0.27, 4: 0.04, 5: 0.04, 6: 0.21, 7: 0.15}
+CATV = {7: 0.60, 2: 0.06, 33: 0.06, 10: 0.06, 1: 0.04, 30: 0.04, 31: 0.03, 32: 0.02, 14: 0.015, 13: 0.01,
+		15: 0.01, 17: 0.01, 3: 0.005, 37: 0.005, 38: 0.003, 99: 0.01, 34: 0.005, 21: 0.003, 40: 0.002,
+		36: 0.002, 35: 0.002, 20: 0.002, 16: 0.001, 18: 0.001, 19: 0.001, 4: 0.001, 5: 0.001, 6: 0.0005,
+		8: 0.0005, 9: 0.0005, 11: 0.0005, 12: 0.0005, 39: 0.0005}
+LUM = {1: 0.68, 2: 0.06, 3: 0.08, 4: 0.02, 5: 0.16}
+AGG = {1: 0.35, 2: 0.65}
+INT = {1: 0.70, 2: 0.12, 3: 0.08, 4: 0.02, 5: 0.01, 6: 0.04, 7: 0.01, 8: 0.005, 9: 0.015}
+ATM = {1: 0.80, 2: 0.10, 3: 0.02, 4: 0.005, 5: 0.005, 6: 0.01, 7: 0.02, 8: 0.03, 9: 0.01}
+SEXE = {1: 0.68, 2: 0.32}
+TRAJET = {0: 0.05, 1: 0.15, 2: 0.02, 3: 0.05, 4: 0.05, 5: 0.38, 9: 0.30}
+SECU = {11: 0.55, 21: 0.10, 12: 0.05, 13: 0.10, 22: 0.05, 23: 0.05, 31: 0.05, 93: 0.05}
+OBSM = {0: 0.10, 1: 0.05, 2: 0.80, 4: 0.02, 6: 0.01, 9: 0.02}
+MANV = {1: 0.45, 2: 0.10, 9: 0.20, 13: 0.05, 15: 0.10, 17: 0.05, 23: 0.05}
+SITU = {1: 0.88, 2: 0.03, 3: 0.05, 4: 0.02, 5: 0.02}
+SURF = {1: 0.80, 2: 0.16, 3: 0.01, 7: 0.02, 9: 0.01}
+
+# heures : profil horaire des accidents (pointes du matin et du soir)
+PROFIL_HORAIRE = [1.5, 1.2, 1, 0.9, 0.8, 1, 1.8, 3.5, 4.8, 4, 4, 4.6, 5, 4.5, 4.7, 5.3, 6.3, 7.4, 7.2, 5.8, 4, 3, 2.6, 2]
+PROFIL_MENSUEL = [7, 7, 8, 8, 9, 9, 9, 8, 9, 9, 8, 9]
+
+# départements : poids relatifs (grandes agglomérations plus accidentogènes) et centres (lat, long)
+POIDS_DEPARTEMENTS = {'75': 8, '13': 5, '69': 4, '59': 4, '92': 4, '93': 4, '94': 4, '06': 4, '33': 3,
+					  '31': 3, '34': 3, '44': 3, '67': 3, '35': 2, '38': 2, '83': 2, '974': 2}
+CENTRES = {'75': (48.86, 2.35), '92': (48.84, 2.22), '93': (48.91, 2.48), '94': (48.78, 2.47),
+		   '13': (43.40, 5.20), '69': (45.76, 4.80), '59': (50.55, 3.10), '06': (43.75, 7.15),
+		   '33': (44.85, -0.60), '31': (43.55, 1.40), '34': (43.60, 3.70), '44': (47.25, -1.65),
+		   '67': (48.55, 7.65), '35': (48.10, -1.70), '38': (45.25, 5.60), '83': (43.40, 6.25),
+		   '971': (16.20, -61.55), '972': (14.65, -61.00), '973': (4.90, -52.40), '974': (-21.10, 55.50),
+		   '976': (-12.80, 45.15)}
+# hors centre connu : tirage uniforme sur la métropole
+METROPOLE = ((42.5, 51.0), (-4.5, 8.0))
+GPS = {'971': 'A', '972': 'A', '973': 'G', '974': 'R', '976': 'Y'}
+
+
+def _tirer(rng, loi, n):
+	modalites = np.array(list(loi))
+	frequences = np.array(list(loi.values()), dtype=float)
+	return rng.choice(modalites, size=n, p=frequences / frequences.sum())
+
+
+# code 'dep' du format 2005-2017 : '59' -> 590, '2A' -> 201, '971' -> 971
+def _dep_brut(code):
+	if code in ('2A', '2B'):
+		return 201 if code == '2A' else 202
+	return int(code) if len(code) == 3 else int(code) * 10
+
+
+def caracteristiques(rng, annee, n):
+	codes = list(DEPARTMENTS)
+	poids = np.array([POIDS_DEPARTEMENTS.get(c, 1) for c in codes], dtype=float)
+	dep = np.array(codes)[rng.choice(len(codes), size=n, p=poids / poids.sum())]
+
+	# coordonnées : autour du centre du département s'il est connu, sinon sur la métropole
+	lat = rng.uniform(*METROPOLE[0], size=n)
+	long = rng.uniform(*METROPOLE[1], size=n)
+	for code, (clat, clong) in CENTRES.items():
+		masque = dep == code
+		lat[masque] = clat + rng.normal(0, 0.12, masque.sum())
+		long[masque] = clong + rng.normal(0, 0.15, masque.sum())
+
+	mois = _tirer(rng, dict(zip(range(1, 13), PROFIL_MENSUEL)), n)
+	jours_mois = np.array([calendar.monthrange(annee, m)[1] for m in range(1, 13)])
+	jour = (rng.random(n) * jours_mois[mois - 1]).astype(int) + 1
+	heure = _tirer(rng, dict(enumerate(PROFIL_HORAIRE)), n)
+	return pd.DataFrame({
+		'Num_Acc': annee * 10 ** 8 + np.arange(1, n + 1),
+		'an': annee % 100,
+		'mois': mois,
+		'jour': jour,
+		'hrmn': heure * 100 + rng.integers(0, 60, n),
+		'lum': _tirer(rng, LUM, n),
+		'agg': _tirer(rng, AGG, n),
+		'int': _tirer(rng, INT, n),
+		'atm': _tirer(rng, ATM, n),
+		'col': _tirer(rng, COL, n),
+		'com': rng.integers(1, 900, n),
+		'adr': 'rue ' + pd.Series(rng.integers(1, 50, n)).astype(str),
+		'gps': pd.Series(dep).map(GPS).fillna('M').to_numpy(),
+		'lat': np.round(lat * 100000).astype(int),
+		'long': np.round(long * 100000).astype(int),
+		'dep': [_dep_brut(c) for c in dep],
+		})
+
+
+def lieux(rng, num_acc):
+	n = len(num_acc)
+	return pd.DataFrame({
+		'Num_Acc': num_acc,
+		'catr': _tirer(rng, CATR, n),
+		'voie': rng.integers(1, 1000, n),
+		'v1': 0,
+		'v2': '',
+		'circ': _tirer(rng, {1: 0.15, 2: 0.75, 3: 0.08, 4: 0.02}, n),
+		'nbv': _tirer(rng, {1: 0.1, 2: 0.65, 3: 0.1, 4: 0.1, 6: 0.05}, n),
+		'pr': rng.integers(0, 100, n),
+		'pr1': rng.integers(0, 1000, n),
+		'vosp': _tirer(rng, {0: 0.95, 1: 0.02, 2: 0.02, 3: 0.01}, n),
+		'prof': _tirer(rng, {1: 0.82, 2: 0.12, 3: 0.03, 4: 0.03}, n),
+		'plan': _tirer(rng, {1: 0.8, 2: 0.08, 3: 0.08, 4: 0.04}, n),
+		'lartpc': _tirer(rng, {0: 0.9, 10: 0.05, 20: 0.05}, n),
+		'larrout': _tirer(rng, {0: 0.2, 50: 0.3, 60: 0.3, 70: 0.1, 100: 0.1}, n),
+		'surf': _tirer(rng, SURF, n),
+		'infra': _tirer(rng, {0: 0.88, 1: 0.02, 2: 0.02, 3: 0.03, 5: 0.05}, n),
+		'situ': _tirer(rng, SITU, n),
+		'env1': _tirer(rng, {0: 0.6, 99: 0.4}, n),
+		})
+
+
+def vehicules(rng, num_acc):
+	nombre = _tirer(rng, {1: 0.30, 2: 0.60, 3: 0.07, 4: 0.03}, len(num_acc))
+	acc = np.repeat(num_acc, nombre)
+	rang = np.arange(len(acc)) - np.repeat(np.cumsum(nombre) - nombre, nombre)
+	n = len(acc)
+	return pd.DataFrame({
+		'Num_Acc': acc,
+		'senc': _tirer(rng, {0: 0.6, 1: 0.2, 2: 0.2}, n),
+		'catv': _tirer(rng, CATV, n),
+		'occutc': 0,
+		'obs': _tirer(rng, {0: 0.85, 1: 0.03, 2: 0.03, 4: 0.03, 13: 0.03, 15: 0.03}, n),
+		'obsm': _tirer(rng, OBSM, n),
+		'choc': _tirer(rng, {1: 0.35, 2: 0.15, 3: 0.15, 4: 0.05, 5: 0.05, 7: 0.1, 8: 0.1, 9: 0.05}, n),
+		'manv': _tirer(rng, MANV, n),
+		'num_veh': [chr(65 + r) + '01' for r in rang],
+		})
+
+
+# usagers : un conducteur par véhicule, des passagers, et des piétons rattachés au premier véhicule
+def usagers(rng, annee, vehicules_annee):
+	passagers = rng.poisson(0.35, len(vehicules_annee))
+	lignes = np.repeat(np.arange(len(vehicules_annee)), 1 + passagers)
+	catu = np.where(np.r_[True, lignes[1:] != lignes[:-1]], 1, 2)
+	premiers = vehicules_annee.index[vehicules_annee['num_veh'] == 'A01'].to_numpy()
+	pietons = premiers[rng.random(len(premiers)) < 0.09]
+	lignes = np.concatenate([lignes, pietons])
+	catu = np.concatenate([catu, np.full(len(pietons), 3)])
+	n = len(lignes)
+
+	# âge : conducteurs adultes, passagers et piétons de tous âges
+	age = np.where(catu == 1, 18 + rng.gamma(2.2, 14, n), rng.gamma(2.0, 16, n))
+	return pd.DataFrame({
+		'Num_Acc': vehicules_annee['Num_Acc'].to_numpy()[lignes],
+		'place': np.where(catu == 1, 1, np.where(catu == 3, 0, rng.integers(2, 10, n))),
+		'catu': catu,
+		'grav': _tirer(rng, GRAV, n),
+		'sexe': _tirer(rng, SEXE, n),
+		'trajet': _tirer(rng, TRAJET, n).astype(float),
+		'secu': _tirer(rng, SECU, n),
+		'locp': np.where(catu == 3, rng.integers(1, 9, n), 0),
+		'actp': np.where(catu == 3, rng.integers(1, 6, n), 0),
+		'etatp': np.where(catu == 3, rng.integers(1, 4, n), 0),
+		'an_nais': annee - np.clip(age, 0, 100).astype(int),
+		'num_veh': vehicules_annee['num_veh'].to_numpy()[lignes],
+		}).sort_values('Num_Acc', kind='stable')
+
+
+# écriture des 4 fichiers bruts d'une année sous les noms du catalogue ; renvoie le nombre de lignes par table
+# (dans DOSSIER_SYNTHETIQUE par défaut : les fichiers téléchargés de dataset/raw ne sont jamais écrasés)
+def generer(annee, echelle=1.0, dossier_brut=DOSSIER_SYNTHETIQUE, graine=0):
+	rng = np.random.default_rng([annee, graine])
+	car = caracteristiques(rng, annee, max(int(ACCIDENTS_PAR_AN * echelle), 1))
+	tables = {
+		'caracteristiques': car,
+		'lieux': lieux(rng, car['Num_Acc'].to_numpy()),
+		}
+	tables['vehicules'] = vehicules(rng, car['Num_Acc'].to_numpy())
+	tables['usagers'] = usagers(rng, annee, tables['vehicules'])
+	os.makedirs(dossier_brut, exist_ok=True)
+	for table, ressource in catalogue.ressources_annee(annee).items():
+		tables[table].to_csv(os.path.join(dossier_brut, ressource['nom']), index=False)
+	return {table: len(df) for table, df in tables.items()}
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="Fichiers bruts synthétiques d'une année (mesures de performance hors-ligne)")
+	parser.add_argument('annees', nargs='+', type=int)
+	parser.add_argument('--echelle', type=float, default=1.0, help="taille relative à une année réelle (0.1 à 10)")
+	parser.add_argument('--brut', default=DOSSIER_SYNTHETIQUE,
+						help="dossier des fichiers (le dossier des fichiers téléchargés, {}, seulement dans un dossier de travail à part)".format(DOSSIER_BRUT))
+	parser.add_argument('--graine', type=int, default=0)
+	args = parser.parse_args()
+
+	for annee in args.annees:
+		print('(done) {} : {}'.format(annee, generer(annee, args.echelle, args.brut, args.graine)))
@@ -0,0 +1,154 @@
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+import requests
+
+import catalogue
+from commun import ANNEES, DOSSIER_BRUT
+
+TAILLE_BLOC = 1 << 20
+
+_verrou = threading.Lock()
+_local = threading.local()
+
+
+# une session HTTP par thread (keep-alive, requests.Session n'est pas thread-safe)
+def _session():
+	if not hasattr(_local, 'session'):
+		_local.session = requests.Session()
+	return _local.session
+
+
+# dateModified du catalogue ('2020-11-05T10:44:24.873000', UTC) -> date HTTP
+def date_http(modifie):
+	dt = datetime.fromisoformat(modifie).replace(tzinfo=timezone.utc)
+	return format_datetime(dt, usegmt=True)
+
+
+# état des téléchargements précédents (dateModified, taille, Last-Modified par fichier)
+def charger_etat(dossier=DOSSIER_BRUT):
+	chemin = os.path.join(dossier, 'etat.json')
+	if not os.path.exists(chemin):
+		return {}
+	with open(chemin, 'r') as f:
+		return json.load(f)
+
+
+def _sauver_etat(etat, dossier):
+	chemin = os.path.join(dossier, 'etat.json')
+	with _verrou:
+		with open(chemin + '.tmp', 'w') as f:
+			json.dump(etat, f, indent=1, sort_keys=True)
+		os.replace(chemin + '.tmp', chemin)
+
+
+# téléchargement d'une ressource : saut si inchangée, reprise si partielle, vérification de la taille
+def telecharger(ressource, etat, dossier=DOSSIER_BRUT, miroir=None, timeout=60):
+	nom = ressource['nom']
+	url = ressource['url'] if miroir is None else miroir.rstrip('/') + '/' + nom
+	chemin = os.path.join(dossier, nom)
+	partiel = chemin + '.part'
+	attendu = ressource['taille']
+	precedent = etat.get(nom, {})
+
+	# fichier local d'une autre taille que celle du catalogue (tronqué, abîmé) : jamais considéré comme à jour,
+	# repris comme un téléchargement partiel s'il est plus court, retéléchargé sinon
+	if os.path.exists(chemin) and attendu is not None and os.path.getsize(chemin) != attendu:
+		if os.path.getsize(chemin) < attendu:
+			os.replace(chemin, partiel)
+		else:
+			os.remove(chemin)
+	# partiel plus long que le fichier attendu : inutilisable
+	if os.path.exists(partiel) and attendu is not None and os.path.getsize(partiel) > attendu:
+		os.remove(partiel)
+
+	# fichier complet et catalogue inchangé : aucune requête
+	if os.path.exists(chemin) and precedent.get('modifie') == ressource['modifie'] \
+			and os.path.getsize(chemin) == precedent.get('taille'):
+		return nom, 'inchangé'
+
+	headers = {}
+	if os.path.exists(chemin):
+		# requête conditionnelle : 304 si le fichier distant n'a pas bougé
+		headers['If-Modified-Since'] = precedent.get('last_modified') or date_http(ressource['modifie'])
+	elif os.path.exists(partiel):
+		# reprise là où le téléchargement précédent s'est arrêté
+		headers['Range'] = 'bytes={}-'.format(os.path.getsize(partiel))
+		if precedent.get('last_modified'):
+			headers['If-Range'] = precedent['last_modified']
+
+	with _session().get(url, headers=headers, stream=True, timeout=timeout) as r:
+		if r.status_code == 416 and 'Range' in headers:
+			# reprise au-delà de la fin : partiel déjà complet (interrompu avant le renommage) ou obsolète
+			total = r.headers.get('Content-Range', '').rpartition('/')[2]
+			complet = attendu if attendu is not None else int(total) if total.isdigit() else None
+			if os.path.getsize(partiel) != complet:
+				os.remove(partiel)
+				statut = None
+			else:
+				os.replace(partiel, chemin)
+				statut = 'repris'
+		elif r.status_code == 304:
+			if attendu is not None and os.path.getsize(chemin) != attendu:
+				raise IOError('{} : {} octets en local, {} attendus'.format(nom, os.path.getsize(chemin), attendu))
+			statut = 'non modifié'
+		else:
+			r.raise_for_status()
+			mode = 'ab' if r.status_code == 206 else 'wb'
+			with _verrou:
+				etat[nom] = dict(precedent, last_modified=r.headers.get('Last-Modified'))
+			with open(partiel, mode) as f:
+				for bloc in r.iter_content(TAILLE_BLOC):
+					f.write(bloc)
+			taille = os.path.getsize(partiel)
+			if attendu is not None and taille != attendu:
+				if taille > attendu:
+					os.remove(partiel)
+				raise IOError('{} : {} octets reçus, {} attendus'.format(nom, taille, attendu))
+			os.replace(partiel, chemin)
+			statut = 'repris' if mode == 'ab' else 'téléchargé'
+	# partiel obsolète supprimé : téléchargement complet
+	if statut is None:
+		return telecharger(ressource, etat, dossier, miroir, timeout)
+
+	with _verrou:
+		etat[nom] = dict(etat.get(nom, {}), modifie=ressource['modifie'], taille=os.path.getsize(chemin))
+	_sauver_etat(etat, dossier)
+	return nom, statut
+
+
+# téléchargement concurrent (pool borné) des ressources du catalogue
+def telecharger_tout(annees=ANNEES, workers=4, dossier=DOSSIER_BRUT, miroir=None, catalogue_json='data.json'):
+	os.makedirs(dossier, exist_ok=True)
+	etat = charger_etat(dossier)
+	liste = catalogue.ressources(annees, catalogue_json)
+	resultats, erreurs = {}, {}
+	with ThreadPoolExecutor(max_workers=workers) as pool:
+		futures = {pool.submit(telecharger, r, etat, dossier, miroir): r['nom'] for r in liste}
+		for future in as_completed(futures):
+			nom = futures[future]
+			try:
+				resultats[nom] = future.result()[1]
+				print('(done) {} : {}'.format(nom, resultats[nom]))
+			except Exception as e:
+				erreurs[nom] = str(e)
+				print('(erreur) {} : {}'.format(nom, e))
+	return resultats, erreurs
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Téléchargement des fichiers annuels décrits dans data.json')
+	parser.add_argument('annees', nargs='*', type=int, default=ANNEES)
+	parser.add_argument('--workers', type=int, default=4, help='nombre de téléchargements simultanés')
+	parser.add_argument('--dossier', default=DOSSIER_BRUT)
+	parser.add_argument('--miroir', help="URL d'un miroir servant les fichiers par nom (ex. serveur_local.py)")
+	parser.add_argument('--catalogue', default='data.json')
+	args = parser.parse_args()
+
+	_, erreurs = telecharger_tout(args.annees, args.workers, args.dossier, args.miroir, args.catalogue)
+	raise SystemExit(1 if erreurs else 0)
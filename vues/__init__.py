@@ -0,0 +1 @@
+# pages de st_report.py, une par module (importé à la première visite de la page)
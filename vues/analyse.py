@@ -0,0 +1,112 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import comparaison
+import donnees
+import echantillons
+import graphiques
+import metriques
+
+
+@st.cache(suppress_st_warning=True,allow_output_mutation=True,max_entries=None,ttl=60*3)
+def preprocess(annee, palier, colonnes):
+	metriques.defaut('st.preprocess')
+	return donnees.preprocess(annee, palier, list(colonnes))
+
+
+## affichage du résultat d'un graphique dans son emplacement (remplace le rendu précédent)
+def rendre(zone, resultat):
+	if isinstance(resultat, list):
+		conteneur = zone.beta_container()
+		for r in resultat:
+			rendre(conteneur, r)
+	elif isinstance(resultat, str):
+		zone.info(resultat)
+	elif isinstance(resultat, plt.Figure):
+		zone.pyplot(resultat)
+		plt.close(resultat)
+	elif isinstance(resultat, (pd.DataFrame, pd.Series)):
+		zone.write(resultat)
+	else:
+		zone.bokeh_chart(resultat)
+
+
+# page « 3. Analyse » (graphiques, donc matplotlib et seaborn, importés seulement ici)
+def afficher():
+	st.markdown("""
+		## 3. Analyse et Visualisation des données
+	""")
+	
+	st.markdown("""
+	###### Afin d'optimiser le temps de chargement et l'affichage, nous avons fait le choix de __filtrer__ les données de visualisation __par année__.
+	###### Les graphiques s'affichent d'abord sur un échantillon de 1 % des usagers (stratifié par gravité), puis sont affinés sur 10 % et enfin sur l'année complète.
+	---	
+	""")
+	st.markdown("""
+	##### Sélectionnez une année d'étude (de 2005 à 2017)
+	""")
+	annee = st.selectbox("", np.arange(2005,2018,1))
+
+	# ajout année sur le sidebar	 
+	st.sidebar.markdown("### Analyses sur l'année : "+str(annee))
+
+	# mode comparaison : chaque graphique coché est remplacé par la comparaison de ses comptes entre deux périodes
+	periodes = None
+	if st.sidebar.checkbox('Comparer deux années ou périodes'):
+		periodes = (st.sidebar.slider('Période de référence', 2005, 2017, (max(int(annee)-1, 2005),)*2, key='comparaison_a'),
+					st.sidebar.slider('Période comparée', 2005, 2017, (int(annee),)*2, key='comparaison_b'))
+	
+	# recherche par mot-clés
+	st.markdown("""
+	##### Recherche de visualisations par mot-clés (séparés par des espaces, début de mot suffisant)
+	""")
+	search = st.text_input('')
+	st.markdown("""
+	###### exemples de mot-clés : `carte` `région` `département` `gravité` `mois` `jour` `heure` `véhicule` `route` `collision` `sexe` `tendance` `calendrier`
+	""")
+
+	# sélection parmi les graphiques trouvés : paramètres saisis une fois, emplacement réservé
+	selection = []
+	for declaration in graphiques.chercher(search):
+		graphique = declaration['fonction']
+		if st.checkbox(declaration['titre']):
+			parametres = graphiques.controles[graphique](st, annee) if graphique in graphiques.controles else {}
+			selection.append((graphique, parametres, st.empty()))
+	# les moins coûteux d'abord
+	selection.sort(key=lambda s: graphiques.COUTS.index(graphiques.declarations[s[0]]['cout']))
+
+	# seules les colonnes utiles aux graphiques sélectionnés sont chargées (aucune s'ils sont tous exacts) ;
+	# les comparaisons lisent leurs comptes année par année (comparaison.py), sans l'échantillon de la page
+	if periodes is None:
+		colonnes = graphiques.colonnes_echantillon([s[0] for s in selection], annee)
+		exact = lambda graphique: graphiques.exact(graphique, annee)
+	else:
+		colonnes = None
+		exact = lambda graphique: comparaison.exacte(graphique, *periodes)
+
+	# affichage progressif : échantillon de 1 %, puis 10 %, puis l'année complète, rendus sur place
+	etat = st.empty()
+	for palier, libelle in enumerate(echantillons.LIBELLES):
+		a_rendre = [s for s in selection if palier == 0 or not exact(s[0])]
+		if not a_rendre:
+			break
+		df = None
+		if not all(exact(s[0]) for s in a_rendre):
+			etat.info('Affichage sur un échantillon stratifié de '+libelle+' des usagers...')
+		if colonnes is not None:
+			metriques.acces('st.preprocess')
+			df = preprocess(annee, palier, tuple(colonnes))
+		for graphique, parametres, zone in a_rendre:
+			if periodes is None:
+				# verrou pris avant la mesure : l'attente des autres sessions n'est pas comptée dans le graphique
+				with graphiques.VERROU, metriques.chrono('graphique', graphique.__name__, str(annee)+' / '+libelle):
+					rendre(zone, graphique(df, annee, **parametres))
+			else:
+				details = comparaison.libelle(periodes[0])+' / '+comparaison.libelle(periodes[1])+' / '+libelle
+				with metriques.chrono('comparaison', graphique.__name__, details):
+					resultat = comparaison.comparer(graphique, *periodes, palier=palier, **parametres)
+				with graphiques.VERROU:
+					rendre(zone, resultat)
+	etat.empty()
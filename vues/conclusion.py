@@ -0,0 +1,42 @@
+import base64
+
+import streamlit as st
+
+
+# page « 5. Conclusion »
+def afficher():
+	st.markdown("""
+	### Conclusions
+	---
+	La __Dataviz'__ a confirmé en majorité les __prédictions de gravité__ issues du __Machine Learning__ et de la table de __corrélation de Pearson__.
+	
+	Les variables catégorielles significatives sont :
+	* Sexe
+	* Âge
+	* Catégorie de véhicule
+	* Catégorie d'usager
+	* Catégorie de route
+	* Type de collision
+	* Mois
+	* Jour
+	* Heure
+
+	Les données étudiées sont essentiellement des données de __constat__, et non pas d'enquête.
+	Elles complètent parfaitement les variables généralement mises en évidence par les _campagnes de prévention routière_ (vitesse, alcoolémie et téléphone).
+
+	Il serait intéressant de pouvoir réaliser ces mêmes analyses sur les périodes de confinement, afin d'__analyser l'impact du Covid sur la circulation routière__.
+	
+	### Pour aller plus loin...
+	---
+	Vous pouvez télécharger l'application native __PySecuRoute__ selon votre système d'exploitation :
+	
+	[win32](https://christophe-wardius.fr/projets/pysecuroute/rendu-final/PySecuRoute-win32-x64.zip)  |  [macOSX](https://christophe-wardius.fr/projets/pysecuroute/rendu-final/PySecuRoute-osx-x64.zip)  |  [linux](https://christophe-wardius.fr/projets/pysecuroute/rendu-final/PySecuRoute-linux-x64.zip)
+	
+	Vous pouvez également consulter notre _méthodologie de travail_ ci-dessous :
+	
+	""")
+	
+	with open('rapport_final.pdf','rb') as f:
+		base64_pdf = base64.b64encode(f.read()).decode('utf-8')
+		href = f'<a href="data:file/csv;base64,{base64_pdf}">Télécharger la méthodologie</a>'
+		st.markdown(href, unsafe_allow_html=True)
@@ -0,0 +1,277 @@
+import json
+
+import pandas as pd
+import streamlit as st
+
+import entrepot
+import export
+import metriques
+import profil
+from commun import ANNEES, DEPARTMENTS, REGIONS
+
+
+# profil des données brutes, calculé en une passe par année (profil.py / rafraichir.py)
+@st.cache(allow_output_mutation=True,ttl=60*3)
+def profil_donnees():
+	metriques.defaut('st.profil')
+	return profil.charger()
+
+
+# page « 2. Exploration »
+def afficher():
+	st.markdown("""
+		## 2. Exploration des données
+		---
+	""")
+		
+	if st.checkbox("Description des données"):
+		st.markdown("""
+		### Description des données
+		---
+
+		Pour chaque accident corporel (soit un accident survenu sur une voie ouverte à la circulation publique,
+		impliquant au moins un véhicule et ayant fait au moins une victime ayant nécessité des soins), des
+		saisies d’information décrivant l’accident sont effectuées par l’unité des forces de l’ordre (police,
+		gendarmerie, etc.) qui est intervenue sur le lieu de l’accident. Ces saisies sont rassemblées dans
+		une fiche intitulée bulletin d’analyse des accidents corporels. L’ensemble de ces fiches constitue le
+		fichier national des accidents corporels de la circulation dit « Fichier BAAC » administré par
+		l’Observatoire national interministériel de la sécurité routière "ONISR".
+
+		Les bases de données, extraites du fichier BAAC, répertorient l'intégralité des accidents corporels de
+		la circulation, intervenus durant une année précise en France métropolitaine, dans les départements
+		d’Outre-mer (Guadeloupe, Guyane, Martinique, La Réunion et Mayotte depuis 2012) et dans les autres
+		territoires d’outre-mer (Saint-Pierre-et-Miquelon, Saint-Barthélemy, Saint-Martin, Wallis-et-Futuna,
+		Polynésie française et Nouvelle-Calédonie ; disponible qu’à partir de 2019 dans l’open data) avec une
+		description simplifiée. Cela comprend des informations de localisation de l’accident, telles que
+		renseignées ainsi que des informations concernant les caractéristiques de l’accident et son lieu, les
+		véhicules impliqués et leurs victimes.
+
+		Par rapport aux bases de données agrégées 2005-2010 et 2006-2011 actuellement disponibles sur le
+		site [www.data.gouv.fr](https://www.data.gouv.fr), les bases de données de 2005 à 2019 sont désormais annuelles et composées
+		de 4 fichiers (Caractéristiques – Lieux – Véhicules – Usagers) au format csv. 
+		
+		""")
+		
+	if st.checkbox("Exploitation des données"):
+		st.markdown("""
+		### Exploitation des données
+		---
+	
+		Ayant relevé une incompatibilité entre les datasets antérieurs et postérieurs à 2018, nous avons choisi de fusionner dans un DataFrame l'ensemble des bases de données de 2005 à 2017
+
+		""")
+		
+	if st.checkbox("Identification des données"):
+		st.markdown("""
+		### Identification des données
+		---
+		
+		Afin de faciliter le téléchargement des données, l'ensemble des informations sur les jeux de données est agrégé dans un fichier master JSON :
+
+		* data.json
+		""")
+		# chargement du 'df_master' des jeu de données
+		data = json.load(open('data.json','r'))
+		df_master = pd.json_normalize(data['distribution'])
+		st.write(df_master.head())
+		
+	if st.checkbox("Restriction de l'exploration sur les des données sur la période 2005-2017"):
+		st.markdown("""
+		### Restriction de l'exploration sur les des données sur la période 2005-2017
+		
+		
+		
+		La note de Description des bases de données annuelles des accidents corporels de la circulation routière
+		Années de 2005 à 2019 (téléchargeable ici) émet un avertissement :
+
+		Les données sur la qualification de blessé hospitalisé depuis l’année 2018 ne peuvent être comparées aux années précédentes suite à des modifications de process de saisie des forces de l’ordre. L’indicateur « blessé hospitalisé » n’est plus labellisé par l’autorité de la statistique publique depuis 2019.
+
+		Nous avons donc choisi de restreindre une partie de l'exploration des données sur la période 2005-2017, ce qui consitue :
+
+		* 13` années
+			
+		`4` datasets au format CSV par année :
+		* Caractéristiques,
+		* Lieux,
+		* Véhicules,
+		* Usagers.
+			
+		Soit `52` fichiers CSV à consolider dans un `DataFrame`.
+
+		On remarque qu'une erreur s'est produite avec le fichier `caracteristiques_2009.csv` que l'on traitera donc séparément.
+		(Il s'agit en fait d'un fichier _TSV_)
+		
+		""")
+		
+	if st.checkbox("Modèle de données"):
+		st.markdown("""
+		### Modèle de données
+		---
+		
+		### Descriptifs des fichiers à disposition:
+		
+		#### Caractéristiques :
+
+		Circonstances générales de l’accident notamment la __date__, les __conditions atmostphériques__ et la __situation géographique__.
+
+		Identifiant(s) du fichier :
+
+		`Num_Acc`: Numéro d'identifiant de l’accident
+		
+		* LIEUX
+
+		Description du lieu principal de l’accident même si celui-ci s’est déroulé à une intersection
+
+		Identifiant(s) du fichier :
+
+		`Num_Acc`: Numéro d'identifiant de l’accident
+		
+		* VEHICULES
+
+		Véhicules impliqués dans l'accident avec les caractériques du véhicules
+
+		Identifiant(s) du fichier :
+
+		`Num_Acc` : Numéro d'identifiant de l’accident
+		`Num_Veh` : Identifiant du véhicule repris pour chacun des usagers occupant ce véhicule (y compris les piétons qui sont rattachés aux véhicules qui les ont heurtés)
+		
+		* USAGERS
+
+		Usagers impliqués dans l'accident avec caractéristiques propres à l'usager et les conséquences de l'accident (gravité)
+
+		Identifiant(s) du fichier :
+
+		`Num_Acc` : Numéro de l’accident
+		`Num_Veh` : Identifiant du véhicule repris pour chacun des usagers occupant ce véhicule (y compris les piétons qui sont rattachés aux véhicules qui les ont heurtés)
+		`place` : Permet de situer la place occupée dans le véhicule par l'usager au moment de l'accident
+
+		Chaque ligne correspond à un usager, en terme de données il peut y avoir des "faux" doublons notamment pour les usagers de transport en commun.
+		""")
+		
+	if st.checkbox("Constitution du jeu de données à explorer"):
+		
+		st.markdown("""
+		### Constitution du jeu de données à explorer
+		
+		_Principe_:
+		Notre étude portant sur la gravité des blessures corporels des usagers, nous devons avoir l'ensembles des données concernant les usagers des accidents sur notre période de 2005 à 2017.
+
+		Pour constituer le jeu de données à explorer, nous prendrons donc le fichier `Usagers` comme fichier "Maitre" et nous ferons toutes les jointures nécessaires avec ce fichier.
+
+		_Pour chaque année de données récupérées_:
+		* Création de _4 dataframes_ correspondants aux chargements des _4 fichiers csv_ de l'année.
+		* Création d'un _dataframe global_ de l'année résultat des jointures des 4 dataframes de l'année
+		* _Concaténation_ de l'ensemble des dataframes globaux pour créer un dataframe final de notre période 2005 à 2017
+		
+		_Ajout des colonnes 'département' et 'région'_
+
+		Nous avons fait le choix de pouvoir localiser les accidents. Pour cela, nous utiliserons 2 dictionnaires Python téléchargeables [ici](https://gist.github.com/mlorant/b4d7bb6f96c47776c8082cf7af44ad95)
+
+		Ces deux dictionnaires listent les régions et départements français. Dans notre dataframe, le département est renseigné dans la colonne __'dep'__.
+
+		Création des colonnes :
+		* 'departement'
+		* 'region'
+		""")	
+	
+	if st.checkbox('Data cleaning'):
+		st.markdown("""
+
+		Nous avons effectué un _data cleaning_ des données avec notamment :
+		* une gestion des NaN
+		* remplacement des NaN par le mode le cas échéant.
+		""")
+		
+		st.markdown("""
+		```
+		nan_mode_cols = ['place','secu','lartpc','larrout','env1','infra','situ','vosp','nbv','plan','prof',
+						 'surf','circ','actp','locp','etatp','an_nais','obsm','obs','trajet',
+						 'manv','choc','senc','atm']
+
+		for col in nan_mode_cols:
+			df[col] = df[col].fillna(df[col].mode()[0])
+
+		```
+		""")
+		st.markdown("""
+		* une conversion de la majorité des colonnes grâce à la fonction pd.to_numeric(...
+
+		Exemple de fonction créée pour le projet et permettant d'afficher la répartition des NaN's :
+
+		""")
+		st.markdown("""
+		```
+		def show_nan_rep(dataframe):
+			missing_count = dataframe.isnull().sum()  the count of missing values
+			value_count = dataframe.isnull().count()  the count of all values 
+			missing_percentage = round(missing_count / value_count * 100,2)  the percentage of missing values
+			missing_df = pd.DataFrame({'nbre': missing_count, '%': missing_percentage})  create a dataframe
+			print("Champs vides :")
+			print(missing_df.sort_values(by='nbre', ascending=False))
+			plt.figure(figsize=(8,8))
+			missing_df['%'].sort_values(ascending=False)[:15].plot.pie(autopct="%.1f%%")
+			plt.title('Répartition des données manquantes par colonne');
+		```
+		""")
+		st.markdown("""
+		Exemple de fonction créée pour sonder les modalités de chaque colonne :
+		""")
+		st.markdown("""
+		```
+		for i in df.columns[1:]:
+			x = df[i].sort_values().unique()
+			print('Pour la colonne ',i,', les valeurs sont :',x)
+		```
+		""")
+
+		metriques.acces('st.profil')
+		rapport = profil_donnees()
+		if rapport is None:
+			st.info("Profil des données non disponible : lancer `python profil.py` pour le calculer.")
+		else:
+			st.markdown("""
+			Profil des fichiers bruts (NaN, modalités et mode de chaque colonne) sur les années :
+			""")
+			st.write(', '.join(str(annee) for annee in rapport['annees']))
+			synthese = profil.synthese(rapport)
+			st.write(synthese.sort_values(by='NaN', ascending=False))
+			colonne = st.selectbox('Modalités de la colonne', synthese['table'] + ' / ' + synthese['colonne'])
+			table, col = colonne.split(' / ')
+			st.write(pd.Series(rapport[table][col]['frequences'], name='nbre'))
+		st.markdown("""
+
+		On fait le choix de supprimer les colonnes `v2`, `v1`, `gps`, `pr1`, `pr`, `adr` et `voie` qui de part le caractère erratique de leurs modalités n'apporteront pas de valeur ajoutée à notre étude.
+
+		On conserve les colonnes lat et long pour l'instant.
+		""")
+
+	if st.checkbox('Conclusions et export'):
+		st.markdown("""
+		Plutôt que le CSV global 2005-2017 (444Mo), on peut exporter ici n'importe quelle partie des données nettoyées
+		(une ligne par usager) : années, régions, départements, gravités et colonnes au choix, en CSV ou en parquet.
+		Seules les années et les colonnes demandées sont lues, par lots écrits au fur et à mesure : le téléchargement
+		commence tout de suite, quelle que soit la taille de l'extraction.
+
+		Les CSV par année restent disponibles sur le GitHub du projet, dans le dossier 'dataset'.
+		""")
+		annees = st.multiselect('Années', ANNEES, default=[max(ANNEES)])
+		regions = st.multiselect('Régions', list(REGIONS))
+		departements = st.multiselect('Départements', sorted(set(DEPARTMENTS.values())))
+		gravites = st.multiselect('Gravités', list(export.GRAVITES), format_func=export.GRAVITES.get)
+		if annees:
+			colonnes = st.multiselect('Colonnes (toutes par défaut)', export.colonnes_disponibles(annees))
+			# parquet : années de l'entrepôt local seulement
+			format = st.radio('Format', list(export.FORMATS) if all(entrepot.existe(annee) for annee in annees) else ['csv'])
+			# le téléchargement passe par le serveur d'export (streamlit ne sert pas de fichier en flux),
+			# seulement si son adresse vue du navigateur est connue
+			if export.URL_EXPORT:
+				export.demarrer()
+				st.markdown('[Télécharger {}]({})'.format(export.nom_fichier(annees, format),
+					export.url(annees, colonnes, regions, departements, gravites, format)))
+			else:
+				st.warning("Téléchargement direct non configuré sur ce serveur : définir `PYSECUROUTE_EXPORT_URL` "
+					"(adresse du serveur d'export vue du navigateur, par exemple `http://localhost:8502/export` en local) "
+					"et `PYSECUROUTE_EXPORT_HOTE` pour l'ouvrir aux autres machines. "
+					"L'export reste disponible en ligne de commande.")
+			st.markdown("En ligne de commande :")
+			st.code(export.commande(annees, colonnes, regions, departements, gravites, format))
@@ -0,0 +1,202 @@
+import numpy as np
+import streamlit as st
+
+import modele
+
+
+# page « 4. Modélisation »
+def afficher():
+	if st.checkbox('Présentation du modèle'):
+		st.markdown("""
+		### Présentation du modèle
+		En complément des analyses réalisées grâce aux dataviz’, nous avons voulu réaliser du Machine Learning afin de voir si on pouvait prédire la gravité d’un accident corporel en France.
+
+
+		### Données
+		Les données utilisées sont celles fournies par le Ministère de l’Intérieur, moins 19 variables que nous avons jugées inutiles ou redondantes. Nous avons enlevé toutes les variables de localisation géographiques (hormis le code INSEE de la commune), ainsi que les informations temporelles et les numéros d’accident et de véhicule. En voici la liste exhaustive : `dep`, `v2`, `v1`, `gps`, `pr1`, `pr`, `adr`, `voie`, `long`, `lat`, `Num_Acc`, `num_veh`, `an`, `mois`, `jour`, `hrmn`, `departement`, `region`, `an_nais`.
+
+		L’étendue des données porte toujours sur __les années 2005 à 2017 incluses__.
+
+		La gestion des _NaN_, pour les variables quantitatives, suit le choix de l’ensemble du projet, soit l’utilisation du mode. Concernant les variables quantitatives, les observations sont supprimées.
+
+
+		### Tests et améliorations du ML
+		Après plusieurs essais, le choix a été fait de ne pas réaliser les modélisations sur tout le dataset de ML, mais après une diminution de ce dataset par regroupement sur le numéro d'accident (`Num_Acc`), en ne conservant que la gravité (`grav`) la plus élevée lors de chaque accident.
+
+		Ce choix nous a semblé judicieux pour plusieurs raisons :
+
+		* donner de meilleures prédictions,
+		* réduire le temps de calcul,
+		* correspondre le mieux à une logique d’assureur, qui pourrait être notre client ici.
+
+		Par contre, il y aura une conséquence : __la gravité la moins élevée (modalité '1' = 'indemne') n’est que très peu observée__. De fait, elle sera absente du jeu de test et donc des résultats de la modélisation.
+
+
+		### Données utilisées
+		Le jeu de données utilisé pour les prédictions de Machine Learning comprend donc _1 100 476 observations_ et _33 variables explicatives potentielles_.
+
+		### Choix des modèles
+		Dans un but d’interprétabilité des résultats et de test de robustesse, nous avons opté pour l’__arbre de décision__ (DecisionTree).
+
+
+		### Résultats avec DecisionTree
+
+		#### Hyperparamètres utilisés
+		Après différents tests de recherche des meilleurs hyperparamètres via la fonction GridSearchCV, il s’est avéré que les meilleurs étaient : `{'criterion': 'gini', 'max_depth': 14}`.
+
+
+		#### Taux de prédiction
+		Le taux de réussite de prédiction du modèle sur le jeu d'entraînement s'élève à __73,03%__.
+
+		Le taux de réussite de prédiction du modèle sur le jeu de test, c’est-à-dire en conditions réelles d’utilisation, s'élève à __70,52%__.
+
+
+		#### Rapport d’évaluation
+		Le rapport d’évaluation du modèle sur l’échantillon de test est le suivant :
+		""")
+		st.image('PySecuRoute-DecisionTree-01-Rapport-evaluation.png')
+		st.markdown("""
+		La moyenne montre des scores satisfaisants, avec un recall légèrement supérieur au score f1 et à la précision, respectivement 71 et 68%.
+
+
+		#### Matrice de confusion (heatmap et tableau)
+		Dans le détail, la matrice de confusion représentée visuellement ci-dessous par un heatmap montre son meilleur taux de prédiction des accidents corporels sur les cas les moins graves (modalité '4' = 'blessé léger'), alors que les autres prédictions présentent un nombre élevé de mauvaises prévisions par le modèle.
+		""")
+		st.image('PySecuRoute-DecisionTree-02-Matrice-confusion-heatmap.png')
+		st.markdown("""
+		En chiffres, cela donne le tableau ci-dessous. Les effectifs visualisés de cette façon sont plus parlants. En outre, il nous permet de calculer que pour la modalité '3' (='blessé hospitalisé`) par exemple, le pourcentage de mauvaises prédictions s’élève à 58,7% et à 0,6%, soit un taux de prévisions correctes 40,7%.
+		""")
+		st.image('PySecuRoute-DecisionTree-03-Matrice-confusion-tableau.png')
+		st.markdown("""
+		#### Top 10 des variables explicatives
+		Un autre résultat est le top 10 des variables explicatives déterminé par notre modèle de DecisionTree :
+		""")
+		st.image('PySecuRoute-DecisionTree-04-Top10-Importance-variables-explicatives-tableau.png')
+		st.markdown("""
+		Il se caractérise par la prévalence de la catégorie de la route (`catr`), suivi de près par le code INSEE de la commune (`com`), puis par l’usage ou non de certains équipements de sécurité (`secu`) et le nombre total de voies de circulation (`nbv`) et enfin par le type de collision (`col`) pour le top 5.
+
+		A elles cinq, ces variables expliquent 55,5% de la prédiction de notre modèle.
+
+
+		#### Conclusions et pistes d’améliorations avec DecisionTree
+		La modélisation avec DecisionTree se révèle acceptable avec son taux de bonnes prédictions de __70,52%__, mais présente de nombreuses limites en termes de robustesse. La plus importante d’entre-elles est le biais de prédiction vers les accidents corporels les moins graves (indemnes exclus).
+
+		Les pistes d’améliorations avec ce modèle de Machine Learning seraient :
+		* dans le jeu de données, de supprimer les modalités non prédites, soit la modalité la moins grave : '1' (= les indemnes),
+		* d’opérer une stratification en fonction des modalités présentes au moment de créer les jeux de données d’entraînement et de test,
+		* de réaliser un graphique visuel de l'arbre de décision. Vu le très grand nombre de nœuds, les images créées ont été inexploitables. Il faudrait peut-être chercher un package interactif pour un tel arbre de décision.
+
+		Les autres pistes d’améliorations seraient :
+		* choisir un modèle de Machine Learning plus adapté au type qualitatif de notre jeu de données et à son nombre élevé d’observations (largement supérieur au seuil des 100k observations), comme __SGDClassifier__ par exemple.
+		* tester une modélisation Machine Learning dans une bibliothèque plus adaptée au Big Data, telle que __PySpark__.
+		""")
+
+	if st.checkbox('Implémentation du modèle'):
+		st.markdown("""
+		#### Préambule
+		Au-delà de réaliser une modélisation de Machine Learning capable de prédire correctement les accidents corporels en France, nous vous proposons de vous essayer à la simulation.
+		
+		Vous trouverez ci-dessous un formulaire qui vous permet de choisir les paramètres d’un accident fictif pour lequel la modélisation va vous prédire, dans la limite de ses capacités, la gravité de l’usager. Vous pouvez choisir différents paramètres sur l’accident, comme son lieu, son type, ainsi que la présence et l’utilisation ou non de certains équipements de sécurité.
+		
+		Nous avons supprimé la variable du code INSEE de la commune ('com') à cause des complexités que son implémentation requérait pour qu’un utilisateur la sélectionne de façon ergonomique et intuitive. Cela a pour conséquence de baisser légèrement le taux de réussite de prédiction du modèle, passant de 70,5 à 70,1%. 
+		""")
+		# Chargement du modèle entraîné via pickle (mis en cache par modele.charger_modele)
+		classifier_pickle = modele.charger_modele()
+
+		# Fonction de création de la page web Streamlit
+		def main_model():
+			 
+			catr_select = st.selectbox('Catégorie de route', [	'Autoroute',
+			'Route Nationale',
+			'Route Départementale',
+			'Voie Communale',
+			'Hors réseau public',
+			'Parc de stationnement public',
+			'Autre'])
+			
+			secu_select = st.selectbox("Présence et utilisation d'équipement de sécurité", ['Ceinture utilisée',
+					'Ceinture non utilisée',
+					'Ceinture, utilisation indéterminable',
+					'Casque utilisé',
+					'Casque non utilisé',
+					'Casque, utilisation indéterminable',
+					'Dispositif enfants utilisé',
+					'Dispositif enfants non utilisé',
+					'Dispositif enfants, utilisation indéterminable',
+					'Equipement réfléchissant utilisé',
+					'Equipement réfléchissant non utilisé',
+					'Equipement réfléchissant, utilisation indéterminable',
+					'Autre équipement utilisé',
+					'Autre équipement non utilisé',
+					'Autre équipement, utilisation indéterminable'])
+
+			col_select = st.selectbox('Type de collision',['Deux véhicules, collision frontale',
+			'Deux véhicules, collision par l\'arrière',
+			'Deux véhicules, collision par le coté',
+			'Trois véhicules et plus, collision en chaîne',
+			'Trois véhicules et plus, collisions multiples',
+			'Autres types de collision',
+			'Aucune collision'
+			])
+
+			agg_select = st.selectbox('En/hors agglomération',['Hors agglomération',
+			'En agglomération'
+			])
+
+			situ_select = st.selectbox("Situation de l'accident",['Sur chaussée',
+						"Sur bande d'arrêt d'urgence",
+						'Sur accotement',
+						'Sur trottoir',
+						'Sur piste cyclable'])
+
+			obsm_select = st.selectbox("Obstacle mobile heurté",['Piéton',
+			'Véhicule',
+			'Véhicule sur rail',
+			'Animal domestique',
+			'Animal sauvage',
+			'Autre'])
+			
+			obs_select = st.selectbox("Obstacle fixe heurté",['Véhicule en stationnement',
+			'Arbre',
+			'Glissière métallique',
+			'Glissière béton',
+			'Autre type de glissière',
+			'Bâtiment, mur, pile de pont',
+			'Support de signalisation verticale ou poste d\'appel d\'urgence',
+			'Poteau',
+			'Mobilier urbain',
+			'Parapet',
+			'Ilot, refuge, borne haute',
+			'Bordure de trottoir',
+			'Fossé, talus, paroi rocheuse',
+			'Autre obstacle fixe sur la chaussée',
+			'Autre obstacle fixe sur le trottoir ou l\'accotement',
+			'Sortie de chaussée sans obstacle'])
+			
+			larrout_select = st.selectbox("Largeur de la route (en m)",np.arange(1,1000,1))
+			
+			nbv_select = st.selectbox("Nombre de voies",np.arange(1,10,1))
+			
+			if st.button("Prédire"): 
+				explication = modele.prediction(catr_select, secu_select, nbv_select, col_select, agg_select, situ_select, obsm_select, larrout_select, obs_select)
+				result = explication['predictions'][0]
+				if result == 2:
+					st.success('Tué')
+				elif result == 3:
+					st.success('Blessé hospitalisé')
+				elif result == 4:
+					st.success('Blessé léger') 
+				
+				# chemin de décision suivi dans l'arbre pour cette prédiction
+				with st.beta_expander('Pourquoi cette prédiction ?'):
+					st.write("Tests successifs de l'arbre de décision (probabilités en % après chaque test) :")
+					st.table(modele.tableau_chemin(classifier_pickle, explication))
+			    
+
+		st.markdown("""
+		### Prédiction
+		---
+		#### Veuillez sélectionner les modalités des variables explicatives ci-dessous :
+			""") 
+			
+		main_model()
@@ -0,0 +1,72 @@
+import streamlit as st
+
+
+# page « 1. Présentation »
+def afficher():
+	st.markdown("""
+	## 1. Présentation
+	---
+	
+	### Présentation du projet
+	
+	Les accidents corporels sont courants et les répertorier permet de les étudier afin d’identifier
+	les différents cas qui ont impliqué des blessures plus ou moins graves. Prédire la gravité
+	d’un accident en fonction de ses différentes caractéristiques peut être utile pour proposer
+	une solution qui a comme but de réduire la fréquence des accidents graves.
+
+	**Données**
+
+	Plusieurs jeux de données répertorient l’intégralité des accidents corporels de la circulation
+	intervenus durant une année précise en France métropolitaine et dans les DOM-TOM. Ces
+	jeux de données comprennent des informations de localisation de l’accident ainsi que des
+	informations concernant les caractéristiques de l’accident et son lieu, les véhicules impliqués
+	et leurs victimes.
+
+	Nous avons choisi d'exploiter les données dont les sources sont téléchargeables au lien suivant :
+
+	[https://www.data.gouv.fr/fr/datasets/bases-de-donnees-annuelles-des-accidents-corporels-de-la-circulation-routiere-annees-de-2005-a-2019](https://www.data.gouv.fr/fr/datasets/bases-de-donnees-annuelles-des-accidents-corporels-de-la-circulation-routiere-annees-de-2005-a-2019/)
+
+	### Organisation et répartition des tâches
+
+	Nous avons choisi ce projet pour la __volumétrie__ et la __variété__ des informations mises à disposition sur un sujet concret qui impacte notre vie au quotidien :
+
+	les déplacements sur les routes françaises et la sécurité routière qui en découle.
+	Pourtant, nous ne sommes probablement pas les personnes les plus impactées par le trafic routier.
+
+	Venant de _Caen_, _Le Mans_, _Roanne_ et même _Saint-Denis de La Réunion_, le trafic routier des grandes agglomérations et les accidents récurrents ne sont pas notre lot de désagrément quotidien.
+
+	Mais comme le sujet essentiel de ce projet Data est axé sur la __gravité des blessures corporels__ et la mortalité des accidentés de la route, nous verrons aussi que les spécificités géographiques peuvent donner des informations parlantes et exploitables pour un assureur ou un organisme travaillant dans le large périmètre de la sécurité routière.
+
+	**Répartition des tâches** :
+
+	La répartition des tâches dans l'équipe s'est faite naturellement par affinité sur les sujets et sur les compétences de chacun.
+
+	Notre équipe est composée de profils professionnels aux parcours complètement différents.
+
+	Ces différences de profil et de personnalité ont nourri la richesse des échanges et permis de trouver une vraie complémentarité dans la répartition des tâches :
+
+	__Kikala__: Enseignant, Chercheur, formé au renseignement d'intéret économique, adepte du Zen de Python depuis quelques années, s'est orienté naturellement sur l'exploitation, la mise en forme des données, le data processing.
+
+	Son expérience en Python nous a permis de débuter rapidement le projet et de transmettre ses astuces.
+
+	__Christophe__: Chercheur en Archéologie et Géographie, a pu retrouver facilement ses repères en fouillant la documentation et les hyperparamètres d'un nombre important de modèles de Machine Learning.
+
+	Passionné d'informatique et de programmation web, nous avons pu profiter de ses talents de développeur, de facilitateur de mise à disposition d'environnement cloud pour exécuter les traitements lourds sur un volume important de données.
+
+	__Hervé__: Analyste fonctionnel, Consultant en Assistance en Maitrise d'Ouvrage, a pu continuer de questionner, analyser, détecter les écarts en s'orientant vers la production de graphiques, en requétant et contrôlant l'intégrité des données avant le traitement de Machine Learning.
+
+	__Pascal__ : sa formation en Gestion et Commerce, son attrait pour les tableaux et les statistiques l'ont orienté vers la partie Data Visualisation avec de nombreux graphiques à étudier en liaison avec les résultats du Machine Learning.
+
+	Les parties rédaction, relecture et critique ont été équitablement partagée dans l'équipe.
+
+	### Avancement et suivi du projet
+
+	A l'aide de _Slack_, _codeshare.io_ et des réunions _Zoom_, nous avons pu communiquer régulièrement sur l'avancé du projet et sur nos tâches respectives.
+
+	Nos réunions hebdomadaires avec Maxime de DataScientest, et ses conseils pertinents, ont permis d'aller à l'essentiel et d'éviter de nous égarer facilement vu le vaste sujet étudié, dans le temps restreint rythmé par les certifications hebdomadaires et obligatoires de cette riche formation.
+
+	### Pourquoi PySecuRoute ?
+	
+	* Pour __Py__thon, langage ubiquitaire en tant que Data Analyst, et plus généralement en Data Science.
+	* Notre sensibilité commune sur la __Sécu__rité __Rout__ière
+	""")